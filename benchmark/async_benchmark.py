@@ -0,0 +1,54 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+"""
+Compares the throughput (ops/sec) of BakeProviderHandle's *_async methods
+driven by a single asyncio event loop with that of the blocking methods
+called from a ThreadPoolExecutor.
+
+Usage: python benchmark/async_benchmark.py [protocol] [num_ops] [payload_size]
+"""
+import sys
+sys.path.append('.')
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from common import LocalBakeService, timed
+
+def run_threads(ph, target, num_ops, data, num_threads):
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        regions = list(pool.map(lambda i: ph.create_write_persist(target, data), range(num_ops)))
+        list(pool.map(lambda r: ph.read(target, r, 0, len(data)), regions))
+    return regions
+
+async def run_async(ph, target, num_ops, data, max_in_flight):
+    sem = asyncio.Semaphore(max_in_flight)
+    async def bounded(fut_fn, *args):
+        async with sem:
+            return await fut_fn(*args)
+    regions = await asyncio.gather(*[ bounded(ph.create_write_persist_async, target, data)
+                                      for i in range(num_ops) ])
+    await asyncio.gather(*[ bounded(ph.read_async, target, r, 0, len(data)) for r in regions ])
+    return regions
+
+def main():
+    protocol     = sys.argv[1] if len(sys.argv) > 1 else 'na+sm'
+    num_ops      = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    payload_size = int(sys.argv[3]) if len(sys.argv) > 3 else 4096
+    service = LocalBakeService(protocol)
+    ph = service.handles[0]
+    target = service.targets[0]
+    data = b'x' * payload_size
+    print("%-24s %12s %14s" % ("mode", "concurrency", "ops/sec"))
+    for concurrency in [ 1, 4, 16, 64, 256 ]:
+        t, regions = timed(run_threads, ph, target, num_ops, data, concurrency)
+        print("%-24s %12d %14.1f" % ("blocking+threads", concurrency, 2*num_ops/t))
+        for r in regions:
+            ph.remove(target, r)
+        t, regions = timed(asyncio.run, run_async(ph, target, num_ops, data, concurrency))
+        print("%-24s %12d %14.1f" % ("asyncio", concurrency, 2*num_ops/t))
+        for r in regions:
+            ph.remove(target, r)
+    del ph
+    service.finalize()
+
+if __name__ == '__main__':
+    main()
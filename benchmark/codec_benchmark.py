@@ -0,0 +1,65 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+"""
+Measures the effective throughput (payload bytes per second) of
+create_write_persist and read through a plain provider handle and
+through compressed provider handles (see pybake.codec) using each
+available codec, for payloads that compress well (a smooth float64
+checkpoint, text logs) and for random bytes, along with the compression
+ratio and the latency of reading a small range of an encoded region.
+
+Usage: python benchmark/codec_benchmark.py [protocol] [size] [repetitions]
+"""
+import os
+import sys
+sys.path.append('.')
+from common import LocalBakeService, timed
+from pybake.codec import available_codecs
+
+def payloads(size):
+    import numpy
+    x = numpy.linspace(0.0, 100.0, size // 8)
+    checkpoint = (numpy.sin(x) * 1000.0).round(3).tobytes()
+    line = b'2018-06-01 12:00:00 INFO server: request %06d served in %d us\n'
+    logs = b''.join(line % (i, i % 977) for i in range(size // len(line) + 1))[:size]
+    return [ ("checkpoint", checkpoint), ("logs", logs), ("random", os.urandom(size)) ]
+
+def run(ph, target, data, repetitions):
+    t_write, rids = timed(lambda: [ ph.create_write_persist(target, data) for i in range(repetitions) ])
+    t_read, _ = timed(lambda: [ ph.read(target, rid) for rid in rids ])
+    ph.read(target, rids[0], len(data) // 2, 4096) # loads the region's layout
+    t_range, _ = timed(lambda: [ ph.read(target, rids[0], len(data) // 2, 4096) for i in range(repetitions) ])
+    for rid in rids:
+        ph.remove(target, rid)
+    total = len(data) * repetitions
+    return (total / t_write, total / t_read, t_range / repetitions)
+
+def main():
+    protocol    = sys.argv[1] if len(sys.argv) > 1 else 'na+sm'
+    size        = int(sys.argv[2]) if len(sys.argv) > 2 else 16*1024*1024
+    repetitions = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    service = LocalBakeService(protocol)
+    target = service.targets[0]
+    handles = [ ("raw", service.handles[0]) ]
+    for name in available_codecs():
+        handles.append((name, service.client.create_compressed_provider_handle(
+            service.addr, 1, codec=name)))
+    print("%-12s %-8s %8s %16s %16s %16s" % ("payload", "codec", "ratio",
+        "write (MiB/s)", "read (MiB/s)", "4KiB read (us)"))
+    for pname, data in payloads(size):
+        for cname, ph in handles:
+            ratio = 1.0
+            if(cname != "raw"):
+                ph.pipeline.reset_stats()
+            w, r, rr = run(ph, target, data, repetitions)
+            if(cname != "raw"):
+                ratio = ph.pipeline.stats()['ratio']
+            print("%-12s %-8s %8.2f %16.1f %16.1f %16.1f" % (pname, cname, ratio,
+                w/(1024*1024), r/(1024*1024), rr*1e6))
+    for cname, ph in handles[1:]:
+        ph.pipeline.close()
+    del handles
+    service.finalize()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+"""
+Compares the latency of write, read and read_into through a provider
+handle using the co-located fast path (direct copies from/into the
+provider's memory) with that of a handle going through loopback RPCs,
+both handles pointing to the same provider in the current process.
+Transfers smaller than pybake.client.LOCAL_FAST_PATH_MIN_SIZE go through
+RPCs on both handles.
+
+Usage: python benchmark/colocated_benchmark.py [protocol] [num_ops]
+"""
+import sys
+sys.path.append('.')
+from common import LocalBakeService, timed
+from pybake.client import BakeClient
+
+SIZES = [ 64, 1024, 16*1024, 256*1024, 4*1024*1024 ]
+
+def run(ph, target, region, data, num_ops):
+    buf = bytearray(len(data))
+    t_write, _ = timed(lambda: [ ph.write(target, region, 0, data) for i in range(num_ops) ])
+    t_read, _ = timed(lambda: [ ph.read(target, region, 0, len(data)) for i in range(num_ops) ])
+    t_into, _ = timed(lambda: [ ph.read_into(target, region, 0, buf) for i in range(num_ops) ])
+    return (t_write/num_ops, t_read/num_ops, t_into/num_ops)
+
+def main():
+    protocol = sys.argv[1] if len(sys.argv) > 1 else 'na+sm'
+    num_ops  = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    service = LocalBakeService(protocol)
+    rpc_ph = service.handles[0]
+    local_client = BakeClient(service.engine, local_fast_path=True)
+    local_ph = local_client.create_provider_handle(service.addr, 1)
+    if(not local_ph.is_local):
+        print("Warning: the co-located fast path could not be enabled")
+    target = service.targets[0]
+    print("%-10s %-8s %14s %14s %14s" % ("size", "path", "write (us)", "read (us)", "read_into (us)"))
+    for size in SIZES:
+        data = b'x' * size
+        region = rpc_ph.create(target, size)
+        for name, ph in [ ("rpc", rpc_ph), ("local", local_ph) ]:
+            ph.write(target, region, 0, data) # warm up
+            w, r, ri = run(ph, target, region, data, num_ops)
+            print("%-10d %-8s %14.2f %14.2f %14.2f" % (size, name, w*1e6, r*1e6, ri*1e6))
+        rpc_ph.remove(target, region)
+    del local_ph
+    local_client.finalize()
+    service.finalize()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import os
+import time
+import pymargo
+from pymargo.core import Engine
+from pybake.server import BakeProvider
+from pybake.client import BakeClient
+
+class LocalBakeService():
+    """
+    The LocalBakeService class starts one or more BakeProviders in the
+    current process, each backed by a target in /dev/shm, and a
+    BakeClient with a provider handle to each of them. The engine uses
+    a progress thread so that providers keep serving RPCs while client
+    threads (or ULTs) are blocked on them. The client's co-located fast
+    path is disabled unless local_fast_path is True, so that benchmarks
+    measure the RPC path.
+    """
+
+    def __init__(self, protocol='na+sm', num_providers=1,
+                 target_size=1024*1024*1024, target_dir='/dev/shm',
+                 num_rpc_threads=0, local_fast_path=False):
+        self.engine = Engine(protocol, mode=pymargo.server,
+                             use_progress_thread=True,
+                             num_rpc_threads=num_rpc_threads)
+        self.providers = []
+        self.targets = []
+        self._paths = []
+        for i in range(num_providers):
+            provider = BakeProvider(self.engine, i+1)
+            path = os.path.join(target_dir, 'pybake-bench-%d-%d' % (os.getpid(), i))
+            if(os.path.exists(path)):
+                os.remove(path)
+            self.targets.append(provider.create_target(path, target_size))
+            self.providers.append(provider)
+            self._paths.append(path)
+        self.client = BakeClient(self.engine, local_fast_path=local_fast_path)
+        self.addr = self.engine.addr()
+        self.handles = [ self.client.create_provider_handle(self.addr, i+1)
+                         for i in range(num_providers) ]
+
+    def finalize(self):
+        """
+        Releases the handles, detaches and deletes the targets,
+        and finalizes the engine.
+        """
+        del self.handles
+        self.client.finalize()
+        for provider in self.providers:
+            provider.detach_all_targets()
+        del self.addr
+        self.engine.finalize()
+        for path in self._paths:
+            if(os.path.exists(path)):
+                os.remove(path)
+
+def timed(fn, *args, **kwargs):
+    """
+    Calls fn(*args, **kwargs) and returns (elapsed seconds, result).
+    """
+    t1 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    t2 = time.perf_counter()
+    return (t2 - t1, result)
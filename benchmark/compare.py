@@ -0,0 +1,35 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+"""
+Compares two JSON result files produced by ops_benchmark.py and reports
+the entries whose median latency or throughput regressed by more than a
+given threshold.
+
+Usage: python benchmark/compare.py baseline.json current.json [threshold]
+"""
+import sys
+import json
+
+def load(filename):
+    with open(filename) as f:
+        results = json.load(f)['results']
+    return dict(((r['op'], r['size'], r['threads']), r) for r in results if 'skipped' not in r)
+
+def main():
+    baseline  = load(sys.argv[1])
+    current   = load(sys.argv[2])
+    threshold = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+    regressions = 0
+    for key in sorted(set(baseline) & set(current)):
+        b, c = baseline[key], current[key]
+        latency = c['p50'] / b['p50'] - 1.0
+        throughput = 1.0 - c['ops_per_sec'] / b['ops_per_sec']
+        if(latency > threshold or throughput > threshold):
+            regressions += 1
+            print("%-22s %12d B %3d threads: p50 %+6.1f%%, throughput %+6.1f%%" % (
+                key[0], key[1], key[2], 100*latency, -100*throughput))
+    print(str(regressions)+" regression(s) found")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+"""
+Measures the time it takes a fresh interpreter to import pybake's
+modules, as paid at every launch by short-lived workers. Each module is
+imported in a new process, repeatedly; the time of an empty interpreter
+start is reported as a baseline. Also reports whether importing the
+module loaded numpy, asyncio and pymargo, which pybake only imports
+when they are needed.
+
+Usage: python benchmark/import_benchmark.py [repetitions]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+MODULES = [ 'pybake.target', 'pybake.client', 'pybake.server' ]
+LAZY = [ 'numpy', 'asyncio', 'pymargo' ]
+
+CHECK = "import sys; import %s; print(' '.join(m for m in %r if m in sys.modules))"
+
+def timed_run(code, env):
+    t1 = time.perf_counter()
+    out = subprocess.run([ sys.executable, '-c', code ], env=env,
+                         stdout=subprocess.PIPE, check=True).stdout
+    return (time.perf_counter() - t1, out.decode().strip())
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([ os.getcwd(), env.get('PYTHONPATH', '') ])
+    baseline = statistics.median(
+        timed_run('pass', env)[0] for i in range(repetitions))
+    print("%-16s %14s %14s   %s" % ("module", "median (ms)", "import (ms)", "loaded"))
+    print("%-16s %14.2f %14s" % ("(interpreter)", baseline*1e3, "-"))
+    for module in MODULES:
+        times = []
+        loaded = ''
+        for i in range(repetitions):
+            t, loaded = timed_run(CHECK % (module, LAZY), env)
+            times.append(t)
+        median = statistics.median(times)
+        print("%-16s %14.2f %14.2f   %s" % (module, median*1e3,
+            (median - baseline)*1e3, loaded if loaded else '-'))
+
+if __name__ == '__main__':
+    main()
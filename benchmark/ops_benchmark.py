@@ -0,0 +1,237 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+"""
+Benchmark of the BakeProviderHandle hot paths. Starts a BakeProvider on a
+local engine backed by a target in /dev/shm and, for each operation,
+payload size and number of client threads, measures the latency
+percentiles and the throughput of the operation. Results are written as
+JSON so that they can be compared between releases.
+
+Usage: python benchmark/ops_benchmark.py --help
+"""
+import sys
+sys.path.append('.')
+import argparse
+import json
+import platform
+import threading
+import time
+import pymargo
+from common import LocalBakeService
+
+ALL_OPS = [ 'create', 'write', 'read', 'read_into', 'persist', 'create_write_persist',
+            'read_numpy', 'proxy_write', 'proxy_read' ]
+
+DEFAULT_SIZES = [ 64*4**i for i in range(13) ] # 64 B to 1 GiB
+
+# operations creating a region at each run; the region is removed
+# after the run (outside of the timed section)
+CREATE_OPS = ( 'create', 'create_write_persist' )
+
+class Workload():
+    """
+    The Workload class holds the per-thread state needed to run one
+    operation of a given size (regions, buffers, bulk handles), and
+    exposes a run() method executing the operation once and an untimed
+    after_run() method removing the region the run may have created, so
+    that a workload never holds more than two regions of its size.
+    """
+
+    def __init__(self, service, op, size):
+        self.ph = service.handles[0]
+        self.tid = service.targets[0]
+        self.op = op
+        self.size = size
+        self.data = bytearray(size)
+        self.rid = None
+        if(op not in CREATE_OPS):
+            self.rid = self.ph.create_write_persist(self.tid, self.data)
+        self.garbage = []
+        if(op in ('proxy_write', 'proxy_read')):
+            self.bulk = service.engine.create_bulk(self.data, pymargo.bulk.read_write)
+        self.run = getattr(self, 'run_'+op)
+
+    def run_create(self):
+        self.garbage.append(self.ph.create(self.tid, self.size))
+
+    def run_write(self):
+        self.ph.write(self.tid, self.rid, 0, self.data)
+
+    def run_read(self):
+        self.ph.read(self.tid, self.rid, 0, self.size)
+
+    def run_read_into(self):
+        self.ph.read_into(self.tid, self.rid, 0, self.data)
+
+    def run_persist(self):
+        self.ph.persist(self.tid, self.rid, 0, self.size)
+
+    def run_create_write_persist(self):
+        self.garbage.append(self.ph.create_write_persist(self.tid, self.data))
+
+    def run_read_numpy(self):
+        import numpy
+        self.ph.read_numpy(self.tid, self.rid, 0, (self.size,), numpy.uint8)
+
+    def run_proxy_write(self):
+        self.ph.proxy_write(self.tid, self.rid, self.bulk, self.size)
+
+    def run_proxy_read(self):
+        self.ph.proxy_read(self.tid, self.rid, self.bulk, self.size)
+
+    def after_run(self):
+        for rid in self.garbage:
+            self.ph.remove(self.tid, rid)
+        self.garbage = []
+
+    def cleanup(self):
+        """
+        Removes the regions created by the workload.
+        """
+        self.after_run()
+        if(self.rid is not None):
+            self.ph.remove(self.tid, self.rid)
+            self.rid = None
+        if(hasattr(self, 'bulk')):
+            del self.bulk
+
+def percentile(sorted_values, p):
+    """
+    Returns the p-th percentile (0 <= p <= 100) of a sorted list.
+    """
+    if(len(sorted_values) == 0):
+        return None
+    k = int(round((len(sorted_values)-1) * p / 100.0))
+    return sorted_values[k]
+
+def required_space(op, size, num_threads):
+    """
+    Returns the number of bytes of the target an operation of a given
+    size run from num_threads threads needs at most: each thread holds
+    one region (and, for CREATE_OPS, the one created by the current run
+    until after_run removes it).
+    """
+    return 2 * size * num_threads
+
+def run_one(service, op, size, num_threads, iterations):
+    """
+    Runs an operation of a given size from a number of threads
+    and returns a dictionary of results. If a thread fails, the
+    other threads are stopped and its exception is raised.
+    """
+    workloads = []
+    try:
+        for i in range(num_threads):
+            workloads.append(Workload(service, op, size))
+        latencies = [ [] for i in range(num_threads) ]
+        errors = []
+        barrier = threading.Barrier(num_threads + 1)
+        def worker(i):
+            w = workloads[i]
+            lat = latencies[i]
+            try:
+                w.run() # warmup
+                w.after_run()
+                barrier.wait()
+                for j in range(iterations):
+                    t1 = time.perf_counter()
+                    w.run()
+                    lat.append(time.perf_counter() - t1)
+                    w.after_run()
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+            except Exception as e:
+                errors.append(e)
+                barrier.abort()
+        threads = [ threading.Thread(target=worker, args=(i,)) for i in range(num_threads) ]
+        for t in threads:
+            t.start()
+        try:
+            barrier.wait()
+            t1 = time.perf_counter()
+            barrier.wait()
+            elapsed = time.perf_counter() - t1
+        except threading.BrokenBarrierError:
+            pass
+        for t in threads:
+            t.join()
+        if(len(errors) != 0):
+            raise errors[0]
+    finally:
+        for w in workloads:
+            w.cleanup()
+    all_latencies = sorted(l for lat in latencies for l in lat)
+    num_ops = len(all_latencies)
+    return { 'op'            : op,
+             'size'          : size,
+             'threads'       : num_threads,
+             'iterations'    : iterations,
+             'p50'           : percentile(all_latencies, 50),
+             'p90'           : percentile(all_latencies, 90),
+             'p99'           : percentile(all_latencies, 99),
+             'min'           : all_latencies[0],
+             'max'           : all_latencies[-1],
+             'mean'          : sum(all_latencies) / num_ops,
+             'ops_per_sec'   : num_ops / elapsed,
+             'bytes_per_sec' : num_ops * size / elapsed }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of pybake client operations')
+    parser.add_argument('--protocol', default='na+sm', help='Margo protocol (na+sm, tcp, ...)')
+    parser.add_argument('--ops', default=','.join(ALL_OPS), help='comma-separated list of operations')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='comma-separated list of payload sizes')
+    parser.add_argument('--threads', default='1,2,4,8', help='comma-separated list of thread counts')
+    parser.add_argument('--iterations', type=int, default=1000,
+                        help='maximum number of iterations per thread')
+    parser.add_argument('--bytes-per-run', type=int, default=1024*1024*1024,
+                        help='caps the iterations so that each thread moves about this many bytes')
+    parser.add_argument('--target-size', type=int, default=8*1024*1024*1024,
+                        help='size of the /dev/shm target')
+    parser.add_argument('--rpc-threads', type=int, default=0, help='number of RPC threads of the provider')
+    parser.add_argument('--output', default='bench_output.json', help='JSON output file')
+    args = parser.parse_args()
+
+    ops     = args.ops.split(',')
+    sizes   = [ int(s) for s in args.sizes.split(',') ]
+    threads = [ int(t) for t in args.threads.split(',') ]
+
+    service = LocalBakeService(args.protocol, target_size=args.target_size,
+                               num_rpc_threads=args.rpc_threads)
+    output = { 'metadata' : { 'date'       : time.strftime('%Y-%m-%dT%H:%M:%S'),
+                              'host'       : platform.node(),
+                              'python'     : platform.python_version(),
+                              'protocol'   : args.protocol,
+                              'rpc_threads': args.rpc_threads },
+               'results'  : [] }
+    # keep some room for the allocator's metadata and fragmentation
+    available = args.target_size * 3 // 4
+    try:
+        for op in ops:
+            for size in sizes:
+                iterations = max(1, min(args.iterations, args.bytes_per_run // max(size, 1)))
+                for n in threads:
+                    if(required_space(op, size, n) > available):
+                        print("%-22s %12d B %3d threads: skipped (needs a larger --target-size)" % (
+                            op, size, n))
+                        output['results'].append({ 'op' : op, 'size' : size, 'threads' : n,
+                                                   'skipped' : 'target too small' })
+                        continue
+                    r = run_one(service, op, size, n, iterations)
+                    output['results'].append(r)
+                    print("%-22s %12d B %3d threads: p50 %10.1fus p99 %10.1fus %12.1f ops/s %10.1f MiB/s" % (
+                        op, size, n, r['p50']*1e6, r['p99']*1e6, r['ops_per_sec'],
+                        r['bytes_per_sec']/(1024.0*1024.0)))
+                    sys.stdout.flush()
+                    # results are saved after each run so that a failure does not lose them
+                    with open(args.output, 'w') as f:
+                        json.dump(output, f, indent=2)
+    finally:
+        service.finalize()
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print("Results written to "+args.output)
+
+if __name__ == '__main__':
+    main()
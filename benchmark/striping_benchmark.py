@@ -0,0 +1,37 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+"""
+Measures the aggregate bandwidth of a StripedObjectStore writing and
+reading a large object as the number of targets (each on its own local
+provider) grows.
+
+Usage: python benchmark/striping_benchmark.py [protocol] [object_size] [chunk_size] [concurrency]
+"""
+import sys
+sys.path.append('.')
+from common import LocalBakeService, timed
+from pybake.striping import StripedObjectStore
+
+def main():
+    protocol    = sys.argv[1] if len(sys.argv) > 1 else 'na+sm'
+    object_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1024*1024*1024
+    chunk_size  = int(sys.argv[3]) if len(sys.argv) > 3 else 4*1024*1024
+    concurrency = int(sys.argv[4]) if len(sys.argv) > 4 else 16
+    data = bytearray(object_size)
+    out  = bytearray(object_size)
+    print("%-10s %16s %16s" % ("targets", "write (MiB/s)", "read (MiB/s)"))
+    for num_targets in [ 1, 2, 4, 8 ]:
+        service = LocalBakeService(protocol, num_providers=num_targets,
+                                   target_size=2*object_size//num_targets + 64*1024*1024)
+        store = StripedObjectStore(list(zip(service.handles, service.targets)),
+                                   chunk_size, concurrency)
+        tw, manifest = timed(store.write, data)
+        tr, _ = timed(store.read, manifest, out)
+        store.remove(manifest)
+        mib = object_size / (1024.0*1024.0)
+        print("%-10d %16.1f %16.1f" % (num_targets, mib/tw, mib/tr))
+        del store
+        service.finalize()
+
+if __name__ == '__main__':
+    main()
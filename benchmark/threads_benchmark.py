@@ -0,0 +1,56 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+"""
+Measures how the throughput (ops/sec) of a single BakeProviderHandle
+shared by several Python threads scales with the number of threads,
+for blocking calls (one operation per call) and for
+BakeProviderHandle.execute (batches of operations handed off to
+Argobots ULTs in a single call).
+
+Usage: python benchmark/threads_benchmark.py [protocol] [num_ops] [payload_size] [batch_size]
+"""
+import sys
+sys.path.append('.')
+from concurrent.futures import ThreadPoolExecutor
+from common import LocalBakeService, timed
+
+THREADS = [ 1, 2, 4, 8, 16, 32 ]
+
+def blocking(ph, target, region, data, n):
+    for i in range(n):
+        ph.write(target, region, 0, data)
+        ph.read(target, region, 0, len(data))
+
+def batched(ph, target, region, data, n, batch_size):
+    for i in range(0, n, batch_size):
+        k = min(batch_size, n - i)
+        ph.execute([ ('write', target, region, 0, data) ] * k)
+        ph.execute([ ('read', target, region, 0, len(data)) ] * k)
+
+def run(num_threads, fn, *args):
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        list(pool.map(lambda i: fn(*args), range(num_threads)))
+
+def main():
+    protocol     = sys.argv[1] if len(sys.argv) > 1 else 'na+sm'
+    num_ops      = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    payload_size = int(sys.argv[3]) if len(sys.argv) > 3 else 4096
+    batch_size   = int(sys.argv[4]) if len(sys.argv) > 4 else 64
+    service = LocalBakeService(protocol, num_rpc_threads=4)
+    ph = service.handles[0]
+    target = service.targets[0]
+    data = b'x' * payload_size
+    region = ph.create(target, payload_size)
+    print("%-10s %10s %14s" % ("mode", "threads", "ops/sec"))
+    for num_threads in THREADS:
+        n = max(1, num_ops // num_threads)
+        t, _ = timed(run, num_threads, blocking, ph, target, region, data, n)
+        print("%-10s %10d %14.1f" % ("blocking", num_threads, 2*n*num_threads/t))
+        t, _ = timed(run, num_threads, batched, ph, target, region, data, n, batch_size)
+        print("%-10s %10d %14.1f" % ("execute", num_threads, 2*n*num_threads/t))
+    ph.remove(target, region)
+    del ph
+    service.finalize()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import base64
+import bisect
+import json
+import struct
+import threading
+from collections import deque
+from pybake.target import BakeTargetID, BakeRegionID, REGION_ID_SIZE, region_ids_from_numpy
+
+# Bake creates regions one RPC at a time. A BakeProvider also answers the
+# RPC below, which creates a list of regions in a single round trip
+# between the client and the provider. The provider still creates them
+# one after the other, each with a loopback create RPC through a client
+# handle to itself: the number of RPCs it handles is unchanged, only the
+# round trips over the network are saved.
+CREATE_MANY_RPC = 'pybake_create_many'
+
+# Substrings of the errors raised by a forward to a provider that does not
+# have a handler for the RPC (HG_NO_MATCH with Mercury 1.x, HG_NOENTRY with
+# Mercury 2.x).
+_NO_HANDLER_ERRORS = ( 'HG_NO_MATCH', 'HG_NOENTRY', 'No match' )
+
+def _is_no_handler_error(e):
+    msg = str(e)
+    return any(s in msg for s in _NO_HANDLER_ERRORS)
+
+def _unpack_sizes(blob):
+    return struct.unpack('<%dQ' % (len(blob) // 8), blob)
+
+def handle_create_many(ph, payload):
+    """
+    Answers a create_many request on the provider side, using a provider
+    handle ph to the provider itself. Returns the response. If a creation
+    fails, the regions already created for the request are removed.
+    """
+    request = json.loads(payload)
+    tid = BakeTargetID.from_bytes(base64.b64decode(request['tid']))
+    sizes = _unpack_sizes(base64.b64decode(request['sizes']))
+    rids = []
+    try:
+        for size in sizes:
+            rids.append(ph.create(tid, size))
+    except RuntimeError as e:
+        for rid in rids:
+            try:
+                ph.remove(tid, rid)
+            except RuntimeError:
+                pass
+        return json.dumps({ 'error' : str(e) })
+    raw = b''.join(rid.to_bytes() for rid in rids)
+    return json.dumps({ 'rids' : base64.b64encode(raw).decode() })
+
+class CreateManyClient():
+    """
+    The CreateManyClient class sends create_many requests to providers.
+    This is not supposed to be used directly, see
+    BakeProviderHandle.create_many.
+    """
+
+    def __init__(self, client):
+        """
+        Constructor. This is not supposed to be called by users.
+        """
+        self._client = client
+        self._rpc = client._mid.register(CREATE_MANY_RPC)
+
+    def create(self, address, provider_id, tid, sizes):
+        """
+        Creates regions of the given sizes in the target tid of the
+        specified provider. Returns the raw ids of the regions back to
+        back (bytes), or None if the provider does not answer create_many
+        requests (e.g. it was not started by pybake). Raises a RuntimeError
+        if the provider failed to create the regions. Other errors (e.g. a
+        timeout) are raised as well: the regions may have been created, so
+        the request must not be retried another way.
+        """
+        request = json.dumps({ 'tid' : base64.b64encode(tid.to_bytes()).decode(),
+                               'sizes' : base64.b64encode(
+                                   struct.pack('<%dQ' % len(sizes), *sizes)).decode() })
+        addr = self._client.lookup(address)
+        handle = self._client._mid.create_handle(addr, self._rpc)
+        try:
+            response = json.loads(handle.forward(provider_id, request))
+        except Exception as e:
+            if(_is_no_handler_error(e)):
+                return None
+            raise
+        if('error' in response):
+            raise RuntimeError("create_many failed: "+response['error'])
+        raw = base64.b64decode(response['rids'])
+        if(len(raw) != REGION_ID_SIZE*len(sizes)):
+            raise RuntimeError("create_many returned "+str(len(raw)//REGION_ID_SIZE)
+                    +" region(s) instead of "+str(len(sizes)))
+        return raw
+
+class RegionAllocator():
+    """
+    The RegionAllocator class keeps pools of regions created in advance in
+    a target, for a set of size classes, and hands them out without any
+    RPC. A background thread refills the pool of a size class with
+    create_many whenever it falls below low_watermark regions, so that
+    allocate does not wait on region creation unless regions are handed
+    out faster than they can be created.
+
+    A region handed out for a given size belongs to the smallest size
+    class that can hold it, so it may be larger than requested: callers
+    must keep track of the number of bytes they actually store in it.
+    Sizes larger than the largest class are created on demand. The
+    allocator is thread-safe. Its background thread requires the
+    client's MargoInstance to run a progress thread.
+    """
+
+    def __init__(self, ph, tid, size_classes=(4096, 65536, 1024*1024),
+                 low_watermark=64, batch_size=256):
+        """
+        Constructor. Starts the background thread, which fills
+        the pools of all the size classes.
+
+        Args:
+            ph (BakeProviderHandle): provider handle to use.
+            tid (BakeTargetID): target in which to create the regions.
+            size_classes (list): sizes of the pre-created regions.
+            low_watermark (int): number of regions of a size class below
+                which its pool is refilled.
+            batch_size (int): number of regions created per refill.
+        """
+        if(len(size_classes) == 0):
+            raise ValueError("At least one size class is required")
+        self._ph = ph
+        self.tid = tid
+        self.size_classes = sorted(set(size_classes))
+        self._low_watermark = low_watermark
+        self._batch_size = max(batch_size, low_watermark)
+        self._pools = { size : deque() for size in self.size_classes }
+        self._lock = threading.Condition()
+        self._closed = False
+        self._error = None         # error raised by a background refill
+        self._stats = { 'allocations' : 0, 'hits' : 0, 'misses' : 0,
+                        'oversized' : 0, 'created' : 0, 'refills' : 0 }
+        self._thread = threading.Thread(target=self._refill_loop,
+                name='pybake-allocator', daemon=True)
+        self._thread.start()
+
+    def _size_class(self, size):
+        i = bisect.bisect_left(self.size_classes, size)
+        return self.size_classes[i] if i < len(self.size_classes) else None
+
+    def _refill_loop(self):
+        with self._lock:
+            while(not self._closed):
+                low = [ size for size in self.size_classes
+                        if len(self._pools[size]) < self._low_watermark ]
+                if(len(low) == 0 or self._error is not None):
+                    self._lock.wait()
+                    continue
+                size = low[0]
+                count = self._batch_size - len(self._pools[size])
+                self._lock.release()
+                try:
+                    rids = self._ph.create_many(self.tid, [ size ] * count)
+                    error = None
+                except Exception as e:
+                    error = e
+                finally:
+                    self._lock.acquire()
+                if(error is not None):
+                    self._error = error
+                    continue
+                self._pools[size].extend(region_ids_from_numpy(rids))
+                self._stats['created'] += count
+                self._stats['refills'] += 1
+
+    def _check_error(self):
+        if(self._error is not None):
+            error = self._error
+            self._error = None
+            self._lock.notify()
+            raise error
+
+    def allocate(self, size):
+        """
+        Returns a (BakeRegionID, region size) tuple for a region of at
+        least size bytes, taken from the pool of the smallest size class
+        that can hold it, or created on the spot if that pool is empty
+        or if size exceeds the largest size class.
+        """
+        size_class = self._size_class(size)
+        with self._lock:
+            if(self._closed):
+                raise RuntimeError("RegionAllocator is closed")
+            self._check_error()
+            self._stats['allocations'] += 1
+            if(size_class is None):
+                self._stats['oversized'] += 1
+            else:
+                pool = self._pools[size_class]
+                if(len(pool) != 0):
+                    rid = pool.popleft()
+                    self._stats['hits'] += 1
+                    if(len(pool) < self._low_watermark):
+                        self._lock.notify()
+                    return (rid, size_class)
+                self._stats['misses'] += 1
+                self._lock.notify()
+        region_size = size_class if size_class is not None else size
+        return (self._ph.create(self.tid, region_size), region_size)
+
+    def release(self, rid, region_size):
+        """
+        Gives back an unused region obtained from allocate, so that it can
+        be handed out again. Regions whose size is not a size class are
+        removed. The region must not have been written to by the caller
+        if other callers should see it as empty.
+        """
+        with self._lock:
+            pool = self._pools.get(region_size)
+            if(pool is not None and not self._closed):
+                pool.append(rid)
+                return
+        self._ph.remove(self.tid, rid)
+
+    def stats(self):
+        """
+        Returns a dictionary with the number of allocations, how many were
+        served from a pool (hits), created on the spot because a pool was
+        empty (misses) or larger than the largest size class (oversized),
+        the number of regions created in the background and of refills,
+        and the number of regions currently reserved per size class.
+        """
+        with self._lock:
+            result = dict(self._stats)
+            result['reserved'] = { size : len(pool) for size, pool in self._pools.items() }
+        return result
+
+    def close(self, remove_reserved=True):
+        """
+        Stops the background thread and, if remove_reserved is True,
+        removes the regions that were reserved but not handed out.
+        """
+        with self._lock:
+            if(self._closed):
+                return
+            self._closed = True
+            self._lock.notify()
+        self._thread.join()
+        with self._lock:
+            reserved = [ rid for pool in self._pools.values() for rid in pool ]
+            for pool in self._pools.values():
+                pool.clear()
+        if(remove_reserved and len(reserved) != 0):
+            self._ph.remove_many([ (self.tid, rid) for rid in reserved ])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,90 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import struct
+
+# Layout of the header placed in front of the payload of regions written
+# by BakeProviderHandle.write_array (all integers are little-endian):
+#   magic (4 bytes) | version (u8) | order (u8, 'C' or 'F') | ndim (u16)
+#   | header size (u32) | descr size (u16) | dtype descr (utf-8 string)
+#   | shape (ndim x u64) | zero padding
+# The header size is a multiple of HEADER_ALIGNMENT, so that the payload
+# is aligned and the header of most arrays fits in a single read of
+# HEADER_ALIGNMENT bytes.
+HEADER_MAGIC     = b'PBKA'
+HEADER_VERSION   = 1
+HEADER_ALIGNMENT = 64
+_HEADER_PREFIX   = struct.Struct('<4sBBHIH')
+
+class ArrayHeader():
+    """
+    The ArrayHeader class describes the array stored in a region
+    written by BakeProviderHandle.write_array.
+    """
+
+    def __init__(self, dtype, shape, order='C', header_size=0):
+        """
+        Constructor.
+
+        Args:
+            dtype (numpy.dtype): datatype of the array.
+            shape (tuple): shape of the array.
+            order (str): 'C' or 'F', order in which the payload is stored.
+            header_size (int): size of the encoded header (computed if 0).
+        """
+        self.dtype = dtype
+        self.shape = tuple(shape)
+        self.order = order
+        self.header_size = header_size
+
+    @property
+    def nbytes(self):
+        """
+        Size of the payload, in bytes.
+        """
+        n = self.dtype.itemsize
+        for s in self.shape:
+            n *= s
+        return n
+
+    def to_bytes(self):
+        """
+        Encodes the header. Sets header_size accordingly.
+        """
+        import numpy
+        descr = repr(numpy.lib.format.dtype_to_descr(self.dtype)).encode()
+        size = _HEADER_PREFIX.size + len(descr) + 8*len(self.shape)
+        size = ((size + HEADER_ALIGNMENT - 1) // HEADER_ALIGNMENT) * HEADER_ALIGNMENT
+        self.header_size = size
+        header = _HEADER_PREFIX.pack(HEADER_MAGIC, HEADER_VERSION, ord(self.order),
+                                     len(self.shape), size, len(descr))
+        header += descr + struct.pack('<%dQ' % len(self.shape), *self.shape)
+        return header + b'\0' * (size - len(header))
+
+    @staticmethod
+    def required_size(buf):
+        """
+        Returns the full size of the header starting at the beginning
+        of buf (which must contain at least the fixed-size prefix).
+        """
+        magic, version, order, ndim, size, descr_size = _HEADER_PREFIX.unpack_from(buf)
+        if(magic != HEADER_MAGIC):
+            raise ValueError("Region does not start with a pybake array header")
+        if(version != HEADER_VERSION):
+            raise ValueError("Unsupported pybake array header version ("+str(version)+")")
+        return size
+
+    @staticmethod
+    def from_bytes(buf):
+        """
+        Decodes a header from buf (which must contain the full header).
+        """
+        import ast
+        import numpy
+        ArrayHeader.required_size(buf)
+        magic, version, order, ndim, size, descr_size = _HEADER_PREFIX.unpack_from(buf)
+        pos = _HEADER_PREFIX.size
+        descr = bytes(buf[pos:pos+descr_size]).decode()
+        pos += descr_size
+        shape = struct.unpack_from('<%dQ' % ndim, buf, pos)
+        dtype = numpy.lib.format.descr_to_dtype(ast.literal_eval(descr))
+        return ArrayHeader(dtype, shape, chr(order), size)
@@ -0,0 +1,473 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+from collections import OrderedDict
+import threading
+import time
+from pybake.client import BakeProviderHandle
+
+class RegionCache():
+    """
+    The RegionCache class is an LRU cache of region extents, keyed by
+    (target id, region id, offset) and bounded by a byte budget.
+    A lookup is a hit if a single cached extent fully covers the
+    requested range. The cache is thread-safe.
+
+    Reads and modifications of a region may run concurrently, so data
+    read before a modification completes must not be inserted after it
+    was invalidated. Every modification (begin_write, end_write,
+    invalidate) is numbered, and an extent is only inserted if the token
+    obtained before reading it is newer than the last modification of
+    its region and no modification of the region is in progress.
+    """
+
+    # number of regions whose last modification is remembered, past which
+    # they are forgotten and reads started before are not cached
+    _MAX_MODIFIED = 65536
+
+    def __init__(self, byte_budget):
+        """
+        Constructor.
+
+        Args:
+            byte_budget (int): maximum number of bytes to keep cached.
+        """
+        self.byte_budget = byte_budget
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()  # (region key, offset) -> data
+        self._regions = dict()     # region key -> { offset -> data }
+        self._size = 0
+        self._epoch = 0            # number of modifications so far
+        self._modified = dict()    # region key -> epoch of its last modification
+        self._floor = 0            # reads started before this epoch are not cached
+        self._writing = dict()     # region key -> number of modifications in progress
+        self.reset_stats()
+
+    @staticmethod
+    def key(tid, rid):
+        """
+        Returns the key identifying a region in the cache.
+        """
+        return (tid, rid)
+
+    def lookup(self, tid, rid, offset, size):
+        """
+        Returns a read-only memoryview of the requested range if it
+        is fully covered by a cached extent, None otherwise.
+        """
+        rkey = RegionCache.key(tid, rid)
+        with self._lock:
+            extents = self._regions.get(rkey)
+            if(extents is not None):
+                for start, data in extents.items():
+                    if(start <= offset and offset + size <= start + len(data)):
+                        self._lru.move_to_end((rkey, start))
+                        self.hits += 1
+                        self.bytes_hit += size
+                        return memoryview(data)[offset-start:offset-start+size]
+            self.misses += 1
+            return None
+
+    def token(self):
+        """
+        Returns the token to pass to insert for data read from now on.
+        """
+        with self._lock:
+            return self._epoch
+
+    def insert(self, tid, rid, offset, data, token=None):
+        """
+        Inserts an extent in the cache, evicting the least recently used
+        extents to stay within the byte budget. Extents larger than the
+        budget are not cached. data should not be modified afterwards.
+        If token (see token()) is provided, the extent is not inserted if
+        the region was modified since the token was obtained, or is being
+        modified.
+        """
+        if(len(data) > self.byte_budget or len(data) == 0):
+            return
+        rkey = RegionCache.key(tid, rid)
+        with self._lock:
+            if(token is not None and (token < self._floor or rkey in self._writing
+                    or self._modified.get(rkey, -1) > token)):
+                return
+            self._remove((rkey, offset))
+            self._lru[(rkey, offset)] = data
+            self._regions.setdefault(rkey, dict())[offset] = data
+            self._size += len(data)
+            while(self._size > self.byte_budget):
+                k, _ = next(iter(self._lru.items()))
+                self._remove(k)
+                self.evictions += 1
+
+    def begin_write(self, tid, rid, offset=0, size=-1):
+        """
+        Called before a modification of a region (write or removal) is
+        issued. Invalidates the overlapping extents and prevents the
+        region from being cached until end_write is called.
+        """
+        rkey = RegionCache.key(tid, rid)
+        with self._lock:
+            self._writing[rkey] = self._writing.get(rkey, 0) + 1
+            self._invalidate(rkey, offset, size)
+
+    def end_write(self, tid, rid, offset=0, size=-1):
+        """
+        Called when a modification started with begin_write completed
+        (successfully or not). Invalidates the overlapping extents again.
+        """
+        rkey = RegionCache.key(tid, rid)
+        with self._lock:
+            n = self._writing[rkey] - 1
+            if(n == 0):
+                del self._writing[rkey]
+            else:
+                self._writing[rkey] = n
+            self._invalidate(rkey, offset, size)
+
+    def invalidate(self, tid, rid, offset=0, size=-1):
+        """
+        Drops the cached extents of a region that overlap with the
+        [offset, offset+size) range (the whole region if size < 0).
+        """
+        with self._lock:
+            self._invalidate(RegionCache.key(tid, rid), offset, size)
+
+    def _invalidate(self, rkey, offset, size):
+        self._epoch += 1
+        if(len(self._modified) >= RegionCache._MAX_MODIFIED and rkey not in self._modified):
+            self._modified.clear()
+            self._floor = self._epoch
+        self._modified[rkey] = self._epoch
+        extents = self._regions.get(rkey)
+        if(extents is None):
+            return
+        for start, data in list(extents.items()):
+            if(size < 0 or (start < offset + size and offset < start + len(data))):
+                self._remove((rkey, start))
+                self.invalidations += 1
+
+    def clear(self):
+        """
+        Drops all the cached extents.
+        """
+        with self._lock:
+            self._lru.clear()
+            self._regions.clear()
+            self._size = 0
+            self._epoch += 1
+            self._modified.clear()
+            self._floor = self._epoch
+
+    def _remove(self, k):
+        data = self._lru.pop(k, None)
+        if(data is None):
+            return
+        rkey, offset = k
+        extents = self._regions[rkey]
+        del extents[offset]
+        if(len(extents) == 0):
+            del self._regions[rkey]
+        self._size -= len(data)
+
+    @property
+    def size(self):
+        """
+        Number of bytes currently cached.
+        """
+        return self._size
+
+    def stats(self):
+        """
+        Returns a dictionary of counters (hits, misses, evictions,
+        invalidations, bytes_hit, size, byte_budget).
+        """
+        return { 'hits'          : self.hits,
+                 'misses'        : self.misses,
+                 'evictions'     : self.evictions,
+                 'invalidations' : self.invalidations,
+                 'bytes_hit'     : self.bytes_hit,
+                 'size'          : self._size,
+                 'byte_budget'   : self.byte_budget }
+
+    def reset_stats(self):
+        """
+        Resets the counters.
+        """
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bytes_hit = 0
+
+class CachedBakeProviderHandle(BakeProviderHandle):
+    """
+    The CachedBakeProviderHandle class is a BakeProviderHandle that keeps
+    the result of read and read_numpy calls in a RegionCache. Reads fully
+    covered by a cached extent are served without an RPC, as read-only
+    memoryviews (read) or read-only numpy arrays (read_numpy). Writes and
+    removals issued through this handle (including those of execute)
+    invalidate the affected extents, and reads running concurrently with
+    them are not cached; persist does not change the content of a region
+    and leaves the cache untouched. Modifications made by other clients or
+    handles are not seen until the corresponding extents are evicted or
+    invalidated.
+    """
+
+    def __init__(self, ph, client=None, address=None, provider_id=None, byte_budget=64*1024*1024):
+        """
+        Constructor. This is not supposed to be called by users.
+        Users should create a CachedBakeProviderHandle from a BakeClient
+        clt by calling clt.create_cached_provider_handle.
+        """
+        super(CachedBakeProviderHandle, self).__init__(ph, client, address, provider_id)
+        self.cache = RegionCache(byte_budget)
+
+    def read(self, tid, rid, offset=0, size=-1):
+        """
+        See BakeProviderHandle.read. Returns a read-only memoryview.
+        """
+        if(size < 0):
+            size = self.get_size(tid, rid) - offset
+        data = self.cache.lookup(tid, rid, offset, size)
+        if(data is not None):
+            return data
+        token = self.cache.token()
+        data = super(CachedBakeProviderHandle, self).read(tid, rid, offset, size)
+        self.cache.insert(tid, rid, offset, data, token)
+        return memoryview(data)
+
+    def read_into(self, tid, rid, offset, buffer):
+        """
+        See BakeProviderHandle.read_into.
+        """
+        view = memoryview(buffer).cast('B')
+        data = self.read(tid, rid, offset, len(view))
+        view[:len(data)] = data
+        return len(data)
+
+    def read_numpy(self, tid, rid, offset, shape=None, dtype=None, out=None):
+        """
+        See BakeProviderHandle.read_numpy. If out is not provided,
+        the returned array is read-only and shares its memory with
+        the cache.
+        """
+        import numpy
+        if(out is not None):
+            shape, dtype = out.shape, out.dtype
+        dtype = numpy.dtype(dtype)
+        size = dtype.itemsize
+        for s in shape:
+            size *= s
+        data = self.read(tid, rid, offset, size)
+        if(len(data) != size):
+            raise RuntimeError("bake_read could not read full numpy object")
+        result = numpy.frombuffer(data, dtype=dtype).reshape(shape)
+        if(out is not None):
+            out[...] = result
+            return out
+        return result
+
+    def _modify(self, ranges, modify):
+        """
+        Calls modify() between begin_write and end_write calls
+        for each (tid, rid[, offset, size]) range it modifies.
+        """
+        for r in ranges:
+            self.cache.begin_write(*r)
+        try:
+            return modify()
+        finally:
+            for r in ranges:
+                self.cache.end_write(*r)
+
+    def _modify_async(self, r, submit):
+        """
+        Asynchronous version of _modify for a single range: end_write
+        is called when the future returned by submit() completes.
+        """
+        self.cache.begin_write(*r)
+        try:
+            future = submit()
+        except BaseException:
+            self.cache.end_write(*r)
+            raise
+        future.add_done_callback(lambda f: self.cache.end_write(*r))
+        return future
+
+    def write(self, tid, rid, offset, data):
+        """
+        See BakeProviderHandle.write. Invalidates the overlapping cached extents.
+        """
+        if(isinstance(data,str)):
+            data = data.encode()
+        self._modify([ (tid, rid, offset, memoryview(data).nbytes) ],
+                lambda: super(CachedBakeProviderHandle, self).write(tid, rid, offset, data))
+
+    def write_numpy(self, tid, rid, offset, array):
+        """
+        See BakeProviderHandle.write_numpy. Invalidates the overlapping cached extents.
+        """
+        self._modify([ (tid, rid, offset, array.nbytes) ],
+                lambda: super(CachedBakeProviderHandle, self).write_numpy(tid, rid, offset, array))
+
+    def proxy_write(self, tid, rid, bulk, size, offset_in_region=0, offset_in_bulk=0, remote_addr=''):
+        """
+        See BakeProviderHandle.proxy_write. Invalidates the overlapping cached extents.
+        """
+        self._modify([ (tid, rid, offset_in_region, size) ],
+                lambda: super(CachedBakeProviderHandle, self).proxy_write(tid, rid, bulk, size,
+                    offset_in_region, offset_in_bulk, remote_addr))
+
+    def write_many(self, ops):
+        """
+        See BakeProviderHandle.write_many. Invalidates the overlapping cached extents.
+        """
+        ranges = []
+        for tid, rid, offset, data in ops:
+            if(isinstance(data,str)):
+                data = data.encode()
+            ranges.append((tid, rid, offset, memoryview(data).nbytes))
+        self._modify(ranges, lambda: super(CachedBakeProviderHandle, self).write_many(ops))
+
+    def write_async(self, tid, rid, offset, data):
+        """
+        See BakeProviderHandle.write_async. Invalidates the overlapping
+        cached extents, at submission and at completion.
+        """
+        if(isinstance(data,str)):
+            data = data.encode()
+        return self._modify_async((tid, rid, offset, memoryview(data).nbytes),
+                lambda: super(CachedBakeProviderHandle, self).write_async(tid, rid, offset, data))
+
+    def remove(self, tid, rid):
+        """
+        See BakeProviderHandle.remove. Invalidates the cached extents of the region.
+        """
+        self._modify([ (tid, rid) ],
+                lambda: super(CachedBakeProviderHandle, self).remove(tid, rid))
+
+    def remove_many(self, ops):
+        """
+        See BakeProviderHandle.remove_many. Invalidates the cached extents of the regions.
+        """
+        self._modify([ (tid, rid) for tid, rid in ops ],
+                lambda: super(CachedBakeProviderHandle, self).remove_many(ops))
+
+    def remove_async(self, tid, rid):
+        """
+        See BakeProviderHandle.remove_async. Invalidates the cached extents of the region.
+        """
+        return self._modify_async((tid, rid),
+                lambda: super(CachedBakeProviderHandle, self).remove_async(tid, rid))
+
+    def execute(self, ops, return_exceptions=False):
+        """
+        See BakeProviderHandle.execute. Invalidates the cached extents
+        overlapping the write operations and those of the removed regions.
+        """
+        ranges = []
+        for op in ops:
+            if(op[0] == 'write'):
+                data = op[4].encode() if isinstance(op[4], str) else op[4]
+                ranges.append((op[1], op[2], op[3], memoryview(data).nbytes))
+            elif(op[0] == 'remove'):
+                ranges.append((op[1], op[2]))
+        return self._modify(ranges,
+                lambda: super(CachedBakeProviderHandle, self).execute(ops, return_exceptions))
+
+    def _region_removed(self, tid, rid):
+        super(CachedBakeProviderHandle, self)._region_removed(tid, rid)
+        self.cache.invalidate(tid, rid)
+
+    def migrate_region(self, source_tid, source_rid, dest_addr, dest_provider_id, dest_target, remove_source=True, region_size=None):
+        """
+        See BakeProviderHandle.migrate_region. Invalidates the cached extents
+        of the source region if it is removed.
+        """
+        migrate = lambda: super(CachedBakeProviderHandle, self).migrate_region(source_tid, source_rid,
+                dest_addr, dest_provider_id, dest_target, remove_source, region_size)
+        if(remove_source):
+            return self._modify([ (source_tid, source_rid) ], migrate)
+        return migrate()
+
+class TargetDirectoryCache():
+    """
+    The TargetDirectoryCache class caches the lists of targets returned by
+    probe, keyed by (address, provider id), for ttl seconds. Concurrent
+    probes of the same provider are coalesced: only one of them sends an
+    RPC and the others wait for its result. The cache is thread-safe.
+    """
+
+    def __init__(self, ttl=60.0):
+        """
+        Constructor.
+
+        Args:
+            ttl (float): number of seconds during which a list of targets
+                is considered valid (None for no expiration).
+        """
+        self.ttl = ttl
+        self._entries = dict() # (address, provider_id) -> (time, list of BakeTargetIDs)
+        self._inflight = dict() # (address, provider_id) -> threading.Event
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key, fetch):
+        """
+        Returns the list of BakeTargetIDs cached for the given key,
+        calling fetch() to obtain it if it is absent or expired.
+        """
+        while(True):
+            with self._lock:
+                entry = self._entries.get(key)
+                if(entry is not None and (self.ttl is None or time.monotonic() - entry[0] < self.ttl)):
+                    self._hits += 1
+                    return entry[1]
+                event = self._inflight.get(key)
+                if(event is None):
+                    self._misses += 1
+                    event = threading.Event()
+                    self._inflight[key] = event
+                    break
+            # another thread is probing the same provider
+            event.wait()
+            with self._lock:
+                entry = self._entries.get(key)
+                if(entry is not None):
+                    self._hits += 1
+                    return entry[1]
+            # the other probe failed, try again
+        try:
+            tids = fetch()
+            with self._lock:
+                self._entries[key] = (time.monotonic(), tids)
+            return tids
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    def invalidate(self, address=None, provider_id=None):
+        """
+        Invalidates the entry of the given address and provider id,
+        the entries of all providers at the given address if
+        provider_id is None, or all the entries if address is None.
+        """
+        with self._lock:
+            if(address is None):
+                self._entries.clear()
+            elif(provider_id is None):
+                for key in [ k for k in self._entries if k[0] == address ]:
+                    del self._entries[key]
+            else:
+                self._entries.pop((address, provider_id), None)
+
+    def stats(self):
+        """
+        Returns a dictionary with the number of entries, hits and misses.
+        """
+        with self._lock:
+            return { 'entries' : len(self._entries),
+                     'hits'    : self._hits,
+                     'misses'  : self._misses }
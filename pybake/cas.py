@@ -0,0 +1,232 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import hashlib
+import os
+import struct
+import threading
+from pybake.target import BakeTargetID, BakeRegionID, TARGET_ID_SIZE, REGION_ID_SIZE
+
+DIGEST_SIZE = 32
+
+def content_digest(data, chunk_size=1024*1024):
+    """
+    Returns the BLAKE2b digest (DIGEST_SIZE bytes) of a bytes-like object.
+    Large objects are hashed chunk by chunk through a memoryview, so that
+    they are not copied; hashlib releases the GIL while hashing each chunk.
+    """
+    if(isinstance(data, str)):
+        data = data.encode()
+    view = memoryview(data).cast('B')
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for i in range(0, len(view), chunk_size):
+        h.update(view[i:i+chunk_size])
+    return h.digest()
+
+class ContentStore():
+    """
+    The ContentStore class is a content-addressed, deduplicating store on
+    top of a BakeProviderHandle. put(data) stores a payload and returns its
+    digest; payloads that are already in the store are not written again,
+    their reference count is incremented instead. get(digest) returns the
+    payload and remove(digest) decrements the reference count, removing the
+    region when it reaches zero.
+
+    The digest -> (region, size, reference count) index is kept in memory
+    and can be persisted to a file with save(); if index_path is provided,
+    the index is loaded from it when the store is created and saved to it
+    by close(). The store is thread-safe, but a given target (or index
+    file) must only be managed by one ContentStore at a time.
+    """
+
+    _HEADER = struct.Struct('<4sHH%dsQ' % TARGET_ID_SIZE)
+    _RECORD = struct.Struct('<%ds%dsQQ' % (DIGEST_SIZE, REGION_ID_SIZE))
+    _MAGIC  = b'PBKC'
+    _VERSION = 1
+
+    def __init__(self, ph, tid, index_path=None, hash_chunk_size=1024*1024):
+        """
+        Constructor.
+
+        Args:
+            ph (BakeProviderHandle): provider handle to use.
+            tid (BakeTargetID): target in which to store the payloads.
+            index_path (str): file from which to load (and to which to save)
+                the index.
+            hash_chunk_size (int): size of the chunks in which payloads are hashed.
+        """
+        self._ph = ph
+        self.tid = tid
+        self.index_path = index_path
+        self._hash_chunk_size = hash_chunk_size
+        self._index = dict() # digest -> [BakeRegionID, size, refcount]
+        self._lock = threading.Lock()
+        self._logical_bytes = 0
+        self._written_bytes = 0
+        if(index_path is not None and os.path.exists(index_path)):
+            self._load(index_path)
+
+    def _load(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, digest_size, tid, count = ContentStore._HEADER.unpack_from(data)
+        if(magic != ContentStore._MAGIC or version != ContentStore._VERSION
+                or digest_size != DIGEST_SIZE):
+            raise ValueError("Invalid content store index "+str(path))
+        if(tid != self.tid.to_bytes()):
+            raise ValueError("Content store index "+str(path)+" belongs to another target")
+        pos = ContentStore._HEADER.size
+        for i in range(count):
+            digest, rid, size, refcount = ContentStore._RECORD.unpack_from(data, pos)
+            pos += ContentStore._RECORD.size
+            self._index[digest] = [ BakeRegionID.from_bytes(rid), size, refcount ]
+
+    def save(self, path=None):
+        """
+        Saves the index to a file (index_path by default). The file is
+        replaced atomically.
+        """
+        path = path if path is not None else self.index_path
+        if(path is None):
+            raise ValueError("No path to save the content store index to")
+        with self._lock:
+            records = [ ContentStore._HEADER.pack(ContentStore._MAGIC, ContentStore._VERSION,
+                            DIGEST_SIZE, self.tid.to_bytes(), len(self._index)) ]
+            for digest, (rid, size, refcount) in self._index.items():
+                records.append(ContentStore._RECORD.pack(digest, rid.to_bytes(), size, refcount))
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(b''.join(records))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _key(digest):
+        if(isinstance(digest, str)):
+            return bytes.fromhex(digest)
+        return bytes(digest)
+
+    def put(self, data):
+        """
+        Stores a payload if it is not already in the store, increments its
+        reference count otherwise. Returns its digest (bytes).
+
+        Args:
+            data (str or bytes-like): payload to store.
+        """
+        if(isinstance(data, str)):
+            data = data.encode()
+        digest = content_digest(data, self._hash_chunk_size)
+        size = memoryview(data).nbytes
+        with self._lock:
+            self._logical_bytes += size
+            entry = self._index.get(digest)
+            if(entry is not None):
+                entry[2] += 1
+                return digest
+        rid = self._ph.create_write_persist(self.tid, data)
+        with self._lock:
+            entry = self._index.get(digest)
+            if(entry is None):
+                self._index[digest] = [ rid, size, 1 ]
+                self._written_bytes += size
+                return digest
+            # another thread stored the same payload in the meantime
+            entry[2] += 1
+        self._ph.remove(self.tid, rid)
+        return digest
+
+    def _entry(self, digest):
+        with self._lock:
+            entry = self._index.get(self._key(digest))
+            if(entry is None):
+                raise KeyError("Unknown digest "+self._key(digest).hex())
+            return (entry[0], entry[1])
+
+    def get(self, digest, verify=False):
+        """
+        Returns the payload (bytes) with the given digest.
+
+        Args:
+            digest (bytes or str): digest returned by put (or its hex form).
+            verify (bool): whether to check the digest of the data read.
+        """
+        rid, size = self._entry(digest)
+        data = self._ph.read(self.tid, rid, 0, size)
+        if(verify and content_digest(data, self._hash_chunk_size) != self._key(digest)):
+            raise ValueError("Data read for digest "+self._key(digest).hex()+" is corrupted")
+        return data
+
+    def get_into(self, digest, buffer):
+        """
+        Reads the payload with the given digest into a writable buffer,
+        which should be at least size(digest) bytes long.
+        Returns the number of bytes read.
+        """
+        rid, size = self._entry(digest)
+        return self._ph.read_into(self.tid, rid, 0, memoryview(buffer).cast('B')[:size])
+
+    def size(self, digest):
+        """
+        Returns the size of the payload with the given digest.
+        """
+        return self._entry(digest)[1]
+
+    def refcount(self, digest):
+        """
+        Returns the reference count of a digest (0 if it is not in the store).
+        """
+        with self._lock:
+            entry = self._index.get(self._key(digest))
+            return 0 if entry is None else entry[2]
+
+    def __contains__(self, digest):
+        return self.refcount(digest) != 0
+
+    def __len__(self):
+        return len(self._index)
+
+    def remove(self, digest):
+        """
+        Decrements the reference count of a digest, removing the payload
+        from the target when it reaches zero. Returns the new reference count.
+        """
+        key = self._key(digest)
+        with self._lock:
+            entry = self._index.get(key)
+            if(entry is None):
+                raise KeyError("Unknown digest "+key.hex())
+            entry[2] -= 1
+            if(entry[2] != 0):
+                return entry[2]
+            del self._index[key]
+        self._ph.remove(self.tid, entry[0])
+        return 0
+
+    def stats(self):
+        """
+        Returns a dictionary with the number of distinct payloads, the
+        number of bytes stored in the target, the number of bytes put
+        since the store was created, the number of bytes actually written,
+        and the deduplication ratio (bytes put / bytes written).
+        """
+        with self._lock:
+            stored = sum(e[1] for e in self._index.values())
+            return { 'payloads'      : len(self._index),
+                     'stored_bytes'  : stored,
+                     'put_bytes'     : self._logical_bytes,
+                     'written_bytes' : self._written_bytes,
+                     'dedup_ratio'   : self._logical_bytes / max(1, self._written_bytes) }
+
+    def close(self):
+        """
+        Saves the index to index_path, if provided.
+        """
+        if(self.index_path is not None):
+            self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,409 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import base64
+import bisect
+import json
+import os
+import struct
+import threading
+from pybake.target import BakeRegionID, TARGET_ID_SIZE, REGION_ID_SIZE
+
+# Bake cannot enumerate the regions of a target, so the regions created
+# and removed by clients that track them (BakeClient(track_regions=True))
+# are recorded in a catalog kept by the BakeProvider, which clients
+# update in batches and query page by page through the RPCs below. This
+# is not an enumeration of the target: regions created by clients that
+# do not track them are not in the catalog, so it cannot be used to find
+# leaked regions.
+UPDATE_RPC = 'pybake_catalog_update'
+LIST_RPC   = 'pybake_catalog_list'
+
+_ADD    = 1
+_REMOVE = 2
+
+# record of an update sent by a client: (op, target id, region id, size)
+_UPDATE_RECORD = struct.Struct('<B%ds%dsQ' % (TARGET_ID_SIZE, REGION_ID_SIZE))
+# record of a catalog's log file: (op, region id, size)
+_LOG_RECORD = struct.Struct('<B%dsQ' % REGION_ID_SIZE)
+_SIZE = struct.Struct('<Q')
+
+REGION_ENTRY_SIZE = REGION_ID_SIZE + _SIZE.size
+
+def region_entry_dtype():
+    """
+    Returns the numpy structured datatype of the entries returned by
+    list_regions: an 'id' field of REGION_ID_SIZE raw bytes (which can be
+    converted using pybake.target.region_ids_from_numpy) and a 'size' field.
+    """
+    import numpy
+    return numpy.dtype([('id', 'V%d' % REGION_ID_SIZE), ('size', '<u8')])
+
+def entries_to_numpy(blob):
+    """
+    Converts packed entries, as returned by RegionCatalog.list,
+    into a numpy array of datatype region_entry_dtype().
+    """
+    import numpy
+    return numpy.frombuffer(blob, dtype=region_entry_dtype())
+
+class RegionCatalog():
+    """
+    The RegionCatalog class keeps the ids and sizes of the regions of a
+    target, sorted by id so that they can be listed page by page while
+    regions are added and removed. If a path is provided, updates are
+    appended to a log file at this path, which is replayed (and compacted)
+    when the catalog is opened again. The log file is only created at the
+    first update. If it cannot be written, the catalog keeps working in
+    memory only, and the error is available in log_error. The catalog is
+    thread-safe.
+    """
+
+    def __init__(self, path=None):
+        """
+        Constructor.
+
+        Args:
+            path (str): log file in which to persist the catalog.
+        """
+        self._regions = dict() # raw region id -> size
+        self._sorted = []      # raw region ids, kept sorted
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._path = path
+        self._log = None
+        self.log_error = None
+        if(path is not None):
+            self._open(path)
+
+    def _open(self, path):
+        records = 0
+        if(os.path.exists(path)):
+            with open(path, 'rb') as f:
+                data = f.read()
+            end = len(data) - len(data) % _LOG_RECORD.size
+            for op, rid, size in _LOG_RECORD.iter_unpack(data[:end]):
+                if(op == _ADD):
+                    self._regions[rid] = size
+                else:
+                    self._regions.pop(rid, None)
+                records += 1
+        self._bytes = sum(self._regions.values())
+        self._sorted = sorted(self._regions)
+        if(records > 2*len(self._regions) + 1024):
+            tmp = path + '.tmp'
+            try:
+                with open(tmp, 'wb') as f:
+                    for rid, size in self._regions.items():
+                        f.write(_LOG_RECORD.pack(_ADD, rid, size))
+                os.replace(tmp, path)
+            except OSError as e:
+                self.log_error = e
+
+    def update(self, records):
+        """
+        Applies a sequence of (op, raw region id, size) updates, where op
+        is 1 for an added region and 2 for a removed region.
+        """
+        with self._lock:
+            log = []
+            for op, rid, size in records:
+                if(op == _ADD):
+                    old = self._regions.get(rid)
+                    if(old is None):
+                        bisect.insort(self._sorted, rid)
+                        old = 0
+                    self._bytes += size - old
+                    self._regions[rid] = size
+                elif(op == _REMOVE):
+                    old = self._regions.pop(rid, None)
+                    if(old is None):
+                        continue
+                    del self._sorted[bisect.bisect_left(self._sorted, rid)]
+                    self._bytes -= old
+                else:
+                    raise ValueError("Invalid catalog operation "+str(op))
+                log.append(_LOG_RECORD.pack(op, rid, size))
+            if(self._path is not None and len(log) != 0):
+                self._append(b''.join(log))
+
+    def _append(self, data):
+        try:
+            if(self._log is None):
+                self._log = open(self._path, 'ab')
+            self._log.write(data)
+            self._log.flush()
+        except OSError as e:
+            self.log_error = e
+            self._path = None
+            if(self._log is not None):
+                self._log.close()
+                self._log = None
+
+    def add(self, rid, size):
+        """
+        Adds a region (BakeRegionID) of a given size to the catalog.
+        """
+        self.update([ (_ADD, rid.to_bytes(), size) ])
+
+    def remove(self, rid):
+        """
+        Removes a region (BakeRegionID) from the catalog.
+        """
+        self.update([ (_REMOVE, rid.to_bytes(), 0) ])
+
+    def list(self, start_after=None, max_regions=65536, min_size=0, max_size=None):
+        """
+        Lists regions in increasing order of their raw ids.
+
+        Args:
+            start_after (bytes): raw id after which to start (None to start
+                from the beginning).
+            max_regions (int): maximum number of regions to return (> 0).
+            min_size (int): only list regions of at least min_size bytes.
+            max_size (int): only list regions of at most max_size bytes.
+
+        Returns:
+            A tuple (entries, next) where entries is a bytes object packing
+            the raw id and size (little-endian 64-bit) of each region, and
+            next is the raw id to pass as start_after to get the next page,
+            or None if there are no more regions.
+        """
+        if(max_regions <= 0):
+            raise ValueError("max_regions should be positive")
+        with self._lock:
+            keys = self._sorted
+            i = 0 if start_after is None else bisect.bisect_right(keys, bytes(start_after))
+            result = []
+            count = 0
+            while(i < len(keys) and count < max_regions):
+                rid = keys[i]
+                size = self._regions[rid]
+                i += 1
+                if(size < min_size or (max_size is not None and size > max_size)):
+                    continue
+                result.append(rid)
+                result.append(_SIZE.pack(size))
+                count += 1
+            nxt = keys[i-1] if i < len(keys) else None
+            return (b''.join(result), nxt)
+
+    def __len__(self):
+        return len(self._regions)
+
+    def stats(self):
+        """
+        Returns a dictionary with the number of regions in the
+        catalog and the sum of their sizes.
+        """
+        with self._lock:
+            return { 'regions' : len(self._regions), 'bytes' : self._bytes }
+
+    def close(self):
+        """
+        Closes the log file of the catalog.
+        """
+        with self._lock:
+            self._path = None
+            if(self._log is not None):
+                self._log.close()
+                self._log = None
+
+def _encode(header, blob=b''):
+    return json.dumps(header) + '\n' + base64.b64encode(blob).decode()
+
+def _decode(message):
+    header, _, blob = message.partition('\n')
+    return (json.loads(header), base64.b64decode(blob))
+
+def _b64(raw):
+    return None if raw is None else base64.b64encode(raw).decode()
+
+def _unb64(s):
+    return None if s is None else base64.b64decode(s)
+
+def handle_disabled(payload):
+    """
+    Answers an update or list request sent to a provider
+    whose region catalog is disabled.
+    """
+    return _encode({ 'error' : 'the region catalog of this provider is disabled' })
+
+def handle_update(catalogs, payload):
+    """
+    Applies an update message sent by a CatalogClient to a dictionary
+    of RegionCatalogs keyed by raw target id. Returns the response.
+    """
+    header, blob = _decode(payload)
+    per_target = dict()
+    for op, tid, rid, size in _UPDATE_RECORD.iter_unpack(blob):
+        per_target.setdefault(tid, []).append((op, rid, size))
+    unknown = 0
+    for tid, records in per_target.items():
+        catalog = catalogs.get(tid)
+        if(catalog is None):
+            unknown += len(records)
+            continue
+        catalog.update(records)
+    return _encode({ 'unknown' : unknown })
+
+def handle_list(catalogs, payload):
+    """
+    Answers a list request sent by a CatalogClient using a dictionary
+    of RegionCatalogs keyed by raw target id. Returns the response.
+    """
+    header, _ = _decode(payload)
+    catalog = catalogs.get(_unb64(header['tid']))
+    if(catalog is None):
+        return _encode({ 'error' : 'unknown target' })
+    try:
+        entries, nxt = catalog.list(_unb64(header['start_after']), header['max_regions'],
+                header['min_size'], header['max_size'])
+    except ValueError as e:
+        return _encode({ 'error' : str(e) })
+    return _encode({ 'next' : _b64(nxt) }, entries)
+
+class CatalogClient():
+    """
+    The CatalogClient class sends the regions created and removed by the
+    provider handles of a BakeClient to the catalogs of their providers.
+    Updates are buffered per provider and sent in batches of batch_size
+    records, or when flush is called. Listing the regions of a provider
+    first flushes the updates pending for it. The client is thread-safe.
+
+    Updates are recorded by provider handles as part of creating and
+    removing regions, which must not fail because of the catalog: when a
+    batch cannot be sent (e.g. the provider was not started by pybake),
+    its updates are dropped and counted in stats(), and only flush raises
+    the error.
+    """
+
+    def __init__(self, client, batch_size=1024):
+        """
+        Constructor. This is not supposed to be called by users.
+        """
+        self._client = client
+        self._batch_size = batch_size
+        self._pending = dict() # (address, provider id) -> list of packed records
+        self._lock = threading.Lock()
+        self._stats = { 'sent' : 0, 'dropped' : 0, 'errors' : 0 }
+        self._last_error = None
+        mid = client._mid
+        self._update_rpc = mid.register(UPDATE_RPC)
+        self._list_rpc = mid.register(LIST_RPC)
+
+    def _forward(self, rpc_id, address, provider_id, message):
+        addr = self._client.lookup(address)
+        handle = self._client._mid.create_handle(addr, rpc_id)
+        header, blob = _decode(handle.forward(provider_id, message))
+        if('error' in header):
+            raise RuntimeError("Region catalog request failed: "+header['error'])
+        return (header, blob)
+
+    def _record(self, address, provider_id, record):
+        key = (address, provider_id)
+        with self._lock:
+            pending = self._pending.setdefault(key, [])
+            pending.append(record)
+            if(len(pending) < self._batch_size):
+                return
+            del self._pending[key]
+        self._send(key, pending)
+
+    def _send(self, key, records):
+        """
+        Sends a batch of updates to a provider. Returns None, or the
+        exception raised if the batch could not be sent, in which case
+        its updates are dropped.
+        """
+        try:
+            self._forward(self._update_rpc, key[0], key[1], _encode({}, b''.join(records)))
+        except Exception as e:
+            with self._lock:
+                self._stats['dropped'] += len(records)
+                self._stats['errors'] += 1
+                self._last_error = str(e)
+            return e
+        with self._lock:
+            self._stats['sent'] += len(records)
+        return None
+
+    def added(self, address, provider_id, tid, rid, size):
+        """
+        Records that a region (BakeRegionID) of a given size was
+        created in the target tid of the specified provider.
+        """
+        self._record(address, provider_id,
+                _UPDATE_RECORD.pack(_ADD, tid.to_bytes(), rid.to_bytes(), size))
+
+    def removed(self, address, provider_id, tid, rid):
+        """
+        Records that a region was removed from the target tid
+        of the specified provider.
+        """
+        self._record(address, provider_id,
+                _UPDATE_RECORD.pack(_REMOVE, tid.to_bytes(), rid.to_bytes(), 0))
+
+    def flush(self, address=None, provider_id=None, raise_errors=True):
+        """
+        Sends the pending updates of the specified provider, or of all
+        providers if address is None. If raise_errors is True, raises the
+        first error encountered once all the batches have been sent.
+        """
+        with self._lock:
+            if(address is None):
+                batches = list(self._pending.items())
+                self._pending.clear()
+            else:
+                key = (address, provider_id)
+                records = self._pending.pop(key, None)
+                batches = [] if records is None else [ (key, records) ]
+        first_error = None
+        for key, records in batches:
+            error = self._send(key, records)
+            if(first_error is None):
+                first_error = error
+        if(first_error is not None and raise_errors):
+            raise first_error
+
+    def stats(self):
+        """
+        Returns a dictionary with the number of updates sent, of updates
+        dropped because their batch could not be sent, of failed batches,
+        and the message of the last error (or None).
+        """
+        with self._lock:
+            result = dict(self._stats)
+            result['last_error'] = self._last_error
+        return result
+
+    def list(self, address, provider_id, tid, start_after=None, max_regions=65536,
+             min_size=0, max_size=None):
+        """
+        Lists the regions of a target of the specified provider
+        (see RegionCatalog.list).
+        """
+        if(max_regions <= 0):
+            raise ValueError("max_regions should be positive")
+        self.flush(address, provider_id)
+        header = { 'tid' : _b64(tid.to_bytes()),
+                   'start_after' : _b64(start_after),
+                   'max_regions' : max_regions,
+                   'min_size' : min_size,
+                   'max_size' : max_size }
+        header, entries = self._forward(self._list_rpc, address, provider_id, _encode(header))
+        return (entries, _unb64(header['next']))
+
+def list_pages(list_fn, tid, page_size, min_size, max_size):
+    """
+    Generator calling list_fn(tid, start_after, page_size, min_size, max_size)
+    (i.e. list_regions) until all the regions have been listed, yielding
+    each page.
+    """
+    start_after = None
+    while(True):
+        entries, nxt = list_fn(tid, start_after, page_size, min_size, max_size)
+        if(len(entries) != 0):
+            yield entries
+        if(nxt is None):
+            return
+        start_after = nxt
@@ -1,8 +1,16 @@
 # (C) 2018 The University of Chicago
 # See COPYRIGHT in top-level directory.
-import _pybakeclient
+from pybake._pybake import client as _pybakeclient
 from pybake.target import *
-import pymargo
+from pybake.array import ArrayHeader, HEADER_ALIGNMENT
+import re
+import threading
+import weakref
+
+# Transfers smaller than this go through RPCs even when the co-located
+# fast path is enabled: resolving the address of a region costs two
+# loopback calls to the provider, which outweigh the RPC they replace.
+LOCAL_FAST_PATH_MIN_SIZE = 64*1024
 
 class BakeClient():
     """
@@ -11,14 +19,152 @@ class BakeClient():
     It can be used to create provider handles pointing to Bake providers.
     """
 
-    def __init__(self, mid):
+    def __init__(self, mid, local_fast_path=False, track_regions=False):
         """
         Constructor. Initializes a new BakeClient with a MargoInstance.
 
         Args:
             mid (MargoInstance): MargoInstance on which to register RPCs.
+            local_fast_path (bool): whether provider handles pointing to
+                providers running in the same MargoInstance should access
+                their regions directly instead of sending RPCs for
+                large transfers (see BakeProviderHandle). Disabled by
+                default.
+            track_regions (bool): whether the provider handles created by
+                this client should record the regions they create and remove
+                in their provider's region catalog (see pybake.catalog),
+                which must be enabled on the provider
+                (BakeProvider(region_catalog=True)).
         """
+        self._mid = mid
         self._client = _pybakeclient.client_init(mid._mid)
+        self._cq = None
+        self._batch_queues = threading.local()
+        self._batch_queue_finalizers = []
+        self._batch_queues_lock = threading.Lock()
+        self._stats_reporter = None
+        self._pool = None
+        self._local_fast_path = local_fast_path
+        self._local_unsupported = set()
+        self._self_addr = None
+        self._track_regions = track_regions
+        self._catalog = None
+        self._target_cache = None
+        self._locator = None
+        self._creator = None
+
+    def enable_target_cache(self, ttl=60.0):
+        """
+        Enables caching of the lists of targets returned by the probe method
+        of the provider handles created by this client. Lists are shared by
+        all the handles to the same (address, provider id) and kept for ttl
+        seconds; concurrent probes of the same provider send a single RPC.
+        Calling this method again changes the TTL and keeps cached lists.
+
+        Args:
+            ttl (float): number of seconds during which a list of targets
+                is valid (None for no expiration).
+        """
+        if(self._target_cache is None):
+            from pybake.cache import TargetDirectoryCache
+            self._target_cache = TargetDirectoryCache(ttl)
+        else:
+            self._target_cache.ttl = ttl
+
+    def disable_target_cache(self):
+        """
+        Disables (and empties) the cache enabled by enable_target_cache.
+        """
+        self._target_cache = None
+
+    def invalidate_target_cache(self, address=None, provider_id=None):
+        """
+        Invalidates the cached list of targets of a provider, of all the
+        providers at an address (if provider_id is None), or of all the
+        providers (if address is None).
+
+        Args:
+            address (str): address of the provider(s).
+            provider_id (int): provider id.
+        """
+        if(self._target_cache is not None):
+            self._target_cache.invalidate(None if address is None else str(address), provider_id)
+
+    def _region_catalog(self):
+        """
+        Returns the CatalogClient used to update and query the region
+        catalogs of providers, creating it if needed.
+        """
+        if(self._catalog is None):
+            from pybake.catalog import CatalogClient
+            self._catalog = CatalogClient(self)
+        return self._catalog
+
+    def flush_region_catalogs(self):
+        """
+        Sends the pending updates of the region catalogs of all providers
+        (see BakeClient's track_regions argument).
+        """
+        if(self._catalog is not None):
+            self._catalog.flush()
+
+    def _is_local(self, address):
+        """
+        Returns whether the given address (as a string) is the address
+        of this client's MargoInstance and the local fast path is enabled.
+        """
+        if(not self._local_fast_path or address is None):
+            return False
+        if(self._self_addr is None):
+            self._self_addr = str(self._mid.addr())
+        return address == self._self_addr
+
+    def _region_locator(self):
+        """
+        Returns the RegionLocator used by the provider handles of this
+        client that have local access enabled, creating it if needed.
+        """
+        if(self._locator is None):
+            from pybake.mapped import RegionLocator
+            self._locator = RegionLocator(self)
+        return self._locator
+
+    def _create_many_client(self):
+        """
+        Returns the CreateManyClient used by BakeProviderHandle.create_many,
+        creating it if needed.
+        """
+        if(self._creator is None):
+            from pybake.allocator import CreateManyClient
+            self._creator = CreateManyClient(self)
+        return self._creator
+
+    def _completion_queue(self):
+        """
+        Returns the _CompletionQueue used by the *_async methods of the
+        provider handles created by this client, creating it if needed.
+        """
+        if(self._cq is None):
+            self._cq = _CompletionQueue(self._mid)
+        return self._cq
+
+    def _batch_queue(self):
+        """
+        Returns the _BatchQueue of the calling thread, used by
+        BakeProviderHandle.execute, creating it if needed. The queue is
+        only referenced by the thread's local storage, so its native
+        completion queue is destroyed when the thread exits (or when the
+        client is finalized, whichever comes first).
+        """
+        q = getattr(self._batch_queues, 'queue', None)
+        if(q is None):
+            q = _BatchQueue(self._mid)
+            self._batch_queues.queue = q
+            f = weakref.finalize(q, _destroy_batch_queue, q._cq)
+            with self._batch_queues_lock:
+                self._batch_queue_finalizers = [ g for g in self._batch_queue_finalizers if g.alive ]
+                self._batch_queue_finalizers.append(f)
+        return q
 
     def create_provider_handle(self, addr, provider_id):
         """
@@ -30,7 +176,141 @@ class BakeClient():
             provider_id (int): ID of the provider.
         """
         ph = _pybakeclient.provider_handle_create(self._client, addr._hg_addr, provider_id)
-        return BakeProviderHandle(ph)
+        return BakeProviderHandle(ph, self, str(addr), provider_id)
+
+    def _handle_pool(self):
+        """
+        Returns the ProviderHandlePool used by get_handle,
+        creating it if needed.
+        """
+        if(self._pool is None):
+            from pybake.pool import ProviderHandlePool
+            self._pool = ProviderHandlePool(self)
+        return self._pool
+
+    def get_handle(self, addr_str, provider_id):
+        """
+        Returns a BakeProviderHandle pointing to the given address and
+        provider id, reusing a pooled bake_provider_handle_t and resolved
+        address if possible (see pybake.pool). This is the preferred way
+        of getting handles in code that creates many short-lived ones.
+
+        Args:
+            addr_str (str): Address of the Bake provider.
+            provider_id (int): ID of the provider.
+        """
+        return self._handle_pool().get(addr_str, provider_id)
+
+    def lookup(self, addr_str):
+        """
+        Returns the MargoAddress corresponding to the given string,
+        reusing the addresses resolved by get_handle if possible.
+
+        Args:
+            addr_str (str): address to look up.
+        """
+        return self._handle_pool().lookup(addr_str)
+
+    def configure_handle_pool(self, max_handles=None, idle_timeout=None):
+        """
+        Configures the pool of handles used by get_handle.
+
+        Args:
+            max_handles (int): maximum number of pooled handles (default 1024).
+            idle_timeout (float): number of seconds after which a handle that
+                has not been requested is evicted (default None, never).
+        """
+        self._handle_pool().configure(max_handles, idle_timeout)
+
+    def handle_pool_stats(self):
+        """
+        Returns statistics about the pool of handles used by get_handle.
+        """
+        return self._handle_pool().stats()
+
+    def create_cached_provider_handle(self, addr, provider_id, byte_budget=64*1024*1024):
+        """
+        Creates a CachedBakeProviderHandle object pointing to the given
+        address and provider id. Such a handle caches the data it reads
+        (see pybake.cache).
+
+        Args:
+            addr (MargoAddress): Address of the Bake provider.
+            provider_id (int): ID of the provider.
+            byte_budget (int): maximum number of bytes to cache.
+        """
+        from pybake.cache import CachedBakeProviderHandle
+        ph = _pybakeclient.provider_handle_create(self._client, addr._hg_addr, provider_id)
+        return CachedBakeProviderHandle(ph, self, str(addr), provider_id, byte_budget)
+
+    def create_compressed_provider_handle(self, addr, provider_id, codec='zlib', level=None,
+                                          chunk_size=1024*1024, threads=None):
+        """
+        Creates a CompressedBakeProviderHandle object pointing to the
+        given address and provider id. Such a handle compresses the
+        payloads of create_write_persist calls and decompresses them
+        when reading (see pybake.codec).
+
+        Args:
+            addr (MargoAddress): Address of the Bake provider.
+            provider_id (int): ID of the provider.
+            codec (str): name of the codec (see pybake.codec.available_codecs).
+            level (int): compression level (None for the codec's default).
+            chunk_size (int): size of the independently compressed chunks.
+            threads (int): number of threads used to (de)compress large payloads.
+        """
+        from pybake.codec import CodecPipeline, CompressedBakeProviderHandle
+        pipeline = CodecPipeline(codec, level, chunk_size, threads)
+        ph = _pybakeclient.provider_handle_create(self._client, addr._hg_addr, provider_id)
+        return CompressedBakeProviderHandle(ph, self, str(addr), provider_id, pipeline)
+
+    def enable_stats(self, enabled=True):
+        """
+        Enables (or disables) the collection of per-operation statistics
+        on the calls made to Bake (see pybake.stats). Statistics are
+        global to the process, not specific to this client.
+
+        Args:
+            enabled (bool): whether to collect statistics.
+        """
+        from pybake import stats
+        stats.enable(enabled)
+
+    def stats(self):
+        """
+        Returns a dictionary associating the name of each operation
+        called since statistics were enabled (or last reset) with a
+        dictionary of counters (see pybake.stats.get).
+        """
+        from pybake import stats
+        return stats.get()
+
+    def reset_stats(self):
+        """
+        Resets the per-operation statistics.
+        """
+        from pybake import stats
+        stats.reset()
+
+    def set_stats_callback(self, callback, interval=10.0, reset=False):
+        """
+        Sets a function called every interval seconds, from a background
+        thread, with the current statistics (as returned by stats()).
+        Passing None as callback removes the current one after a last call.
+        Statistics must be enabled separately using enable_stats.
+
+        Args:
+            callback (function): function called with the statistics.
+            interval (float): number of seconds between two calls.
+            reset (bool): whether to reset the statistics after each call.
+        """
+        from pybake import stats
+        if(self._stats_reporter is not None):
+            self._stats_reporter.stop()
+            self._stats_reporter = None
+        if(callback is not None):
+            self._stats_reporter = stats.StatsReporter(callback, interval, reset)
+            self._stats_reporter.start()
 
     def shutdown_service(self, addr):
         """
@@ -43,23 +323,291 @@ class BakeClient():
 
     def finalize(self):
         """
-        Finalizes the underlying bake_client_t structure.
+        Finalizes the underlying bake_client_t structure. Raises a
+        RuntimeError, without finalizing anything, if asynchronous
+        operations are still pending.
         """
+        if(self._cq is not None and self._cq.pending() != 0):
+            raise RuntimeError("Cannot finalize a BakeClient with pending asynchronous operations")
+        if(self._catalog is not None):
+            self._catalog.flush(raise_errors=False)
+        if(self._stats_reporter is not None):
+            self._stats_reporter.stop()
+            self._stats_reporter = None
+        if(self._pool is not None):
+            self._pool.clear()
+            self._pool = None
+        if(self._locator is not None):
+            self._locator.close()
+            self._locator = None
+        if(self._cq is not None):
+            self._cq.close()
+            self._cq = None
+        with self._batch_queues_lock:
+            for f in self._batch_queue_finalizers:
+                f()
+            self._batch_queue_finalizers = []
+        self._batch_queues = threading.local()
         _pybakeclient.client_finalize(self._client)
 
+class _CompletionQueue():
+    """
+    The _CompletionQueue class connects a native completion queue to an
+    asyncio event loop. Operations submitted to it are executed by Argobots
+    ULTs in the handler pool of the client's MargoInstance, which must
+    therefore be driven by a progress thread (or RPC threads) rather than
+    by the thread running the event loop. Completions are signaled through
+    a file descriptor watched by the event loop, which resolves the
+    corresponding futures. A queue is attached to one event loop at a time.
+    """
+
+    def __init__(self, mid):
+        self._cq = _pybakeclient.completion_queue_create(mid._mid)
+        self._fd = _pybakeclient.completion_queue_fd(self._cq)
+        self._loop = None
+        self._futures = dict()
+
+    def submit(self, submit, args, convert=None):
+        """
+        Submits an operation and returns an asyncio.Future for its result.
+
+        Args:
+            submit (function): _pybakeclient.submit_* function to call.
+            args (tuple): arguments to pass after the completion queue.
+            convert (function): optional conversion applied to the result.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        self._attach(loop)
+        op_id = submit(self._cq, *args)
+        future = loop.create_future()
+        self._futures[op_id] = (future, convert)
+        return future
+
+    def _attach(self, loop):
+        if(self._loop is loop):
+            return
+        if(self._loop is not None):
+            if(len(self._futures) != 0):
+                raise RuntimeError("Completion queue has pending operations in another event loop")
+            if(not self._loop.is_closed()):
+                self._loop.remove_reader(self._fd)
+        loop.add_reader(self._fd, self._on_completion)
+        self._loop = loop
+
+    def _on_completion(self):
+        for op_id, error, value in _pybakeclient.completion_queue_poll(self._cq):
+            future, convert = self._futures.pop(op_id)
+            if(future.cancelled()):
+                continue
+            if(error is not None):
+                future.set_exception(RuntimeError(error))
+                continue
+            # a failing conversion only fails its own future,
+            # the other completions of the batch are still delivered
+            try:
+                future.set_result(convert(value) if convert is not None else value)
+            except Exception as e:
+                future.set_exception(e)
+
+    def pending(self):
+        """
+        Returns the number of operations submitted
+        whose completion has not been delivered yet.
+        """
+        return _pybakeclient.completion_queue_pending(self._cq)
+
+    def close(self):
+        """
+        Detaches the queue from its event loop and destroys it.
+        Raises a RuntimeError, leaving the queue attached so that the
+        pending futures still resolve, if operations are still pending.
+        """
+        if(self.pending() != 0):
+            raise RuntimeError("Completion queue still has pending operations")
+        if(self._loop is not None):
+            if(not self._loop.is_closed()):
+                self._loop.remove_reader(self._fd)
+            self._loop = None
+        _pybakeclient.completion_queue_destroy(self._cq)
+
+def _destroy_batch_queue(cq):
+    """
+    Destroys the native completion queue of a _BatchQueue. Operations
+    can still be in flight if the thread was interrupted while waiting
+    for a batch (e.g. KeyboardInterrupt), and their ULTs reference the
+    queue: their completions are waited for and dropped first.
+    """
+    while(_pybakeclient.completion_queue_pending(cq) != 0):
+        _pybakeclient.completion_queue_wait(cq, -1.0)
+        _pybakeclient.completion_queue_poll(cq)
+    _pybakeclient.completion_queue_destroy(cq)
+
+class _BatchQueue():
+    """
+    The _BatchQueue class wraps a native completion queue used by a single
+    thread to execute batches of operations and wait for their completion
+    (see BakeProviderHandle.execute). As for _CompletionQueue, operations
+    are executed by Argobots ULTs in the handler pool of the client's
+    MargoInstance, which must be driven by a progress thread.
+    """
+
+    def __init__(self, mid):
+        self._cq = _pybakeclient.completion_queue_create(mid._mid)
+
+    def execute(self, ph, ops):
+        """
+        Submits native operation tuples (see _pybakeclient.submit_batch)
+        and waits for all of them to complete. Returns a list of
+        (error, value) tuples in the order of the operations.
+        """
+        n = len(ops)
+        first = _pybakeclient.submit_batch(self._cq, ph, ops)
+        results = [ None ] * n
+        remaining = n
+        while(remaining != 0):
+            _pybakeclient.completion_queue_wait(self._cq, -1.0)
+            for op_id, error, value in _pybakeclient.completion_queue_poll(self._cq):
+                # ids outside of the batch belong to a batch whose
+                # submission failed midway, their results are dropped
+                if(first <= op_id < first + n):
+                    results[op_id - first] = (error, value)
+                    remaining -= 1
+        return results
+
 class BakeProviderHandle():
     """
     The BakeProviderHandle class represents a handle to a remote Bake provider.
     Internally, this class wraps a bake_provider_handle_t C structure.
+
+    If the provider runs in the same MargoInstance as the client that
+    created the handle (and the client's local_fast_path is enabled),
+    write, read and read_into transfers of at least LOCAL_FAST_PATH_MIN_SIZE
+    bytes copy data directly from/into the provider's memory. The address
+    of the region is obtained from bake_get_data at each transfer and is
+    never cached, so a region removed by anyone is reported as an error.
+    A region must however not be removed while a transfer to or from it
+    is in progress. If a direct transfer fails but the same transfer
+    through an RPC succeeds (e.g. backends that do not map their data in
+    memory), the client stops using the fast path for this provider.
+
+    A handle to a provider running in another process on the same node,
+    whose targets are files the client can see (e.g. in /dev/shm), can
+    be put in local access mode with enable_local_access. The location
+    of a region in the target's file is then requested from the provider
+    at each read (a small RPC that also checks that the region still
+    exists), and read, read_into, read_numpy and read_view are served
+    from a read-only mapping of this file (see pybake.mapped). Regions
+    that cannot be located this way are read through RPCs, and providers
+    whose regions cannot be mapped at all are only asked once. Views
+    returned by read_view and read_numpy show the region's space as long
+    as they live, so a region must not be removed while they are in use.
+
+    Thread safety: a BakeProviderHandle can be shared by any number of
+    Python threads, and its blocking methods can be called concurrently.
+    They release the GIL for the duration of the RPCs (or copies) and only
+    hold it to convert their arguments and results. The only exception is
+    the asynchronous API (*_async methods), whose operations must all be
+    submitted from the thread running the event loop they are bound to.
+    Concurrent operations on overlapping ranges of a region are not
+    ordered with respect to each other.
     """
 
-    def __init__(self, ph):
+    def __init__(self, ph, client=None, address=None, provider_id=None):
         """
         Constructor. This is not supposed to be called by users.
         Users should create a BakeProviderHandle from a BakeClient clt
         by calling clt.create_provider_handle.
         """
         self._ph = ph
+        self._client = client
+        self.address = address
+        self.provider_id = provider_id
+        self._local = client is not None and client._is_local(address)
+        self._catalog = None
+        if(client is not None and client._track_regions):
+            self._catalog = client._region_catalog()
+        self._local_access = False
+        self._create_many_rpc = client is not None
+
+    def _region_created(self, tid, rid, size):
+        """
+        Records a region created through this handle in the region
+        catalog of the provider, if regions are tracked.
+        """
+        if(self._catalog is not None):
+            self._catalog.added(self.address, self.provider_id, tid, rid, size)
+        return rid
+
+    def _region_removed(self, tid, rid):
+        """
+        Called when a region has been removed through this handle, to
+        forget it in the region catalog.
+        """
+        if(self._catalog is not None):
+            self._catalog.removed(self.address, self.provider_id, tid, rid)
+
+    def _use_local(self, size):
+        """
+        Returns whether a transfer of size bytes should use the co-located
+        fast path.
+        """
+        return (self._local and size >= LOCAL_FAST_PATH_MIN_SIZE
+                and (self.address, self.provider_id) not in self._client._local_unsupported)
+
+    def _local_failed(self):
+        """
+        Called when a transfer failed through the co-located fast path but
+        succeeded through an RPC, to stop using the fast path for this
+        provider.
+        """
+        self._client._local_unsupported.add((self.address, self.provider_id))
+
+    @property
+    def is_local(self):
+        """
+        Whether the handle uses the co-located fast path.
+        """
+        return self._local
+
+    def enable_local_access(self, enabled=True):
+        """
+        Enables or disables local access mode, in which reads are served
+        from a mapping of the target's file when the client can see it.
+        This requires the handle to have been created by a BakeClient.
+        """
+        if(enabled and self._client is None):
+            raise RuntimeError("Local access requires a handle created by a BakeClient")
+        self._local_access = enabled
+
+    def _mapped_region(self, tid, rid, offset=0):
+        """
+        Returns a read-only memoryview of a region in local access mode,
+        or None if local access is disabled or the region cannot be mapped.
+        The region is located at each call rather than cached, since it
+        may be removed by anyone and its space reused by another region.
+        Only the mappings of the files are kept, and failures are
+        remembered per provider by the RegionLocator when they mean that
+        no region can be mapped. Raises a RuntimeError if offset is
+        beyond the end of the region.
+        """
+        if(not self._local_access):
+            return None
+        view = self._client._region_locator().locate(self.address, self.provider_id, tid, rid)
+        if(view is not None and not 0 <= offset <= len(view)):
+            raise RuntimeError("Offset "+str(offset)+" is beyond the end of the region ("
+                    +str(len(view))+" bytes)")
+        return view
+
+    def _margo_id(self):
+        """
+        Returns the margo instance capsule of the client that created
+        this handle (needed to expose non-contiguous memory in bulk
+        handles), or None if it is not known.
+        """
+        if(self._client is None):
+            return None
+        return self._client._mid._mid
 
     def __del__(self):
         """
@@ -82,27 +630,67 @@ class BakeProviderHandle():
         """ 
         _pybakeclient.set_eager_limit(self._ph, limit)
 
+    def autotune_eager_limit(self, tid, sizes=None, repetitions=10, cache_file=None, max_age=None):
+        """
+        Measures the latency and bandwidth of writes and reads of various
+        sizes through the eager path (data embedded in the RPC) and the
+        bulk (RDMA) path, and sets the eager limit to the largest size
+        for which the eager path is faster. A scratch region is created
+        in the provided target and removed afterwards.
+
+        If cache_file is provided, results are looked up in (and saved to)
+        this JSON file, keyed by the handle's address and provider id,
+        so that other processes can skip the calibration.
+        See pybake.tuning for details.
+
+        Args:
+            tid (BakeTargetID): target in which to run the measurements.
+            sizes (list): sizes to test (powers of 2 from 64 B to 64 KiB by default).
+            repetitions (int): number of measurements per size and path.
+            cache_file (str): path to a JSON file caching the results.
+            max_age (float): maximum age in seconds of a cached result.
+
+        Returns:
+            A pybake.tuning.EagerLimitReport.
+        """
+        from pybake.tuning import autotune_eager_limit
+        return autotune_eager_limit(self, tid, sizes, repetitions, cache_file, max_age)
+
+    # number of target ids requested by probe when max_targets is not
+    # specified; only the ids actually present are sent back, so this
+    # only costs client-side memory and gets all the targets in one RPC
+    _PROBE_MAX_TARGETS = 4096
+
     def probe(self, max_targets=0):
         """
         Get the list of BakeTargetIDs of targets located in
         this provider. If max_targets is not specified, this
-        function will return all the target ids.
+        function will return all the target ids, using the
+        client's target cache if it is enabled
+        (see BakeClient.enable_target_cache).
         """
         if(max_targets != 0):
             tgts = _pybakeclient.probe(self._ph, max_targets)
         else:
-            num_targets = 32
-            while(True):
-                tgts = _pybakeclient.probe(self._ph, num_targets)
-                if(len(tgts) == num_targets):
-                    num_targets *= 2
-                else:
-                    break
+            cache = self._client._target_cache if self._client is not None else None
+            if(cache is not None):
+                return list(cache.get((self.address, self.provider_id),
+                    lambda: [ BakeTargetID(t) for t in self._probe_all() ]))
+            tgts = self._probe_all()
         result = []
         for tgt in tgts:
             result.append(BakeTargetID(tgt))
         return result
 
+    def _probe_all(self):
+        num_targets = self._PROBE_MAX_TARGETS
+        while(True):
+            tgts = _pybakeclient.probe(self._ph, num_targets)
+            if(len(tgts) == num_targets):
+                num_targets *= 2
+            else:
+                return tgts
+
     def create(self, bti, region_size):
         """
         Creates a region in the specified target, with a given size.
@@ -115,7 +703,44 @@ class BakeProviderHandle():
             A BakeRegionID object representing the region. None if an error occured.
         """
         rid = _pybakeclient.create(self._ph, bti._tid, region_size)
-        return BakeRegionID(rid)
+        return self._region_created(bti, BakeRegionID(rid), region_size)
+
+    def create_many(self, bti, sizes):
+        """
+        Creates regions of the given sizes in the specified target. If the
+        provider is a pybake BakeProvider, the regions are created in a
+        single round trip (see pybake.allocator). If the provider has no
+        handler for this request, they are created concurrently with
+        execute, or one after the other if the handle was not created by
+        a BakeClient. Any other error of the request is raised, since the
+        regions may have been created.
+
+        Args:
+            bti (BakeTargetID): ID of the bake target in which to create the regions.
+            sizes (list): sizes of the regions to create.
+
+        Returns:
+            A numpy array of datatype pybake.target.region_id_dtype() holding
+            the ids of the regions (see pybake.target.region_ids_from_numpy).
+        """
+        import numpy
+        sizes = [ int(s) for s in sizes ]
+        raw = None
+        if(self._create_many_rpc and len(sizes) != 0):
+            raw = self._client._create_many_client().create(self.address, self.provider_id, bti, sizes)
+            if(raw is None):
+                self._create_many_rpc = False
+        if(raw is None):
+            if(self._client is not None):
+                rids = self.execute([ ('create', bti, size) for size in sizes ])
+            else:
+                rids = [ self.create(bti, size) for size in sizes ]
+            return region_ids_to_numpy(rids)
+        result = numpy.frombuffer(raw, dtype=region_id_dtype())
+        if(self._catalog is not None):
+            for rid, size in zip(region_ids_from_bytes(raw), sizes):
+                self._region_created(bti, rid, size)
+        return result
 
     def write(self, tid, rid, offset, data):
         """
@@ -125,15 +750,32 @@ class BakeProviderHandle():
             tid (BakeTargetID): target in which to write.
             rid (BakeRegionID): region in which to write.
             offset (int): offset at which to write.
-            data (str): data to write.
+            data (str or bytes-like): data to write. Any object exposing a
+                C-contiguous buffer (bytes, bytearray, memoryview, mmap,
+                numpy array, etc.) is written without being copied.
         """
         if(isinstance(data,str)):
             data = data.encode()
+        fallback = False
+        if(self._use_local(memoryview(data).nbytes)):
+            try:
+                _pybakeclient.local_write(self._ph, tid._tid, rid._rid, offset, data)
+                return
+            except RuntimeError:
+                fallback = True
         _pybakeclient.write(self._ph, tid._tid, rid._rid, offset, data)
+        if(fallback):
+            self._local_failed()
 
     def write_numpy(self, tid, rid, offset, array):
         """
         Writes a numpy array in a region at a specified offset.
+        The elements are written in row-major (C) order. Non-contiguous
+        arrays (slices, transposes, F-ordered arrays, negative strides)
+        made of few large contiguous segments (64 KiB or more on average)
+        are not copied: their segments are exposed to the provider as a
+        multi-segment bulk handle. Other arrays are gathered into a
+        staging buffer of at most 4 MiB and written one chunk at a time.
 
         Args:
             tid (BakeTargetID): target in which to write.
@@ -141,7 +783,7 @@ class BakeProviderHandle():
             offset (int): offset at which to write.
             data (numpy.ndarray): numpy array to write.
         """
-        _pybakeclient.write_numpy(self._ph, tid._tid, rid._rid, offset, array)
+        _pybakeclient.write_numpy(self._ph, self._margo_id(), tid._tid, rid._rid, offset, array)
 
     def proxy_write(self, tid, rid, bulk, size, offset_in_region=0, offset_in_bulk=0, remote_addr=''):
         """
@@ -156,7 +798,7 @@ class BakeProviderHandle():
             offset_in_bulk (int): offset from which to read in the bulk object.
             remote_addr (str): address of the process that created the bulk object.
         """
-        _pybakeclient.proxy_write(self._ph, rid._rid, offset_in_region,
+        _pybakeclient.proxy_write(self._ph, tid._tid, rid._rid, offset_in_region,
                 bulk._hg_bulk, offset_in_bulk, remote_addr, size)
 
     def persist(self, tid, rid, offset=0, size=-1):
@@ -173,7 +815,7 @@ class BakeProviderHandle():
             size (int): number of bytes to persist.
         """
         if(size < 0):
-            size = self.get_size(rid) - offset
+            size = self.get_size(tid, rid) - offset
         _pybakeclient.persist(self._ph, tid._tid, rid._rid, offset, size)
 
     def create_write_persist(self, bti, data):
@@ -185,14 +827,15 @@ class BakeProviderHandle():
             bti (BakeTargetID): target id in which to create the region.
             size (int): size of the region to create.
             offset (int): offset at which to write data in the region.
-            data (str): data to write.
+            data (str or bytes-like): data to write. Any object exposing a
+                C-contiguous buffer is written without being copied.
         Returns:
             The created BakeRegionID.
         """
         if(isinstance(data,str)):
             data = data.encode()
         rid = _pybakeclient.create_write_persist(self._ph, bti._tid, data)
-        return BakeRegionID(rid)
+        return self._region_created(bti, BakeRegionID(rid), memoryview(data).nbytes)
 
     def proxy_create_write_persist(self, bti, bulk, size, offset_in_bulk=0, remote_addr=''):
         """
@@ -210,12 +853,14 @@ class BakeProviderHandle():
         """
         rid = _pybakeclient.create_write_persist_proxy(self._ph,
                 bti._tid, bulk._hg_bulk, offset_in_bulk, remote_addr, size)
-        return BakeRegionID(rid)
+        return self._region_created(bti, BakeRegionID(rid), size)
 
     def create_write_persist_numpy(self, bti, array):
         """
         Creates a new region, write the numpy array to it at a given offset,
-        and persist the region.
+        and persist the region. As with write_numpy, the elements are
+        written in row-major (C) order and non-contiguous arrays are
+        exposed without being copied.
 
         Args:
             bti (BakeTargetID): target id in which to create the region.
@@ -225,8 +870,8 @@ class BakeProviderHandle():
         Returns:
             The created BakeRegionID.
         """
-        rid = _pybakeclient.create_write_persist_numpy(self._ph, bti._tid, array)
-        return BakeRegionID(rid)
+        rid = _pybakeclient.create_write_persist_numpy(self._ph, self._margo_id(), bti._tid, array)
+        return self._region_created(bti, BakeRegionID(rid), array.nbytes)
 
     def get_size(self, tid, rid):
         """
@@ -264,10 +909,77 @@ class BakeProviderHandle():
             The data read, in the form of a string, or None if an
             error occured.
         """
+        view = self._mapped_region(tid, rid, offset)
+        if(view is not None):
+            if(size < 0):
+                size = len(view) - offset
+            return view[offset:offset+size].tobytes()
         if(size < 0):
-            size = self.get_size(rid) - offset
-        return _pybakeclient.read(self._ph, tid._tid, rid._rid, offset, size)
+            size = self.get_size(tid, rid) - offset
+        fallback = False
+        if(self._use_local(size)):
+            try:
+                return _pybakeclient.local_read(self._ph, tid._tid, rid._rid, offset, size)
+            except RuntimeError:
+                fallback = True
+        data = _pybakeclient.read(self._ph, tid._tid, rid._rid, offset, size)
+        if(fallback):
+            self._local_failed()
+        return data
+
+    def read_into(self, tid, rid, offset, buffer):
+        """
+        Reads data from a given region, at a given offset, directly into
+        a caller-provided buffer. The number of bytes requested is the size
+        of the buffer. No intermediate copy is made.
+
+        Args:
+            tid (BakeTargetID): target id.
+            rid (BakeRegionID): region id.
+            offset (int): offset at which to read.
+            buffer (bytes-like): writable C-contiguous buffer (bytearray,
+                memoryview, mmap, numpy array, etc.) to fill.
+
+        Returns:
+            The effective number of bytes read.
+        """
+        view = self._mapped_region(tid, rid, offset)
+        if(view is not None):
+            dest = memoryview(buffer).cast('B')
+            n = max(0, min(len(dest), len(view) - offset))
+            dest[:n] = view[offset:offset+n]
+            return n
+        fallback = False
+        if(self._use_local(memoryview(buffer).nbytes)):
+            try:
+                return _pybakeclient.local_read_into(self._ph, tid._tid, rid._rid, offset, buffer)
+            except RuntimeError:
+                fallback = True
+        n = _pybakeclient.read_into(self._ph, tid._tid, rid._rid, offset, buffer)
+        if(fallback):
+            self._local_failed()
+        return n
    
+    def read_view(self, tid, rid, offset=0, size=-1):
+        """
+        Returns a read-only memoryview of (part of) a region. In local
+        access mode, the view is backed by the mapping of the target's
+        file and no copy is made; otherwise the data is read with read
+        and a view of the resulting bytes is returned.
+
+        Args:
+            tid (BakeTargetID): target id.
+            rid (BakeRegionID): region id.
+            offset (int): offset at which the view starts.
+            size (int): size of the view (up to the end of the region if -1).
+        """
+        view = self._mapped_region(tid, rid, offset)
+        if(view is not None):
+            if(size < 0):
+                size = len(view) - offset
+            return view[offset:offset+size]
+        return memoryview(self.read(tid, rid, offset, size))
+
     def proxy_read(self, tid, rid, bulk, size, offset_in_region=0, offset_in_bulk=0, remote_addr=''):
         """
         Reads the data contained in a given region and pushes it to a provided bulk handle.
@@ -286,7 +998,7 @@ class BakeProviderHandle():
         return _pybakeclient.proxy_read(self._ph, tid._tid, rid._rid, offset_in_region, bulk._hg_bulk,
                 offset_in_bulk, remote_addr, size)
 
-    def read_numpy(self, tid, rid, offset, shape, dtype):
+    def read_numpy(self, tid, rid, offset, shape=None, dtype=None, out=None):
         """
         Reads the data contained in a given region, at a given offset,
         and interpret it as a numpy array of a given shape and datatype.
@@ -294,17 +1006,174 @@ class BakeProviderHandle():
         (e.g. the size of the region from the provided offset is too small
          compared with the size of the numpy that should result from the call)
 
+        If out is provided, the data is read directly into this array
+        (in row-major order of its elements) and shape and dtype are
+        ignored. out may be non-contiguous (e.g. a slice of a larger array),
+        in which case the data is scattered into its memory segments by
+        the provider without intermediate copy if they are few and large,
+        or read in chunks into a staging buffer of at most 4 MiB and
+        scattered from it otherwise (see write_numpy).
+
         Args:
             tid (BakeTargetID): target id.
             rid (BakeRegionID): region id.
             offset (int): offset at which to read.
             shape (tuple): shape of the resulting array.
             dtype (numpy.dtype): datatype of the resuling array.
+            out (numpy.ndarray): writeable array in which to read.
+
+        In local access mode, and if out is not provided, the result is a
+        read-only view of the mapping of the target's file (no copy is made).
+
+        Returns:
+            A numpy array (out if provided).
+        """
+        view = self._mapped_region(tid, rid, offset)
+        if(view is not None):
+            import numpy
+            if(out is not None):
+                numpy.copyto(out, numpy.frombuffer(view, dtype=out.dtype,
+                        count=out.size, offset=offset).reshape(out.shape))
+                return out
+            dtype = numpy.dtype(dtype)
+            count = 1
+            for n in shape:
+                count *= n
+            return numpy.frombuffer(view, dtype=dtype, count=count, offset=offset).reshape(shape)
+        if(out is not None):
+            _pybakeclient.read_numpy_into(self._ph, self._margo_id(), tid._tid, rid._rid, offset, out)
+            return out
+        return _pybakeclient.read_numpy(self._ph, self._margo_id(), tid._tid, rid._rid, offset, tuple(shape), dtype)
+
+    # arrays smaller than this are sent along with their header
+    # in a single create_write_persist call (at the cost of a copy)
+    _ARRAY_SINGLE_RPC_LIMIT = 1024*1024
+
+    def write_array(self, bti, array):
+        """
+        Creates a new region containing a self-describing numpy array:
+        the region starts with a small header (see pybake.array) storing
+        the array's datatype (including byte order), shape and memory
+        order, followed by the array's data. The region is persisted.
+        F-contiguous arrays are stored in F order, all other arrays
+        (including non-contiguous ones) in C order.
+
+        Args:
+            bti (BakeTargetID): target id in which to create the region.
+            array (numpy.ndarray): numpy array to write.
+        Returns:
+            The created BakeRegionID.
+        """
+        if(array.dtype.hasobject):
+            raise ValueError("Arrays of Python objects cannot be stored in Bake")
+        if(array.flags.f_contiguous and not array.flags.c_contiguous):
+            order, payload = 'F', array.T
+        else:
+            order, payload = 'C', array
+        header = ArrayHeader(array.dtype, array.shape, order)
+        hdata = header.to_bytes()
+        size = header.header_size + header.nbytes
+        if(size <= self._ARRAY_SINGLE_RPC_LIMIT):
+            import numpy
+            data = bytearray(size)
+            data[:len(hdata)] = hdata
+            numpy.ndarray(payload.shape, dtype=payload.dtype, buffer=data,
+                          offset=header.header_size)[...] = payload
+            return self.create_write_persist(bti, data)
+        rid = self.create(bti, size)
+        self.write(bti, rid, 0, hdata)
+        self.write_numpy(bti, rid, header.header_size, payload)
+        self.persist(bti, rid, 0, size)
+        return rid
+
+    def read_array_header(self, tid, rid):
+        """
+        Reads the header of a region written by write_array.
+        This needs a single read unless the header is unusually
+        large (e.g. arrays with many dimensions or structured datatypes).
+
+        Args:
+            tid (BakeTargetID): target id.
+            rid (BakeRegionID): region id.
+
+        Returns:
+            A pybake.array.ArrayHeader object.
+        """
+        # read may return a read-only memoryview (e.g. CachedBakeProviderHandle)
+        buf = bytearray(self.read(tid, rid, 0, HEADER_ALIGNMENT))
+        size = ArrayHeader.required_size(buf)
+        if(size > len(buf)):
+            buf += self.read(tid, rid, len(buf), size - len(buf))
+        return ArrayHeader.from_bytes(buf)
+
+    def read_array(self, tid, rid):
+        """
+        Reads a numpy array from a region written by write_array.
+        The array is allocated according to the region's header and
+        its data is read directly into it.
+
+        Args:
+            tid (BakeTargetID): target id.
+            rid (BakeRegionID): region id.
+
+        Returns:
+            The numpy array.
+        """
+        import numpy
+        header = self.read_array_header(tid, rid)
+        result = numpy.empty(header.shape, dtype=header.dtype, order=header.order)
+        out = result.T if header.order == 'F' else result
+        self.read_numpy(tid, rid, header.header_size, out=out)
+        return result
+
+    def read_array_slice(self, tid, rid, start, stop):
+        """
+        Reads the [start:stop] range along the first dimension of
+        an array stored by write_array (e.g. a range of rows of a 2D
+        array), without reading the rest of the region. start and stop
+        follow Python's slicing conventions.
+
+        Args:
+            tid (BakeTargetID): target id.
+            rid (BakeRegionID): region id.
+            start (int): first index along the first dimension.
+            stop (int): index after the last one along the first dimension.
 
         Returns:
-            A numpy array or None if it could not be read.
+            The numpy array.
         """
-        return _pybakeclient.read_numpy(self._ph, tid._tid, rid._rid, offset, tuple(shape), dtype)
+        import numpy
+        header = self.read_array_header(tid, rid)
+        if(len(header.shape) == 0):
+            raise ValueError("Cannot slice a 0-dimensional array")
+        start, stop, _ = slice(start, stop).indices(header.shape[0])
+        stop = max(start, stop)
+        count = stop - start
+        inner = header.shape[1:]
+        itemsize = header.dtype.itemsize
+        if(header.order == 'C'):
+            row_size = itemsize
+            for s in inner:
+                row_size *= s
+            result = numpy.empty((count,) + inner, dtype=header.dtype)
+            self.read_numpy(tid, rid, header.header_size + start*row_size, out=result)
+            return result
+        # F order: the requested rows form one contiguous run of
+        # count elements in each of the prod(inner) columns, and
+        # read_many lays these runs out back to back, which is exactly
+        # the F-order layout of the result
+        num_columns = 1
+        for s in inner:
+            num_columns *= s
+        if(count == 0 or num_columns == 0):
+            return numpy.empty((count,) + inner, dtype=header.dtype, order='F')
+        column_size = header.shape[0]*itemsize
+        ops = [ (tid, rid, header.header_size + j*column_size + start*itemsize, count*itemsize)
+                for j in range(num_columns) ]
+        data, offsets = self.read_many(ops)
+        if(len(data) != count*itemsize*num_columns):
+            raise RuntimeError("bake_read could not read full numpy object")
+        return numpy.frombuffer(data, dtype=header.dtype).reshape((count,) + inner, order='F')
 
     def remove(self, tid, rid):
         """
@@ -315,8 +1184,313 @@ class BakeProviderHandle():
             rid (BakeRegionID): region to remove.
         """
         _pybakeclient.remove(self._ph, tid._tid, rid._rid)
+        self._region_removed(tid, rid)
+
+    def list_regions(self, tid, start_after=None, max_regions=65536, min_size=0, max_size=None):
+        """
+        Lists the regions of a target known to the provider's region
+        catalog, in increasing order of their raw ids, optionally filtered
+        by size. Since Bake cannot enumerate regions, the catalog only knows
+        the regions created and removed by clients tracking them
+        (BakeClient(track_regions=True)): regions created by other clients
+        are not listed. The provider must have been created with
+        region_catalog=True. Pending catalog updates from this handle's
+        client are sent first.
+
+        Args:
+            tid (BakeTargetID): target whose regions to list.
+            start_after (BakeRegionID): region after which to start listing
+                (None to start from the beginning).
+            max_regions (int): maximum number of regions to return (> 0).
+            min_size (int): minimum size of the regions to list.
+            max_size (int): maximum size of the regions to list (None for no limit).
+
+        Returns:
+            A tuple (entries, next) where entries is a numpy array of datatype
+            pybake.catalog.region_entry_dtype() (fields 'id' and 'size'), and
+            next is the BakeRegionID to pass as start_after to get the next
+            page, or None if all the regions have been listed.
+        """
+        from pybake.catalog import entries_to_numpy
+        if(self._client is None):
+            raise RuntimeError("Listing regions requires a provider handle created by a BakeClient")
+        entries, nxt = self._client._region_catalog().list(self.address, self.provider_id, tid,
+                None if start_after is None else start_after.to_bytes(),
+                max_regions, min_size, max_size)
+        return (entries_to_numpy(entries), None if nxt is None else BakeRegionID.from_bytes(nxt))
+
+    def iter_regions(self, tid, page_size=65536, min_size=0, max_size=None):
+        """
+        Generator yielding the pages (numpy arrays) returned by successive
+        calls to list_regions until all the regions have been listed.
+        """
+        from pybake.catalog import list_pages
+        return list_pages(self.list_regions, tid, page_size, min_size, max_size)
+
+    # ============================================================== #
+    # Batched API                                                    #
+    # ============================================================== #
+    # The *_many methods below issue a batch of operations through a
+    # single call into the C++ layer, which releases the GIL once for the
+    # whole batch. Operations are executed in order and the batch stops
+    # at the first failure, raising an exception that indicates the index
+    # of the failed operation.
+
+    def read_many(self, ops):
+        """
+        Reads from several regions in a single call.
+
+        Args:
+            ops (list): sequence of (tid, rid, offset, size) tuples.
+
+        Returns:
+            A pair (data, offsets) where data is a bytearray holding the
+            results back to back and offsets is a memoryview of len(ops)+1
+            unsigned 64-bit integers such that the result of the i-th
+            read is data[offsets[i]:offsets[i+1]].
+        """
+        tids    = [ op[0]._tid for op in ops ]
+        rids    = [ op[1]._rid for op in ops ]
+        offsets = [ op[2] for op in ops ]
+        sizes   = [ op[3] for op in ops ]
+        data, boffsets = _pybakeclient.read_many(self._ph, tids, rids, offsets, sizes)
+        return (data, memoryview(boffsets).cast('Q'))
+
+    def write_many(self, ops):
+        """
+        Writes into several regions in a single call.
+
+        Args:
+            ops (list): sequence of (tid, rid, offset, data) tuples, where
+                data is a str or any object exposing a C-contiguous buffer.
+        """
+        tids    = [ op[0]._tid for op in ops ]
+        rids    = [ op[1]._rid for op in ops ]
+        offsets = [ op[2] for op in ops ]
+        data    = [ op[3] for op in ops ]
+        _pybakeclient.write_many(self._ph, tids, rids, offsets, data)
+
+    def get_size_many(self, ops):
+        """
+        Gets the size of several regions in a single call.
+
+        Args:
+            ops (list): sequence of (tid, rid) tuples.
+
+        Returns:
+            A memoryview of len(ops) unsigned 64-bit integers.
+        """
+        tids = [ op[0]._tid for op in ops ]
+        rids = [ op[1]._rid for op in ops ]
+        return memoryview(_pybakeclient.get_size_many(self._ph, tids, rids)).cast('Q')
+
+    def remove_many(self, ops):
+        """
+        Removes several regions in a single call.
+
+        Args:
+            ops (list): sequence of (tid, rid) tuples.
+        """
+        tids = [ op[0]._tid for op in ops ]
+        rids = [ op[1]._rid for op in ops ]
+        try:
+            _pybakeclient.remove_many(self._ph, tids, rids)
+        except RuntimeError as e:
+            # the regions preceding the failed one were removed
+            failed = re.search(r'operation (\d+)', str(e))
+            for op in ops[:int(failed.group(1)) if failed else 0]:
+                self._region_removed(op[0], op[1])
+            raise
+        for op in ops:
+            self._region_removed(op[0], op[1])
+
+    # ============================================================== #
+    # Batch execution                                                #
+    # ============================================================== #
+
+    _BATCH_OPS = {
+        'create'               : _pybakeclient.OP_CREATE,
+        'write'                : _pybakeclient.OP_WRITE,
+        'read'                 : _pybakeclient.OP_READ,
+        'persist'              : _pybakeclient.OP_PERSIST,
+        'get_size'             : _pybakeclient.OP_GET_SIZE,
+        'remove'               : _pybakeclient.OP_REMOVE,
+        'create_write_persist' : _pybakeclient.OP_CREATE_WRITE_PERSIST
+    }
+
+    def execute(self, ops, return_exceptions=False):
+        """
+        Executes a batch of operations concurrently and returns their
+        results. Unlike the *_many methods, which issue their operations
+        one after the other, the operations of a batch are handed off to
+        the native layer in a single call and are all in flight at the same
+        time, each executed by an Argobots ULT. The calling thread waits for
+        their completion with the GIL released. Any number of threads can
+        call execute concurrently, each of them using its own completion
+        queue. This requires the client's MargoInstance to run a progress
+        thread.
+
+        Args:
+            ops (list): sequence of operations, each of which is one of:
+                ('create', tid, region_size)
+                ('write', tid, rid, offset, data)
+                ('read', tid, rid, offset, size)
+                ('persist', tid, rid, offset, size)
+                ('get_size', tid, rid)
+                ('remove', tid, rid)
+                ('create_write_persist', tid, data)
+            return_exceptions (bool): if True, failed operations have a
+                RuntimeError as result instead of raising the first one
+                once all the operations have completed.
+
+        Returns:
+            A list with the result of each operation: the BakeRegionID for
+            create and create_write_persist, the data (bytes) for read, the
+            size for get_size, and None for the others.
+        """
+        if(self._client is None):
+            raise RuntimeError("Batch execution requires a provider handle created by a BakeClient")
+        native = []
+        for op in ops:
+            kind = op[0]
+            code = self._BATCH_OPS[kind]
+            tid = op[1]._tid
+            if(kind == 'create'):
+                native.append((code, tid, None, None, op[2], None))
+            elif(kind == 'write'):
+                data = op[4].encode() if isinstance(op[4], str) else op[4]
+                native.append((code, tid, op[2]._rid, op[3], None, data))
+            elif(kind == 'read' or kind == 'persist'):
+                native.append((code, tid, op[2]._rid, op[3], op[4], None))
+            elif(kind == 'create_write_persist'):
+                data = op[2].encode() if isinstance(op[2], str) else op[2]
+                native.append((code, tid, None, None, None, data))
+            else:
+                native.append((code, tid, op[2]._rid, None, None, None))
+        results = []
+        first_error = None
+        for i, (error, value) in enumerate(self._client._batch_queue().execute(self._ph, native)):
+            if(error is not None):
+                error = RuntimeError(error + " (operation "+str(i)+")")
+                if(first_error is None):
+                    first_error = error
+                results.append(error)
+                continue
+            kind = ops[i][0]
+            if(kind == 'create'):
+                value = self._region_created(ops[i][1], BakeRegionID(value), ops[i][2])
+            elif(kind == 'create_write_persist'):
+                value = self._region_created(ops[i][1], BakeRegionID(value), memoryview(native[i][5]).nbytes)
+            elif(kind == 'remove'):
+                self._region_removed(ops[i][1], ops[i][2])
+            results.append(value)
+        if(first_error is not None and not return_exceptions):
+            raise first_error
+        return results
+
+    # ============================================================== #
+    # Asynchronous API                                               #
+    # ============================================================== #
+    # The *_async methods below must be called from a thread running an
+    # asyncio event loop. They return asyncio.Future objects that can be
+    # awaited or gathered, so that a single event loop can keep many
+    # Bake operations in flight. Cancelling a future does not cancel the
+    # underlying operation, only the delivery of its result.
+
+    def _submit(self, submit, args, convert=None):
+        if(self._client is None):
+            raise RuntimeError("Asynchronous operations require a provider handle created by a BakeClient")
+        return self._client._completion_queue().submit(submit, (self._ph,) + args, convert)
+
+    def create_async(self, bti, region_size):
+        """
+        Asynchronous version of create.
+
+        Returns:
+            An asyncio.Future resolving to the created BakeRegionID.
+        """
+        return self._submit(_pybakeclient.submit_create, (bti._tid, region_size),
+                lambda rid: self._region_created(bti, BakeRegionID(rid), region_size))
+
+    def write_async(self, tid, rid, offset, data):
+        """
+        Asynchronous version of write. The data object is kept exported
+        (and must not be modified) until the operation completes.
+
+        Returns:
+            An asyncio.Future resolving to None.
+        """
+        if(isinstance(data,str)):
+            data = data.encode()
+        return self._submit(_pybakeclient.submit_write, (tid._tid, rid._rid, offset, data))
+
+    def persist_async(self, tid, rid, offset=0, size=-1):
+        """
+        Asynchronous version of persist. If size is not provided, the
+        size of the region is first obtained with get_size_async.
+
+        Returns:
+            An asyncio.Future resolving to None.
+        """
+        if(size < 0):
+            import asyncio
+            return asyncio.ensure_future(self._persist_to_end_async(tid, rid, offset))
+        return self._submit(_pybakeclient.submit_persist, (tid._tid, rid._rid, offset, size))
+
+    async def _persist_to_end_async(self, tid, rid, offset):
+        size = await self.get_size_async(tid, rid)
+        await self.persist_async(tid, rid, offset, size - offset)
+
+    def create_write_persist_async(self, bti, data):
+        """
+        Asynchronous version of create_write_persist.
+
+        Returns:
+            An asyncio.Future resolving to the created BakeRegionID.
+        """
+        if(isinstance(data,str)):
+            data = data.encode()
+        size = memoryview(data).nbytes
+        return self._submit(_pybakeclient.submit_create_write_persist, (bti._tid, data),
+                lambda rid: self._region_created(bti, BakeRegionID(rid), size))
+
+    def get_size_async(self, tid, rid):
+        """
+        Asynchronous version of get_size.
+
+        Returns:
+            An asyncio.Future resolving to the size (int) of the region.
+        """
+        return self._submit(_pybakeclient.submit_get_size, (tid._tid, rid._rid))
+
+    def read_async(self, tid, rid, offset=0, size=-1):
+        """
+        Asynchronous version of read. If size is not provided, the size
+        of the region is first obtained with get_size_async.
+
+        Returns:
+            An asyncio.Future resolving to the data read (bytes).
+        """
+        if(size < 0):
+            import asyncio
+            return asyncio.ensure_future(self._read_to_end_async(tid, rid, offset))
+        return self._submit(_pybakeclient.submit_read, (tid._tid, rid._rid, offset, size))
+
+    async def _read_to_end_async(self, tid, rid, offset):
+        size = await self.get_size_async(tid, rid)
+        return await self.read_async(tid, rid, offset, size - offset)
+
+    def remove_async(self, tid, rid):
+        """
+        Asynchronous version of remove.
 
-    def migrate_region(self, source_tid, source_rid, dest_addr, dest_provider_id, dest_target, remove_source=True):
+        Returns:
+            An asyncio.Future resolving to None.
+        """
+        return self._submit(_pybakeclient.submit_remove, (tid._tid, rid._rid),
+                lambda result: self._region_removed(tid, rid))
+
+    def migrate_region(self, source_tid, source_rid, dest_addr, dest_provider_id, dest_target, remove_source=True, region_size=None):
         """
         Migrates a give region from its source to a destination designated by
         an address, a provider id, and a target id. This function will also remove
@@ -329,12 +1503,52 @@ class BakeProviderHandle():
             dest_provider_id (int): destination provider id.
             dest_target (BakeTargetID): destinatin target id.
             remove_source (bool): whether to remove the source region.
+            region_size (int): size of the region (obtained with get_size
+                if not provided).
         Returns:
             The resulting BakeRegionID if successful, None otherwise.
         """
-        ret = _pybakeclient.migrate_region(self._ph, source_tid._tid, source_rid._rid, remove_source,
+        if(region_size is None):
+            region_size = self.get_size(source_tid, source_rid)
+        ret = _pybakeclient.migrate_region(self._ph, source_tid._tid, source_rid._rid,
+                int(region_size), remove_source,
                 str(dest_addr), int(dest_provider_id), dest_target._tid)
-        return BakeRegionID(ret)
+        if(remove_source):
+            self._region_removed(source_tid, source_rid)
+        rid = BakeRegionID(ret)
+        if(self._catalog is not None):
+            self._catalog.added(str(dest_addr), int(dest_provider_id), dest_target, rid, region_size)
+        return rid
+
+    def migrate_regions(self, source_tid, source_rids, destinations, remove_source=True,
+                        concurrency=4, bandwidth=None, mapping=None, progress_callback=None):
+        """
+        Migrates a list of regions to one or more destinations, several
+        regions at a time, optionally capping the bandwidth used.
+        See pybake.migration.RegionMigrator for details, including why
+        whole targets should be migrated with migrate_target instead.
+
+        Args:
+            source_tid (BakeTargetID): source target id.
+            source_rids (list): BakeRegionIDs of the regions to migrate.
+            destinations (list): (address, provider id, BakeTargetID) tuples.
+            remove_source (bool): whether to remove the source regions.
+            concurrency (int): maximum number of migrations in flight.
+            bandwidth (float): maximum number of bytes per second (None for no cap).
+            mapping (dict): mapping returned by a previous, interrupted call;
+                the regions it contains are not migrated again.
+            progress_callback (function): called with a MigrationProgress
+                object as regions complete.
+        Returns:
+            A dictionary associating each source BakeRegionID with an
+            (address, provider id, destination BakeTargetID, destination
+            BakeRegionID) tuple.
+        """
+        from pybake.migration import RegionMigrator
+        migrator = RegionMigrator(self, destinations, concurrency=concurrency,
+                bandwidth=bandwidth, remove_source=remove_source,
+                progress_callback=progress_callback)
+        return migrator.migrate(source_tid, source_rids, mapping)
 
     def migrate_target(self, source_tid, dest_addr, dest_provider_id, dest_root, remove_source=True):
         """
@@ -0,0 +1,591 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pybake.client import BakeProviderHandle
+
+class Codec():
+    """
+    The Codec class is the base class of the compression codecs used by
+    a CodecPipeline. A codec has a name and a numerical id (stored in the
+    header of encoded regions, ids 128 to 255 are reserved for codecs
+    registered by users) and compresses and decompresses chunks. Codecs
+    should release the GIL while (de)compressing, as the stdlib zlib and
+    lzma modules and the lz4, zstandard and blosc packages do, so that
+    chunks can be processed in parallel by a thread pool.
+    """
+
+    name = None
+    id = None
+
+    def compress(self, data, level=None, typesize=1):
+        """
+        Compresses a bytes-like object and returns the compressed bytes.
+
+        Args:
+            data (bytes-like): data to compress.
+            level (int): compression level (None for the codec's default).
+            typesize (int): size of the items in data (e.g. the itemsize
+                of a numpy array), used by codecs that shuffle bytes.
+        """
+        raise NotImplementedError
+
+    def decompress(self, data, raw_size):
+        """
+        Decompresses a bytes-like object into raw_size bytes.
+        """
+        raise NotImplementedError
+
+class _ZlibCodec(Codec):
+    name = 'zlib'
+    id = 1
+
+    def __init__(self):
+        import zlib
+        self._zlib = zlib
+
+    def compress(self, data, level=None, typesize=1):
+        return self._zlib.compress(data, 6 if level is None else level)
+
+    def decompress(self, data, raw_size):
+        return self._zlib.decompress(data, bufsize=max(1, raw_size))
+
+class _LzmaCodec(Codec):
+    name = 'lzma'
+    id = 2
+
+    def __init__(self):
+        import lzma
+        self._lzma = lzma
+
+    def compress(self, data, level=None, typesize=1):
+        return self._lzma.compress(data, format=self._lzma.FORMAT_XZ,
+                preset=1 if level is None else level)
+
+    def decompress(self, data, raw_size):
+        return self._lzma.decompress(data, format=self._lzma.FORMAT_XZ)
+
+class _Lz4Codec(Codec):
+    name = 'lz4'
+    id = 3
+
+    def __init__(self):
+        import lz4.block
+        self._lz4 = lz4.block
+
+    def compress(self, data, level=None, typesize=1):
+        if(level is None):
+            return self._lz4.compress(data, store_size=False)
+        return self._lz4.compress(data, mode='high_compression',
+                compression=level, store_size=False)
+
+    def decompress(self, data, raw_size):
+        return self._lz4.decompress(data, uncompressed_size=raw_size)
+
+class _ZstdCodec(Codec):
+    name = 'zstd'
+    id = 4
+
+    def __init__(self):
+        import zstandard
+        self._zstd = zstandard
+
+    def compress(self, data, level=None, typesize=1):
+        # (de)compressor objects are not thread-safe
+        return self._zstd.ZstdCompressor(level=3 if level is None else level).compress(data)
+
+    def decompress(self, data, raw_size):
+        return self._zstd.ZstdDecompressor().decompress(data, max_output_size=raw_size)
+
+class _BloscCodec(Codec):
+    name = 'blosc'
+    id = 5
+
+    def __init__(self):
+        import blosc
+        blosc.set_releasegil(True)
+        self._blosc = blosc
+
+    def compress(self, data, level=None, typesize=1):
+        return self._blosc.compress(bytes(data), typesize=typesize,
+                clevel=5 if level is None else level)
+
+    def decompress(self, data, raw_size):
+        return self._blosc.decompress(bytes(data))
+
+_BUILTIN_CODECS = [ _ZlibCodec, _LzmaCodec, _Lz4Codec, _ZstdCodec, _BloscCodec ]
+_codecs = dict() # name -> Codec, or None if its package is not installed
+_codecs_lock = threading.Lock()
+
+def register_codec(codec):
+    """
+    Registers a Codec instance, making it available by name to
+    CodecPipelines and to the decoding of regions that use its id.
+    """
+    if(codec.id is None or not (128 <= codec.id <= 255)):
+        raise ValueError("User codecs must have an id between 128 and 255")
+    with _codecs_lock:
+        for c in _codecs.values():
+            if(c is not None and c.id == codec.id and c.name != codec.name):
+                raise ValueError("Codec id "+str(codec.id)+" is already used by "+c.name)
+        _codecs[codec.name] = codec
+
+def _load(cls):
+    with _codecs_lock:
+        if(cls.name not in _codecs):
+            try:
+                _codecs[cls.name] = cls()
+            except ImportError:
+                _codecs[cls.name] = None
+        return _codecs[cls.name]
+
+def get_codec(name):
+    """
+    Returns the Codec with the given name. Raises a ValueError if the
+    codec is unknown or if the package it relies on is not installed.
+    """
+    for cls in _BUILTIN_CODECS:
+        if(cls.name == name):
+            codec = _load(cls)
+            if(codec is None):
+                raise ValueError("Codec "+name+" requires a package that is not installed")
+            return codec
+    with _codecs_lock:
+        codec = _codecs.get(name)
+    if(codec is None):
+        raise ValueError("Unknown codec "+str(name))
+    return codec
+
+def _codec_by_id(codec_id):
+    for cls in _BUILTIN_CODECS:
+        if(cls.id == codec_id):
+            return get_codec(cls.name)
+    with _codecs_lock:
+        for codec in _codecs.values():
+            if(codec is not None and codec.id == codec_id):
+                return codec
+    raise ValueError("Unknown codec id "+str(codec_id))
+
+def available_codecs():
+    """
+    Returns the names of the codecs that can be used in this process.
+    """
+    for cls in _BUILTIN_CODECS:
+        _load(cls)
+    with _codecs_lock:
+        return [ name for name, codec in _codecs.items() if codec is not None ]
+
+# Layout of an encoded region: a header (magic, version, codec id, item
+# size, chunk size, decoded size, number of chunks), the stored size of
+# each chunk (32 bits each), then the chunks. A chunk whose stored size
+# equals its decoded size is stored uncompressed.
+_HEADER = struct.Struct('<4sBBBxIQI')
+_MAGIC = b'PBKZ'
+_VERSION = 1
+
+class EncodedLayout():
+    """
+    The EncodedLayout class describes an encoded region: its codec,
+    chunk size, decoded size and the offset and stored size of each chunk.
+    """
+
+    def __init__(self, codec_id, typesize, chunk_size, size, stored_sizes):
+        self.codec_id = codec_id
+        self.typesize = typesize
+        self.chunk_size = chunk_size
+        self.size = size
+        self.stored_sizes = stored_sizes
+        self.offsets = []
+        offset = _HEADER.size + 4*len(stored_sizes)
+        for s in stored_sizes:
+            self.offsets.append(offset)
+            offset += s
+        self.stored_size = offset
+
+    def chunk_raw_size(self, i):
+        """
+        Returns the decoded size of the i-th chunk.
+        """
+        return min(self.chunk_size, self.size - i*self.chunk_size)
+
+    def to_bytes(self):
+        return _HEADER.pack(_MAGIC, _VERSION, self.codec_id, self.typesize,
+                self.chunk_size, self.size, len(self.stored_sizes)) \
+            + struct.pack('<%dI' % len(self.stored_sizes), *self.stored_sizes)
+
+    @staticmethod
+    def table_size(header):
+        """
+        Returns the size of the header and chunk table given the first
+        _HEADER.size bytes of an encoded region, or None if these bytes
+        are not the header of an encoded region.
+        """
+        if(len(header) < _HEADER.size):
+            return None
+        magic, version, codec_id, typesize, chunk_size, size, count = \
+                _HEADER.unpack_from(header)
+        if(magic != _MAGIC or version != _VERSION or chunk_size == 0
+                or count != (size + chunk_size - 1) // chunk_size):
+            return None
+        return _HEADER.size + 4*count
+
+    @staticmethod
+    def from_bytes(buf):
+        """
+        Parses the header and chunk table at the beginning of buf,
+        returning None if buf does not start with a valid header.
+        """
+        if(EncodedLayout.table_size(buf) is None):
+            return None
+        magic, version, codec_id, typesize, chunk_size, size, count = \
+                _HEADER.unpack_from(buf)
+        stored_sizes = list(struct.unpack_from('<%dI' % count, buf, _HEADER.size))
+        return EncodedLayout(codec_id, typesize, chunk_size, size, stored_sizes)
+
+class CodecPipeline():
+    """
+    The CodecPipeline class encodes payloads into self-describing, chunked
+    and compressed blobs, and decodes byte ranges of such blobs. Payloads
+    are split into chunks of chunk_size bytes that are compressed
+    independently, so that decoding a range only decompresses the chunks
+    it overlaps. When more than one chunk is involved and the payload is at
+    least parallel_threshold bytes, chunks are processed by a thread pool
+    of the given number of threads. Chunks that do not compress are stored
+    as they are. The pipeline is thread-safe.
+    """
+
+    def __init__(self, codec='zlib', level=None, chunk_size=1024*1024,
+                 threads=None, parallel_threshold=4*1024*1024):
+        """
+        Constructor.
+
+        Args:
+            codec (str or Codec): codec used to encode payloads.
+            level (int): compression level (None for the codec's default).
+            chunk_size (int): size of the chunks payloads are split into.
+            threads (int): number of threads of the pool (None for the
+                number of CPUs, up to 8).
+            parallel_threshold (int): minimum payload size for which the
+                thread pool is used.
+        """
+        self.codec = get_codec(codec) if isinstance(codec, str) else codec
+        self.level = level
+        self.chunk_size = chunk_size
+        self.threads = threads if threads is not None else min(8, os.cpu_count() or 1)
+        self.parallel_threshold = parallel_threshold
+        self._executor = None
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def _map(self, fn, items, nbytes):
+        if(len(items) > 1 and self.threads > 1 and nbytes >= self.parallel_threshold):
+            with self._lock:
+                if(self._executor is None):
+                    self._executor = ThreadPoolExecutor(max_workers=self.threads)
+                executor = self._executor
+            return list(executor.map(fn, items))
+        return [ fn(item) for item in items ]
+
+    def encode(self, data, typesize=1):
+        """
+        Encodes a bytes-like object and returns the encoded blob (bytes).
+
+        Args:
+            data (str or bytes-like): payload to encode.
+            typesize (int): size of the items of the payload.
+        """
+        if(isinstance(data, str)):
+            data = data.encode()
+        view = memoryview(data).cast('B')
+        size = len(view)
+        chunk_size = self.chunk_size
+        t1 = time.perf_counter_ns()
+        def compress(start):
+            raw = view[start:start+chunk_size]
+            packed = self.codec.compress(raw, self.level, typesize)
+            return raw if len(packed) >= len(raw) else packed
+        chunks = self._map(compress, range(0, size, chunk_size), size)
+        layout = EncodedLayout(self.codec.id, min(255, typesize), chunk_size, size,
+                [ len(c) for c in chunks ])
+        blob = b''.join([ layout.to_bytes() ] + chunks)
+        t2 = time.perf_counter_ns()
+        with self._lock:
+            self._encoded += 1
+            self._raw_bytes += size
+            self._stored_bytes += len(blob)
+            self._compress_ns += t2 - t1
+        return blob
+
+    def decode_chunks(self, layout, first, stored, offset, size, out):
+        """
+        Decodes the range [offset, offset+size) of a region described by
+        layout into out (a writable bytes-like object of at least size
+        bytes), given the stored bytes of the chunks it overlaps, the
+        first of which has index first.
+        """
+        stored = memoryview(stored)
+        base = layout.offsets[first]
+        codec = None
+        t1 = time.perf_counter_ns()
+        def decompress(i):
+            start = layout.offsets[i] - base
+            chunk = stored[start:start+layout.stored_sizes[i]]
+            raw_size = layout.chunk_raw_size(i)
+            if(len(chunk) == raw_size):
+                return chunk
+            return codec.decompress(chunk, raw_size)
+        last = (offset + size - 1) // layout.chunk_size
+        if(any(layout.stored_sizes[i] != layout.chunk_raw_size(i) for i in range(first, last+1))):
+            codec = _codec_by_id(layout.codec_id)
+        chunks = self._map(decompress, range(first, last+1), size)
+        out = memoryview(out).cast('B')
+        pos = 0
+        for i, chunk in zip(range(first, last+1), chunks):
+            chunk_start = i * layout.chunk_size
+            begin = max(offset, chunk_start) - chunk_start
+            end = min(offset + size, chunk_start + len(chunk)) - chunk_start
+            out[pos:pos+end-begin] = memoryview(chunk)[begin:end]
+            pos += end - begin
+        t2 = time.perf_counter_ns()
+        with self._lock:
+            self._decoded += 1
+            self._decoded_bytes += size
+            self._decompress_ns += t2 - t1
+        return pos
+
+    def decode(self, blob, offset=0, size=-1):
+        """
+        Decodes the range [offset, offset+size) (up to the end if size
+        is negative) of an encoded blob and returns it as a bytearray.
+        """
+        layout = EncodedLayout.from_bytes(blob)
+        if(layout is None):
+            raise ValueError("Not an encoded blob")
+        offset, size = _clip(layout, offset, size)
+        out = bytearray(size)
+        if(size != 0):
+            first = offset // layout.chunk_size
+            self.decode_chunks(layout, first, memoryview(blob)[layout.offsets[first]:],
+                    offset, size, out)
+        return out
+
+    def stats(self):
+        """
+        Returns a dictionary with the number of payloads encoded, the
+        number of bytes encoded and stored, the compression ratio, the
+        number of ranges decoded and of bytes decoded, and the time spent
+        encoding and decoding (in nanoseconds).
+        """
+        with self._lock:
+            return { 'encoded'       : self._encoded,
+                     'raw_bytes'     : self._raw_bytes,
+                     'stored_bytes'  : self._stored_bytes,
+                     'ratio'         : self._raw_bytes / max(1, self._stored_bytes),
+                     'decoded'       : self._decoded,
+                     'decoded_bytes' : self._decoded_bytes,
+                     'compress_ns'   : self._compress_ns,
+                     'decompress_ns' : self._decompress_ns }
+
+    def reset_stats(self):
+        """
+        Resets the statistics returned by stats.
+        """
+        with self._lock:
+            self._encoded = 0
+            self._raw_bytes = 0
+            self._stored_bytes = 0
+            self._decoded = 0
+            self._decoded_bytes = 0
+            self._compress_ns = 0
+            self._decompress_ns = 0
+
+    def close(self):
+        """
+        Shuts down the thread pool.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if(executor is not None):
+            executor.shutdown()
+
+def _clip(layout, offset, size):
+    offset = min(offset, layout.size)
+    if(size < 0 or offset + size > layout.size):
+        size = layout.size - offset
+    return (offset, size)
+
+class CompressedBakeProviderHandle(BakeProviderHandle):
+    """
+    The CompressedBakeProviderHandle class is a BakeProviderHandle whose
+    create_write_persist and create_write_persist_numpy (and therefore
+    write_array, for small arrays) store their payload encoded by a
+    CodecPipeline, and whose read, read_into, read_numpy and get_size
+    transparently decode encoded regions. Reading a range of an encoded
+    region fetches and decompresses only the chunks it overlaps, the
+    layout of the region being read once and cached in the handle.
+
+    Regions that were not encoded (e.g. created with create and filled
+    with write) are read as they are. Encoded regions must not be modified
+    with write, write_numpy or proxy_write, and the asynchronous, batched
+    and proxy APIs operate on the stored (encoded) bytes.
+    """
+
+    def __init__(self, ph, client=None, address=None, provider_id=None, pipeline=None):
+        """
+        Constructor. This is not supposed to be called by users.
+        Users should create a CompressedBakeProviderHandle from a
+        BakeClient clt by calling clt.create_compressed_provider_handle.
+        """
+        super(CompressedBakeProviderHandle, self).__init__(ph, client, address, provider_id)
+        self.pipeline = pipeline if pipeline is not None else CodecPipeline()
+        self._layouts = dict() # (tid, rid) -> EncodedLayout, or None if not encoded
+        self._layouts_lock = threading.Lock()
+
+    def _layout(self, tid, rid):
+        """
+        Returns the EncodedLayout of a region, or None if it is not encoded.
+        """
+        key = (tid, rid)
+        with self._layouts_lock:
+            if(key in self._layouts):
+                return self._layouts[key]
+        read = super(CompressedBakeProviderHandle, self).read
+        layout = None
+        if(BakeProviderHandle.get_size(self, tid, rid) >= _HEADER.size):
+            buf = read(tid, rid, 0, _HEADER.size)
+            table_size = EncodedLayout.table_size(buf)
+            if(table_size is not None):
+                buf += read(tid, rid, _HEADER.size, table_size - _HEADER.size)
+                layout = EncodedLayout.from_bytes(buf)
+        with self._layouts_lock:
+            self._layouts[key] = layout
+        return layout
+
+    def _forget_layout(self, tid, rid):
+        with self._layouts_lock:
+            self._layouts.pop((tid, rid), None)
+
+    def _region_removed(self, tid, rid):
+        self._forget_layout(tid, rid)
+        super(CompressedBakeProviderHandle, self)._region_removed(tid, rid)
+
+    def _decode_range(self, layout, tid, rid, offset, size, out):
+        if(size == 0):
+            return 0
+        first = offset // layout.chunk_size
+        last = (offset + size - 1) // layout.chunk_size
+        start = layout.offsets[first]
+        end = layout.offsets[last] + layout.stored_sizes[last]
+        stored = super(CompressedBakeProviderHandle, self).read(tid, rid, start, end - start)
+        return self.pipeline.decode_chunks(layout, first, stored, offset, size, out)
+
+    def create_write_persist(self, bti, data):
+        """
+        See BakeProviderHandle.create_write_persist. The data is encoded.
+        """
+        return self._create_encoded(bti, data, 1)
+
+    def create_write_persist_numpy(self, bti, array):
+        """
+        See BakeProviderHandle.create_write_persist_numpy. The array's
+        data is encoded, using its itemsize as the codec's item size.
+        """
+        import numpy
+        return self._create_encoded(bti, numpy.ascontiguousarray(array), array.dtype.itemsize)
+
+    def _create_encoded(self, bti, data, typesize):
+        blob = self.pipeline.encode(data, typesize)
+        return super(CompressedBakeProviderHandle, self).create_write_persist(bti, blob)
+
+    def get_size(self, tid, rid):
+        """
+        See BakeProviderHandle.get_size. Returns the decoded
+        size of encoded regions.
+        """
+        layout = self._layout(tid, rid)
+        if(layout is None):
+            return super(CompressedBakeProviderHandle, self).get_size(tid, rid)
+        return layout.size
+
+    def read(self, tid, rid, offset=0, size=-1):
+        """
+        See BakeProviderHandle.read. Encoded regions are decoded.
+        """
+        layout = self._layout(tid, rid)
+        if(layout is None):
+            return super(CompressedBakeProviderHandle, self).read(tid, rid, offset, size)
+        offset, size = _clip(layout, offset, size)
+        out = bytearray(size)
+        self._decode_range(layout, tid, rid, offset, size, out)
+        return bytes(out)
+
+    def read_into(self, tid, rid, offset, buffer):
+        """
+        See BakeProviderHandle.read_into. Encoded regions are decoded.
+        """
+        layout = self._layout(tid, rid)
+        if(layout is None):
+            return super(CompressedBakeProviderHandle, self).read_into(tid, rid, offset, buffer)
+        view = memoryview(buffer).cast('B')
+        offset, size = _clip(layout, offset, len(view))
+        return self._decode_range(layout, tid, rid, offset, size, view)
+
+    def read_numpy(self, tid, rid, offset, shape=None, dtype=None, out=None):
+        """
+        See BakeProviderHandle.read_numpy. Encoded regions are decoded.
+        """
+        layout = self._layout(tid, rid)
+        if(layout is None):
+            return super(CompressedBakeProviderHandle, self).read_numpy(
+                    tid, rid, offset, shape, dtype, out)
+        import numpy
+        if(out is not None):
+            shape, dtype = out.shape, out.dtype
+        dtype = numpy.dtype(dtype)
+        size = dtype.itemsize
+        for s in shape:
+            size *= s
+        result = numpy.empty(shape, dtype=dtype)
+        if(self._decode_range(layout, tid, rid, offset, size,
+                result.reshape(-1).view(numpy.uint8)) != size):
+            raise RuntimeError("bake_read could not read full numpy object")
+        if(out is not None):
+            out[...] = result
+            return out
+        return result
+
+    def read_view(self, tid, rid, offset=0, size=-1):
+        """
+        See BakeProviderHandle.read_view. Encoded regions are
+        decoded, so the view never shares memory with a mapping.
+        """
+        if(self._layout(tid, rid) is None):
+            return super(CompressedBakeProviderHandle, self).read_view(tid, rid, offset, size)
+        return memoryview(self.read(tid, rid, offset, size))
+
+    def write(self, tid, rid, offset, data):
+        """
+        See BakeProviderHandle.write. The data is written as it is.
+        """
+        self._forget_layout(tid, rid)
+        super(CompressedBakeProviderHandle, self).write(tid, rid, offset, data)
+
+    def write_numpy(self, tid, rid, offset, array):
+        """
+        See BakeProviderHandle.write_numpy. The data is written as it is.
+        """
+        self._forget_layout(tid, rid)
+        super(CompressedBakeProviderHandle, self).write_numpy(tid, rid, offset, array)
+
+    def migrate_region(self, source_tid, source_rid, dest_addr, dest_provider_id, dest_target, remove_source=True, region_size=None):
+        """
+        See BakeProviderHandle.migrate_region. Encoded regions are
+        migrated as they are stored.
+        """
+        if(region_size is None):
+            region_size = BakeProviderHandle.get_size(self, source_tid, source_rid)
+        return super(CompressedBakeProviderHandle, self).migrate_region(source_tid, source_rid,
+                dest_addr, dest_provider_id, dest_target, remove_source, region_size)
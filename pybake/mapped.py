@@ -0,0 +1,154 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import base64
+import json
+import mmap
+import os
+import threading
+from pybake.target import BakeTargetID, BakeRegionID
+
+# Memory-mapped local reads. A client running on the same node as a
+# provider whose targets are files it can see (e.g. in /dev/shm) asks the
+# provider, through the RPC below, where a region lives: the provider
+# obtains the address of the region in its memory with bake_get_data and
+# finds the file mapped at that address, and the offset in that file, in
+# /proc/self/maps. The client then maps the same file and serves reads
+# from its own mapping.
+LOCATE_RPC = 'pybake_locate_region'
+
+def _find_mapping(address):
+    """
+    Returns the (path, file offset) corresponding to an address of the
+    calling process' memory, or None if the address is not in a mapped file.
+    """
+    with open('/proc/self/maps', 'r') as f:
+        for line in f:
+            fields = line.split(None, 5)
+            if(len(fields) < 6):
+                continue
+            start, end = [ int(x, 16) for x in fields[0].split('-') ]
+            if(start <= address < end):
+                path = fields[5].strip()
+                if(not path.startswith('/') or path.endswith('(deleted)')):
+                    return None
+                return (path, int(fields[2], 16) + address - start)
+    return None
+
+def handle_locate(ph, payload):
+    """
+    Answers a locate request on the provider side, using a provider
+    handle ph to the provider itself. Returns the response.
+    """
+    from pybake._pybake import client as _pybakeclient
+    request = json.loads(payload)
+    tid = BakeTargetID.from_bytes(base64.b64decode(request['tid']))
+    rid = BakeRegionID.from_bytes(base64.b64decode(request['rid']))
+    try:
+        address = _pybakeclient.get_data(ph._ph, tid._tid, rid._rid)
+        size = _pybakeclient.get_size(ph._ph, tid._tid, rid._rid)
+    except RuntimeError as e:
+        return json.dumps({ 'error' : str(e) })
+    mapping = _find_mapping(address) if address != 0 else None
+    if(mapping is None):
+        # the backend does not keep its data in mapped files,
+        # no region of this provider can be located
+        return json.dumps({ 'error' : 'region is not in a mapped file',
+                            'unmappable' : True })
+    path, offset = mapping
+    st = os.stat(path)
+    return json.dumps({ 'path' : path, 'offset' : offset, 'size' : size,
+                        'dev' : st.st_dev, 'ino' : st.st_ino, 'fsize' : st.st_size })
+
+class RegionLocator():
+    """
+    The RegionLocator class resolves the location of regions in the
+    files of co-located providers and keeps these files mapped
+    (read-only) in the client's memory. A file is only used if the
+    client sees the same file (device and inode) at the path reported
+    by the provider. Providers whose regions cannot be mapped (their
+    backend does not use mapped files, or the client does not see their
+    files, e.g. because they run on another node) are remembered, and no
+    request is sent to them afterwards. Other failures (RPC errors,
+    unknown regions) are not remembered. The locator is thread-safe.
+    """
+
+    def __init__(self, client):
+        """
+        Constructor. This is not supposed to be called by users.
+        """
+        self._client = client
+        self._rpc = client._mid.register(LOCATE_RPC)
+        self._maps = dict() # path -> mmap, or None if the file is not usable
+        self._unmappable = set() # (address, provider id)
+        self._lock = threading.Lock()
+
+    def _map(self, path, dev, ino, fsize):
+        with self._lock:
+            if(path in self._maps):
+                return self._maps[path]
+            m = None
+            try:
+                st = os.stat(path)
+                if(st.st_dev == dev and st.st_ino == ino and st.st_size == fsize):
+                    with open(path, 'rb') as f:
+                        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except OSError:
+                m = None
+            self._maps[path] = m
+            return m
+
+    def is_mappable(self, address, provider_id):
+        """
+        Returns False if the regions of the specified provider
+        are known not to be accessible through a mapping.
+        """
+        with self._lock:
+            return (address, provider_id) not in self._unmappable
+
+    def _set_unmappable(self, address, provider_id):
+        with self._lock:
+            self._unmappable.add((address, provider_id))
+
+    def locate(self, address, provider_id, tid, rid):
+        """
+        Returns a read-only memoryview of a region, backed by a mapping
+        of the provider's file, or None if the region cannot be accessed
+        this way (the provider is remote, its backend does not map files,
+        the client does not see the same file, or the request failed).
+        """
+        if(not self.is_mappable(address, provider_id)):
+            return None
+        request = json.dumps({ 'tid' : base64.b64encode(tid.to_bytes()).decode(),
+                               'rid' : base64.b64encode(rid.to_bytes()).decode() })
+        try:
+            addr = self._client.lookup(address)
+            handle = self._client._mid.create_handle(addr, self._rpc)
+            response = json.loads(handle.forward(provider_id, request))
+        except Exception:
+            return None
+        if('error' in response):
+            if(response.get('unmappable', False)):
+                self._set_unmappable(address, provider_id)
+            return None
+        m = self._map(response['path'], response['dev'], response['ino'], response['fsize'])
+        if(m is None):
+            self._set_unmappable(address, provider_id)
+            return None
+        offset, size = response['offset'], response['size']
+        if(offset + size > len(m)):
+            return None
+        return memoryview(m)[offset:offset+size]
+
+    def close(self):
+        """
+        Unmaps all the files. Views previously returned must
+        not be used anymore.
+        """
+        with self._lock:
+            for m in self._maps.values():
+                if(m is not None):
+                    try:
+                        m.close()
+                    except BufferError:
+                        pass # views still exported, the mapping stays alive
+            self._maps.clear()
@@ -0,0 +1,216 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class MigrationProgress():
+    """
+    The MigrationProgress class is a snapshot of the progress of a
+    migration, passed to the progress callback of a RegionMigrator.
+    """
+
+    def __init__(self, regions_total, regions_done, regions_failed,
+                 bytes_total, bytes_done, elapsed):
+        self.regions_total = regions_total
+        self.regions_done = regions_done
+        self.regions_failed = regions_failed
+        self.bytes_total = bytes_total
+        self.bytes_done = bytes_done
+        self.elapsed = elapsed
+
+    @property
+    def throughput(self):
+        """
+        Average number of bytes migrated per second.
+        """
+        if(self.elapsed <= 0):
+            return 0.0
+        return self.bytes_done / self.elapsed
+
+    @property
+    def eta(self):
+        """
+        Estimated number of seconds before the end of the migration,
+        or None if it cannot be estimated yet.
+        """
+        throughput = self.throughput
+        if(throughput == 0):
+            return None
+        return (self.bytes_total - self.bytes_done) / throughput
+
+    def __str__(self):
+        eta = self.eta
+        return '%d/%d regions (%d failed), %d/%d bytes, %.1f MiB/s, ETA %s' % (
+                self.regions_done, self.regions_total, self.regions_failed,
+                self.bytes_done, self.bytes_total, self.throughput/(1024*1024),
+                'unknown' if eta is None else '%.1fs' % eta)
+
+class MigrationError(Exception):
+    """
+    Exception raised by RegionMigrator.migrate when some regions could
+    not be migrated. The mapping attribute holds the regions that were
+    migrated (and can be passed back to migrate to resume), the errors
+    attribute associates the regions that failed with their exception.
+    """
+
+    def __init__(self, mapping, errors):
+        super(MigrationError, self).__init__(
+                str(len(errors))+" region(s) could not be migrated")
+        self.mapping = mapping
+        self.errors = errors
+
+class _TokenBucket():
+    """
+    Token bucket limiting the rate at which bytes are migrated. Consuming
+    more tokens than available puts the bucket into debt, and the caller
+    sleeps until the debt is repaid.
+    """
+
+    def __init__(self, rate, burst):
+        self._rate = float(rate)
+        self._burst = float(burst)
+        self._tokens = self._burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, n):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._last)*self._rate)
+            self._last = now
+            self._tokens -= n
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+        if(wait > 0):
+            time.sleep(wait)
+
+class RegionMigrator():
+    """
+    The RegionMigrator class migrates regions from a provider to one or
+    more destination providers, with up to concurrency migrations in
+    flight, optionally capping the rate at which bytes are migrated so
+    that migrations do not starve other traffic. Regions are assigned to
+    the destinations so as to balance the number of bytes each receives.
+
+    Migrations are issued from a thread pool, which requires the client's
+    MargoInstance to run a progress thread.
+
+    Whole targets are not migrated region by region: Bake cannot list the
+    regions of a target, and the region catalogs behind list_regions and
+    iter_regions only know the regions of clients that track them
+    (BakeClient(track_regions=True)). Migrating what a catalog lists could
+    silently leave regions behind (and, with remove_source, split a
+    target between two providers). Whole targets are migrated with
+    BakeProviderHandle.migrate_target, which moves the target's file.
+    """
+
+    def __init__(self, ph, destinations, concurrency=4, bandwidth=None,
+                 remove_source=True, progress_callback=None, progress_interval=1.0):
+        """
+        Constructor.
+
+        Args:
+            ph (BakeProviderHandle): handle to the source provider.
+            destinations (list): (address, provider id, BakeTargetID) tuples.
+            concurrency (int): maximum number of migrations in flight.
+            bandwidth (float): maximum number of bytes per second (None for no cap).
+            remove_source (bool): whether to remove the source regions.
+            progress_callback (function): called with a MigrationProgress.
+            progress_interval (float): minimum number of seconds between two
+                calls to progress_callback (it is always called at the end).
+        """
+        if(len(destinations) == 0):
+            raise ValueError("At least one destination is required")
+        self._ph = ph
+        self._destinations = [ (str(a), int(p), t) for a, p, t in destinations ]
+        self._concurrency = concurrency
+        self._bucket = None
+        if(bandwidth is not None):
+            self._bucket = _TokenBucket(bandwidth, bandwidth)
+        self._remove_source = remove_source
+        self._progress_callback = progress_callback
+        self._progress_interval = progress_interval
+        self._lock = threading.Lock()
+        self._regions_total = 0
+        self._regions_done = 0
+        self._bytes_total = 0
+        self._bytes_done = 0
+        self._errors = dict()
+        self._start = time.monotonic()
+        self._last_report = self._start
+
+    def progress(self):
+        """
+        Returns a MigrationProgress for the current (or last) migration.
+        """
+        with self._lock:
+            return MigrationProgress(self._regions_total, self._regions_done,
+                    len(self._errors), self._bytes_total, self._bytes_done,
+                    time.monotonic() - self._start)
+
+    def migrate(self, tid, rids, mapping=None):
+        """
+        Migrates the given regions and returns a dictionary associating
+        each source BakeRegionID with an (address, provider id,
+        destination BakeTargetID, destination BakeRegionID) tuple, which
+        does not depend on the list of destinations of the migrator. Raises a MigrationError if some regions could
+        not be migrated; its mapping can be passed to a subsequent call
+        to only migrate the remaining regions.
+
+        Args:
+            tid (BakeTargetID): target of the source regions.
+            rids (list): BakeRegionIDs of the regions to migrate.
+            mapping (dict): mapping of regions already migrated.
+        """
+        mapping = dict(mapping) if mapping is not None else dict()
+        rids = [ rid for rid in rids if rid not in mapping ]
+        sizes = self._ph.get_size_many([ (tid, rid) for rid in rids ])
+        # largest regions first, each to the least loaded destination
+        order = sorted(range(len(rids)), key=lambda i: sizes[i], reverse=True)
+        loads = [ 0 ] * len(self._destinations)
+        assignment = []
+        for i in order:
+            d = loads.index(min(loads))
+            loads[d] += sizes[i]
+            assignment.append((rids[i], sizes[i], d))
+        self._regions_total = len(rids)
+        self._regions_done = 0
+        self._bytes_total = sum(sizes)
+        self._bytes_done = 0
+        self._errors = dict()
+        self._start = time.monotonic()
+        self._last_report = self._start
+        with ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            for rid, size, d in assignment:
+                executor.submit(self._migrate_one, tid, rid, size, d, mapping)
+        self._report(force=True)
+        if(len(self._errors) != 0):
+            raise MigrationError(mapping, dict(self._errors))
+        return mapping
+
+    def _migrate_one(self, tid, rid, size, d, mapping):
+        if(self._bucket is not None):
+            self._bucket.consume(size)
+        addr, provider_id, dest_tid = self._destinations[d]
+        try:
+            new_rid = self._ph.migrate_region(tid, rid, addr, provider_id, dest_tid,
+                    self._remove_source, size)
+        except Exception as e:
+            with self._lock:
+                self._errors[rid] = e
+        else:
+            with self._lock:
+                mapping[rid] = (addr, provider_id, dest_tid, new_rid)
+                self._regions_done += 1
+                self._bytes_done += size
+        self._report()
+
+    def _report(self, force=False):
+        if(self._progress_callback is None):
+            return
+        with self._lock:
+            now = time.monotonic()
+            if(not force and now - self._last_report < self._progress_interval):
+                return
+            self._last_report = now
+        self._progress_callback(self.progress())
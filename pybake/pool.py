@@ -0,0 +1,161 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+from collections import OrderedDict
+import threading
+import time
+from pybake._pybake import client as _pybakeclient
+
+class ProviderHandlePool():
+    """
+    The ProviderHandlePool class keeps the bake_provider_handle_t structures
+    created by a BakeClient, keyed by (address string, provider id), along
+    with the MargoAddresses resolved from those strings. Each call to get
+    returns a new BakeProviderHandle sharing the pooled structure (its
+    reference count is incremented with provider_handle_ref_incr), so that
+    short-lived handles do not pay for an address lookup and a handle
+    creation. The pool is bounded by a maximum number of handles (evicting
+    the least recently used one) and handles that have not been requested
+    for idle_timeout seconds are evicted. Evicting a pooled structure does
+    not invalidate the handles previously returned for it. The pool is
+    thread-safe.
+    """
+
+    def __init__(self, client, max_handles=1024, idle_timeout=None):
+        """
+        Constructor. This is not supposed to be called by users,
+        see BakeClient.get_handle.
+
+        Args:
+            client (BakeClient): client used to create handles.
+            max_handles (int): maximum number of pooled handles.
+            idle_timeout (float): number of seconds after which an unused
+                handle is evicted (None to never evict idle handles).
+        """
+        self._client = client
+        self._max_handles = max_handles
+        self._idle_timeout = idle_timeout
+        self._handles = OrderedDict() # (addr_str, provider_id) -> [ph, addr_str, last_used]
+        self._addresses = dict()      # addr_str -> [MargoAddress, number of handles]
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def configure(self, max_handles=None, idle_timeout=None):
+        """
+        Changes the maximum number of pooled handles and/or the idle timeout,
+        evicting handles if needed. Arguments left to None are unchanged.
+        """
+        with self._lock:
+            if(max_handles is not None):
+                self._max_handles = max_handles
+            if(idle_timeout is not None):
+                self._idle_timeout = idle_timeout
+            self._evict(time.monotonic())
+
+    def lookup(self, addr_str):
+        """
+        Returns the MargoAddress corresponding to the given string,
+        reusing a previously resolved address if possible.
+        """
+        with self._lock:
+            entry = self._addresses.get(addr_str)
+            if(entry is not None):
+                return entry[0]
+        return self._client._mid.lookup(addr_str)
+
+    def get(self, addr_str, provider_id):
+        """
+        Returns a BakeProviderHandle for the given address string
+        and provider id.
+        """
+        key = (addr_str, provider_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._handles.get(key)
+            if(entry is not None):
+                self._hits += 1
+                entry[2] = now
+                self._handles.move_to_end(key)
+                handle = self._new_handle(entry[0], addr_str, provider_id)
+                self._evict(now)
+                return handle
+            self._misses += 1
+            addr_entry = self._addresses.get(addr_str)
+        # look the address up and create the handle without holding the lock,
+        # concurrent misses on the same key are resolved below
+        addr = addr_entry[0] if addr_entry is not None else self._client._mid.lookup(addr_str)
+        ph = _pybakeclient.provider_handle_create(self._client._client, addr._hg_addr, provider_id)
+        with self._lock:
+            entry = self._handles.get(key)
+            if(entry is not None):
+                _pybakeclient.provider_handle_release(ph)
+                entry[2] = now
+                self._handles.move_to_end(key)
+                return self._new_handle(entry[0], addr_str, provider_id)
+            addr_entry = self._addresses.setdefault(addr_str, [addr, 0])
+            addr_entry[1] += 1
+            self._handles[key] = [ph, addr_str, now]
+            handle = self._new_handle(ph, addr_str, provider_id)
+            self._evict(now)
+            return handle
+
+    def _new_handle(self, ph, addr_str, provider_id):
+        from pybake.client import BakeProviderHandle
+        _pybakeclient.provider_handle_ref_incr(ph)
+        return BakeProviderHandle(ph, self._client, addr_str, provider_id)
+
+    def _evict(self, now):
+        while(len(self._handles) > self._max_handles):
+            key, entry = self._handles.popitem(last=False)
+            self._release(entry)
+        if(self._idle_timeout is None):
+            return
+        while(len(self._handles) != 0):
+            key, entry = next(iter(self._handles.items()))
+            if(now - entry[2] < self._idle_timeout):
+                break
+            del self._handles[key]
+            self._release(entry)
+
+    def _release(self, entry):
+        ph, addr_str, last_used = entry
+        _pybakeclient.provider_handle_release(ph)
+        addr_entry = self._addresses[addr_str]
+        addr_entry[1] -= 1
+        if(addr_entry[1] == 0):
+            del self._addresses[addr_str]
+        self._evictions += 1
+
+    def evict_idle(self):
+        """
+        Evicts the handles that have been idle for more than idle_timeout
+        seconds. This is also done on each call to get.
+        """
+        with self._lock:
+            self._evict(time.monotonic())
+
+    def clear(self):
+        """
+        Releases all the pooled handles and addresses.
+        """
+        with self._lock:
+            for entry in self._handles.values():
+                _pybakeclient.provider_handle_release(entry[0])
+            self._handles.clear()
+            self._addresses.clear()
+
+    def stats(self):
+        """
+        Returns a dictionary with the number of pooled handles and
+        addresses, of hits, misses and evictions.
+        """
+        with self._lock:
+            return { 'handles'   : len(self._handles),
+                     'addresses' : len(self._addresses),
+                     'hits'      : self._hits,
+                     'misses'    : self._misses,
+                     'evictions' : self._evictions }
+
+    def __len__(self):
+        return len(self._handles)
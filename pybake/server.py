@@ -1,37 +1,137 @@
 # (C) 2018 The University of Chicago
 # See COPYRIGHT in top-level directory.
-import _pybaketarget
-import _pybakeserver
+from pybake._pybake import target as _pybaketarget
+from pybake._pybake import server as _pybakeserver
+import json
+import os
+import tempfile
+import threading
 import pymargo
-from pybake.target import BakeTargetID
+from pybake.target import BakeTargetID, BakeRegionID
+from pybake import catalog
+from pybake import mapped
+from pybake import allocator
 
 class BakeProvider(pymargo.Provider):
     """
     The BakeProvide class wraps a C-level bake_provider_t object.
+
+    If region_catalog is True, the provider also keeps a catalog of the
+    regions of each of its targets (see pybake.catalog), persisted next to
+    the target in a file with the ".regions" suffix when this is possible
+    (in memory only otherwise, e.g. for device paths or read-only
+    directories). Since Bake cannot enumerate regions, the catalog only
+    knows the regions created and removed by clients tracking them
+    (BakeClient(track_regions=True)).
+
+    The RPCs of the provider are executed by the ULTs of an Argobots pool,
+    by default the RPC handler pool of the engine. A named pool (with its
+    own execution streams) defined in the engine's margo configuration can
+    be used instead, so that the load of one provider does not delay the
+    RPCs of the others. Bake does not expose the target an RPC is for
+    before handling it, so operations cannot be capped per target; a
+    target that must not starve the others should be attached to its own
+    provider, with its own pool.
     """
 
-    def __init__(self, engine, provider_id):
+    def __init__(self, engine, provider_id, config=None, pool=None, region_catalog=False):
         """
         Constructor. Initializes a provider with an Engine and provider_id.
+
+        Args:
+            engine (Engine): engine in which to register the provider.
+            provider_id (int): id of the provider.
+            config (dict or str): JSON configuration of the provider
+                (see Bake's documentation), None for the default one.
+            pool (str): name of the Argobots pool in which to execute
+                the provider's RPCs (None for the engine's handler pool).
+            region_catalog (bool): whether to keep a catalog of the regions
+                of the targets.
         """
         super(BakeProvider, self).__init__(engine, provider_id)
-        self._provider = _pybakeserver.register(engine._mid, provider_id)
+        if(isinstance(config, dict)):
+            config = json.dumps(config)
+        self._pool_name = pool
+        self._provider = _pybakeserver.register(engine._mid, provider_id,
+                config if config is not None else '', pool if pool is not None else '')
+        self._pool = _pybakeserver.find_pool(engine._mid, pool if pool is not None else '')
+        self._monitor = None
+        self._region_catalog = region_catalog
+        self._catalogs = dict() # raw target id -> RegionCatalog
+        self.register(catalog.UPDATE_RPC, '_catalog_update')
+        self.register(catalog.LIST_RPC, '_catalog_list')
+        self._engine = engine
+        self._provider_id = provider_id
+        self._self_client = None
+        self._self_handle = None
+        self.register(mapped.LOCATE_RPC, '_locate_region')
+        self.register(allocator.CREATE_MANY_RPC, '_create_many')
+
+    def _catalog_update(self, handle, payload):
+        if(not self._region_catalog):
+            handle.respond(catalog.handle_disabled(payload))
+            return
+        handle.respond(catalog.handle_update(self._catalogs, payload))
+
+    def _catalog_list(self, handle, payload):
+        if(not self._region_catalog):
+            handle.respond(catalog.handle_disabled(payload))
+            return
+        handle.respond(catalog.handle_list(self._catalogs, payload))
+
+    def _handle_to_self(self):
+        # client handle to this provider, created on first use,
+        # through which the RPCs below access its targets
+        if(self._self_handle is None):
+            from pybake.client import BakeClient
+            self._self_client = BakeClient(self._engine)
+            self._self_handle = self._self_client.create_provider_handle(
+                    self._engine.addr(), self._provider_id)
+        return self._self_handle
+
+    def _locate_region(self, handle, payload):
+        handle.respond(mapped.handle_locate(self._handle_to_self(), payload))
+
+    def _create_many(self, handle, payload):
+        handle.respond(allocator.handle_create_many(self._handle_to_self(), payload))
+
+    def _open_catalog(self, tid, path, reset=False):
+        # catalog I/O errors must not fail attaching or creating a target,
+        # the catalog is then kept in memory only
+        if(not self._region_catalog):
+            return
+        log = path + '.regions'
+        try:
+            if(reset and os.path.exists(log)):
+                os.remove(log)
+            c = catalog.RegionCatalog(log)
+        except (OSError, ValueError) as e:
+            c = catalog.RegionCatalog()
+            c.log_error = e
+        self._catalogs[tid.to_bytes()] = c
+
+    def _close_catalog(self, tid):
+        c = self._catalogs.pop(tid.to_bytes(), None)
+        if(c is not None):
+            c.close()
 
     def create_target(self, path, size):
         """
         Create a storage target and attach it to the provider.
         Returns a BakeTargetID instance that can be used to access the storage target.
         """
-        tid = _pybakeserver.create_target(self._provider, path, size)
-        return BakeTargetID(tid)
+        tid = BakeTargetID(_pybakeserver.create_target(self._provider, path, size))
+        self._open_catalog(tid, path, reset=True)
+        return tid
 
     def attach_target(self, path):
         """
         Adds a storage target to the provider.
         Returns a BakeTargetID instance that can be used to access the storage target.
         """
-        tid = _pybakeserver.attach_target(self._provider, path)
-        return BakeTargetID(tid)
+        tid = BakeTargetID(_pybakeserver.attach_target(self._provider, path))
+        self._open_catalog(tid, path)
+        return tid
 
     def detach_target(self, target):
         """
@@ -39,12 +139,133 @@ class BakeProvider(pymargo.Provider):
         The target argument must be a BakeTargetID object.
         """
         _pybakeserver.detach_target(self._provider, target._tid)
+        self._close_catalog(target)
 
     def detach_all_targets(self):
         """
         Removes all the storage targets managed by this provider.
         """
         _pybakeserver.detach_all_targets(self._provider)
+        for c in self._catalogs.values():
+            c.close()
+        self._catalogs.clear()
+
+    def list_regions(self, tid, start_after=None, max_regions=65536, min_size=0, max_size=None):
+        """
+        Lists the regions of a target known to its catalog, in increasing
+        order of their raw ids, optionally filtered by size.
+
+        Args:
+            tid (BakeTargetID): target whose regions to list.
+            start_after (BakeRegionID): region after which to start listing
+                (None to start from the beginning).
+            max_regions (int): maximum number of regions to return (> 0).
+            min_size (int): minimum size of the regions to list.
+            max_size (int): maximum size of the regions to list (None for no limit).
+
+        Returns:
+            A tuple (entries, next) where entries is a numpy array of datatype
+            pybake.catalog.region_entry_dtype() (fields 'id' and 'size'), and
+            next is the BakeRegionID to pass as start_after to get the next
+            page, or None if all the regions have been listed.
+        """
+        if(not self._region_catalog):
+            raise RuntimeError("The region catalog of this provider is disabled")
+        c = self._catalogs.get(tid.to_bytes())
+        if(c is None):
+            raise ValueError("Unknown target "+str(tid))
+        entries, nxt = c.list(None if start_after is None else start_after.to_bytes(),
+                max_regions, min_size, max_size)
+        return (catalog.entries_to_numpy(entries), None if nxt is None else BakeRegionID.from_bytes(nxt))
+
+    def iter_regions(self, tid, page_size=65536, min_size=0, max_size=None):
+        """
+        Generator yielding the pages (numpy arrays) returned by successive
+        calls to list_regions until all the regions have been listed.
+        """
+        return catalog.list_pages(self.list_regions, tid, page_size, min_size, max_size)
+
+    def get_config(self):
+        """
+        Returns the configuration of the provider (dict), including
+        the default values of the parameters that were not provided.
+        """
+        return json.loads(_pybakeserver.get_config(self._provider))
+
+    def pool_stats(self):
+        """
+        Returns a dictionary with the number of ULTs waiting to run
+        ('queued') and the number of ULTs waiting, running or blocked
+        ('in_flight') in the provider's pool. If the pool is shared with
+        other providers (e.g. the handler pool), their ULTs are counted too.
+        """
+        stats = _pybakeserver.pool_stats(self._pool)
+        stats['pool'] = self._pool_name
+        return stats
+
+    def start_monitor(self, interval=0.01):
+        """
+        Starts a thread sampling pool_stats every interval seconds,
+        whose results are included in stats().
+        """
+        if(self._monitor is None):
+            self._monitor = _PoolMonitor(self.pool_stats, interval)
+
+    def stop_monitor(self):
+        """
+        Stops the thread started by start_monitor.
+        """
+        if(self._monitor is not None):
+            self._monitor.stop()
+            self._monitor = None
+
+    def start_rpc_diagnostics(self):
+        """
+        Starts the collection of margo's RPC diagnostics (see
+        rpc_diagnostics). Diagnostics are collected by the engine, for
+        the RPCs of all its providers.
+        """
+        _pybakeserver.diag_start(self._engine._mid)
+
+    def rpc_diagnostics(self):
+        """
+        Returns margo's RPC diagnostics for the engine, as dumped by
+        margo_diag_dump (text in margo's format), which include, for each
+        RPC (e.g. Bake's read, write and create RPCs), the number of
+        calls and the mean, minimum and maximum time spent in it.
+        start_rpc_diagnostics must have been called first.
+        """
+        fd, path = tempfile.mkstemp(prefix='pybake-diag-')
+        os.close(fd)
+        try:
+            _pybakeserver.diag_dump(self._engine._mid, path)
+            with open(path, 'r') as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    def stats(self):
+        """
+        Returns a dictionary with the current pool_stats ('pool'), the
+        number of regions and bytes of each target, keyed by target id
+        string, according to the region catalogs ('catalog_targets'), and,
+        if the monitor is running, the statistics of the sampled queue
+        depths ('queue_depth': number of samples, mean, max and a histogram
+        whose bucket i counts the samples with a depth in [2^(i-1), 2^i)).
+
+        The catalogs only know the regions of clients tracking them (see
+        pybake.catalog), so 'catalog_targets' is not the usage of the
+        targets, and is empty unless clients track their regions. Bake
+        does not expose the target of an RPC before handling it, so
+        in-flight operations are only counted per pool, not per target.
+        Per-RPC latencies are provided by rpc_diagnostics.
+        """
+        result = { 'pool' : self.pool_stats(),
+                   'catalog_targets' : { str(BakeTargetID.from_bytes(tid)) : c.stats()
+                                         for tid, c in self._catalogs.items() } }
+        if(self._monitor is not None):
+            result['queue_depth'] = self._monitor.stats()
+        return result
 
     def count_targets(self):
         """
@@ -61,3 +282,40 @@ class BakeProvider(pymargo.Provider):
             return []
         else:
             return [ BakeTargetID(tid) for tid in l ]
+
+class _PoolMonitor():
+    """
+    Thread sampling the statistics of a provider's pool.
+    """
+
+    def __init__(self, sample, interval):
+        self._sample = sample
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._samples = 0
+        self._sum = 0
+        self._max = 0
+        self._histogram = [ 0 ] * 16
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while(not self._stop.wait(self._interval)):
+            depth = self._sample()['queued']
+            with self._lock:
+                self._samples += 1
+                self._sum += depth
+                self._max = max(self._max, depth)
+                self._histogram[min(depth.bit_length(), len(self._histogram)-1)] += 1
+
+    def stats(self):
+        with self._lock:
+            return { 'samples'   : self._samples,
+                     'mean'      : self._sum / max(1, self._samples),
+                     'max'       : self._max,
+                     'histogram' : list(self._histogram) }
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,19 @@
+/*
+ * (C) 2018 The University of Chicago
+ *
+ * See COPYRIGHT in top-level directory.
+ */
+#ifndef __PYBAKE_BINDINGS_H
+#define __PYBAKE_BINDINGS_H
+
+#include <pybind11/pybind11.h>
+
+/**
+ * Each function adds the bindings of one of the source files
+ * to a submodule of the pybake._pybake extension module.
+ */
+void pybake_bind_target(pybind11::module& m);
+void pybake_bind_client(pybind11::module& m);
+void pybake_bind_server(pybind11::module& m);
+
+#endif
@@ -5,15 +5,26 @@
  */
 #include <pybind11/pybind11.h>
 #include <pybind11/numpy.h>
+#include <pybind11/stl.h>
 #include <stdexcept>
 #include <sstream>
 #include <string>
 #include <vector>
 #include <cstring>
 #include <iostream>
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <memory>
+#include <mutex>
+#include <unistd.h>
+#include <sys/eventfd.h>
+#include <poll.h>
+#include <errno.h>
 #include <margo.h>
 #include <bake.h>
 #include <bake-client.h>
+#include "bindings.h"
 
 namespace py11 = pybind11;
 namespace np = py11;
@@ -23,6 +34,7 @@ typedef py11::capsule pymargo_addr;
 typedef py11::capsule pymargo_bulk;
 typedef py11::capsule pybake_client_t;
 typedef py11::capsule pybake_provider_handle_t;
+typedef py11::capsule pybake_completion_queue_t;
 
 #define HANDLE_ERROR(__func, __ret) do {\
         if(__ret != BAKE_SUCCESS) {\
@@ -37,6 +49,263 @@ typedef py11::capsule pybake_provider_handle_t;
 #define BULK2CAPSULE(__blk)  py11::capsule((void*)(__blk), "hg_bulk_t")
 #define BAKEPH2CAPSULE(__bph) py11::capsule((void*)(__bph), "bake_provider_handle_t")
 #define BAKECL2CAPSULE(__bcl) py11::capsule((void*)(__bcl), "bake_client_t")
+#define BAKECQ2CAPSULE(__bcq) py11::capsule((void*)(__bcq), "pybake_completion_queue_t")
+
+/*
+ * RAII wrapper around a Py_buffer obtained through the buffer protocol.
+ * It lets bake read from or write into the memory of any object exposing
+ * a C-contiguous buffer (bytes, bytearray, memoryview, mmap, numpy arrays)
+ * without copying it. It must be constructed and destroyed with the GIL
+ * held, but the data()/size() it exposes can be used without the GIL.
+ */
+class pybake_buffer {
+
+    Py_buffer m_view;
+
+    public:
+
+    pybake_buffer(const py11::object& obj, bool writable) {
+        int flags = PyBUF_C_CONTIGUOUS;
+        if(writable) flags |= PyBUF_WRITABLE;
+        if(PyObject_GetBuffer(obj.ptr(), &m_view, flags) != 0)
+            throw py11::error_already_set();
+    }
+
+    pybake_buffer(const pybake_buffer&) = delete;
+    pybake_buffer& operator=(const pybake_buffer&) = delete;
+
+    ~pybake_buffer() {
+        PyBuffer_Release(&m_view);
+    }
+
+    void* data() const {
+        return m_view.buf;
+    }
+
+    size_t size() const {
+        return static_cast<size_t>(m_view.len);
+    }
+};
+
+/*
+ * Instrumentation.
+ *
+ * When enabled with stats_enable(True), each entry point of this module
+ * records, under its name: the number of calls, of failed calls, and of
+ * bytes transferred, as well as the time spent (1) preparing the call
+ * with the GIL held (buffer export, allocation of results), (2) in the
+ * Bake call itself with the GIL released, (3) waiting to reacquire the
+ * GIL, and (4) converting/copying results with the GIL held, plus a
+ * log2 histogram of the total latency (bucket i counts calls that took
+ * less than 2^i ns). Each entry point is also wrapped, when the module
+ * is initialized, in a function measuring the whole call including the
+ * conversion of its arguments and result by pybind11 (call_ns), which
+ * also counts the calls and the failed ones (those raising an exception).
+ * Asynchronous operations are recorded when their completion is polled,
+ * their latency spanning submission to completion; for them, call_ns
+ * only covers the submission. Counters are process-wide. When disabled,
+ * the cost is one relaxed atomic load and one extra C call per call.
+ */
+
+#define PYBAKE_STAT_OPS(X) \
+    X(probe) X(create) X(write) X(proxy_write) X(write_numpy) X(persist) \
+    X(create_write_persist) X(create_write_persist_proxy) \
+    X(create_write_persist_numpy) X(get_size) X(read) X(read_into) \
+    X(proxy_read) X(read_numpy) X(read_numpy_into) X(remove) \
+    X(migrate_region) X(migrate_target) X(read_many) X(write_many) \
+    X(get_size_many) X(remove_many) X(get_data) X(local_write) \
+    X(local_read) X(local_read_into) X(submit_create) X(submit_write) \
+    X(submit_read) X(submit_persist) X(submit_get_size) X(submit_remove) \
+    X(submit_create_write_persist)
+
+enum pybake_stat_op {
+#define X(__name) PYBAKE_STAT_##__name,
+    PYBAKE_STAT_OPS(X)
+#undef X
+    PYBAKE_STAT_NUM_OPS
+};
+
+static const char* pybake_stat_names[] = {
+#define X(__name) #__name,
+    PYBAKE_STAT_OPS(X)
+#undef X
+};
+
+#define PYBAKE_HISTOGRAM_BUCKETS 48
+
+struct pybake_stats_entry {
+    std::atomic<uint64_t> count;
+    std::atomic<uint64_t> errors;
+    std::atomic<uint64_t> bytes;
+    std::atomic<uint64_t> prep_ns;
+    std::atomic<uint64_t> rpc_ns;
+    std::atomic<uint64_t> gil_wait_ns;
+    std::atomic<uint64_t> post_ns;
+    std::atomic<uint64_t> total_ns;
+    std::atomic<uint64_t> call_ns;
+    std::atomic<uint64_t> histogram[PYBAKE_HISTOGRAM_BUCKETS];
+
+    void record_call(bool error) {
+        count.fetch_add(1, std::memory_order_relaxed);
+        if(error) errors.fetch_add(1, std::memory_order_relaxed);
+    }
+
+    void record(uint64_t nbytes, uint64_t prep, uint64_t rpc,
+                uint64_t gil_wait, uint64_t post, uint64_t total) {
+        bytes.fetch_add(nbytes, std::memory_order_relaxed);
+        prep_ns.fetch_add(prep, std::memory_order_relaxed);
+        rpc_ns.fetch_add(rpc, std::memory_order_relaxed);
+        gil_wait_ns.fetch_add(gil_wait, std::memory_order_relaxed);
+        post_ns.fetch_add(post, std::memory_order_relaxed);
+        total_ns.fetch_add(total, std::memory_order_relaxed);
+        int bucket = 0;
+        while(bucket < PYBAKE_HISTOGRAM_BUCKETS-1 && (uint64_t(1) << bucket) <= total) bucket++;
+        histogram[bucket].fetch_add(1, std::memory_order_relaxed);
+    }
+
+    void reset() {
+        count = 0; errors = 0; bytes = 0; prep_ns = 0; rpc_ns = 0;
+        gil_wait_ns = 0; post_ns = 0; total_ns = 0; call_ns = 0;
+        for(auto& h : histogram) h = 0;
+    }
+};
+
+static std::atomic<bool>  pybake_stats_enabled(false);
+static pybake_stats_entry pybake_stats[PYBAKE_STAT_NUM_OPS];
+
+static inline uint64_t pybake_now_ns() {
+    return std::chrono::duration_cast<std::chrono::nanoseconds>(
+            std::chrono::steady_clock::now().time_since_epoch()).count();
+}
+
+/*
+ * Scoped timer recording the timings of an entry point when destroyed
+ * (calls and errors are counted by pybake_timed_call, see below).
+ * Timers nested in another active timer (e.g. read_numpy calling
+ * read_numpy_into) are disabled so that calls are only counted once.
+ */
+class pybake_timer {
+
+    pybake_stats_entry* m_entry = nullptr;
+    uint64_t m_start   = 0;
+    uint64_t m_release = 0;
+    uint64_t m_rpc_end = 0;
+    uint64_t m_acquire = 0;
+    uint64_t m_bytes   = 0;
+
+    static bool& active() {
+        static thread_local bool a = false;
+        return a;
+    }
+
+    public:
+
+    explicit pybake_timer(pybake_stat_op op) {
+        if(!pybake_stats_enabled.load(std::memory_order_relaxed) || active()) return;
+        active()  = true;
+        m_entry   = &pybake_stats[op];
+        m_start   = pybake_now_ns();
+    }
+
+    pybake_timer(const pybake_timer&) = delete;
+    pybake_timer& operator=(const pybake_timer&) = delete;
+
+    ~pybake_timer() {
+        if(!m_entry) return;
+        active() = false;
+        uint64_t end = pybake_now_ns();
+        if(!m_release) m_release = m_rpc_end = m_acquire = end;
+        m_entry->record(m_bytes,
+                m_release - m_start, m_rpc_end - m_release,
+                m_acquire - m_rpc_end, end - m_acquire, end - m_start);
+    }
+
+    bool enabled() const { return m_entry != nullptr; }
+    void released() { if(m_entry) m_release = pybake_now_ns(); }
+    void rpc_done() { if(m_entry) m_rpc_end = pybake_now_ns(); }
+    void acquired() { if(m_entry) m_acquire = pybake_now_ns(); }
+    void bytes(uint64_t n) { m_bytes = n; }
+};
+
+#define PYBAKE_RELEASE_GIL(__timer) Py_BEGIN_ALLOW_THREADS __timer.released();
+#define PYBAKE_ACQUIRE_GIL(__timer) __timer.rpc_done(); Py_END_ALLOW_THREADS __timer.acquired();
+
+static void pybake_stats_enable(bool enable) {
+    pybake_stats_enabled.store(enable);
+}
+
+static bool pybake_stats_is_enabled() {
+    return pybake_stats_enabled.load();
+}
+
+static py11::dict pybake_stats_get() {
+    py11::dict result;
+    for(int i = 0; i < PYBAKE_STAT_NUM_OPS; i++) {
+        const pybake_stats_entry& e = pybake_stats[i];
+        if(e.count == 0) continue;
+        py11::list histogram;
+        for(auto& h : e.histogram) histogram.append(h.load());
+        py11::dict d;
+        d["count"]       = e.count.load();
+        d["errors"]      = e.errors.load();
+        d["bytes"]       = e.bytes.load();
+        d["prep_ns"]     = e.prep_ns.load();
+        d["rpc_ns"]      = e.rpc_ns.load();
+        d["gil_wait_ns"] = e.gil_wait_ns.load();
+        d["post_ns"]     = e.post_ns.load();
+        d["total_ns"]    = e.total_ns.load();
+        d["call_ns"]     = e.call_ns.load();
+        if(std::strncmp(pybake_stat_names[i], "submit_", 7) != 0)
+            d["conversion_ns"] = e.call_ns > e.total_ns ? e.call_ns - e.total_ns : 0;
+        d["histogram"]   = histogram;
+        result[pybake_stat_names[i]] = d;
+    }
+    return result;
+}
+
+/*
+ * Wrapper around an entry point, measuring the whole call (including the
+ * conversions made by pybind11) and counting calls and failed calls. Its
+ * self argument is a (function, stat op index, is asynchronous) tuple.
+ * Asynchronous operations are only counted here if their submission
+ * failed, otherwise they are counted when their completion is polled.
+ */
+static PyObject* pybake_timed_call(PyObject* self, PyObject* args, PyObject* kwargs) {
+    PyObject* fn = PyTuple_GET_ITEM(self, 0);
+    if(!pybake_stats_enabled.load(std::memory_order_relaxed))
+        return PyObject_Call(fn, args, kwargs);
+    pybake_stats_entry& e = pybake_stats[PyLong_AsLong(PyTuple_GET_ITEM(self, 1))];
+    bool async = PyTuple_GET_ITEM(self, 2) == Py_True;
+    uint64_t start = pybake_now_ns();
+    PyObject* result = PyObject_Call(fn, args, kwargs);
+    e.call_ns.fetch_add(pybake_now_ns() - start, std::memory_order_relaxed);
+    if(!async || result == NULL)
+        e.record_call(result == NULL);
+    return result;
+}
+
+static void pybake_wrap_timed(py11::module& m) {
+    for(int i = 0; i < PYBAKE_STAT_NUM_OPS; i++) {
+        const char* name = pybake_stat_names[i];
+        if(!py11::hasattr(m, name)) continue;
+        py11::object fn = m.attr(name);
+        bool async = std::strncmp(name, "submit_", 7) == 0;
+        // the method definitions must outlive the module, they are never freed
+        PyMethodDef* def = new PyMethodDef;
+        def->ml_name  = name;
+        def->ml_meth  = reinterpret_cast<PyCFunction>(reinterpret_cast<void(*)(void)>(&pybake_timed_call));
+        def->ml_flags = METH_VARARGS | METH_KEYWORDS;
+        def->ml_doc   = NULL;
+        py11::tuple self = py11::make_tuple(fn, i, async);
+        PyObject* wrapper = PyCFunction_NewEx(def, self.ptr(), m.attr("__name__").ptr());
+        if(!wrapper) throw py11::error_already_set();
+        m.attr(name) = py11::reinterpret_steal<py11::object>(wrapper);
+    }
+}
+
+static void pybake_stats_reset() {
+    for(auto& e : pybake_stats) e.reset();
+}
 
 static pybake_client_t pybake_client_init(pymargo_instance_id mid) {
     bake_client_t result = BAKE_CLIENT_NULL;
@@ -69,13 +338,14 @@ static py11::object pybake_probe(
         pybake_provider_handle_t ph,
         uint64_t max_targets)
 {
+    pybake_timer timer(PYBAKE_STAT_probe);
     py11::list result;
     std::vector<bake_target_id_t> targets(max_targets);
     uint64_t num_targets;
     int ret;
-    Py_BEGIN_ALLOW_THREADS
+    PYBAKE_RELEASE_GIL(timer)
     ret = bake_probe(ph, max_targets, targets.data(), &num_targets);
-    Py_END_ALLOW_THREADS
+    PYBAKE_ACQUIRE_GIL(timer)
     HANDLE_ERROR(bake_probe, ret);
     for(uint64_t i=0; i < num_targets; i++) {
         result.append(py11::cast(targets[i]));
@@ -88,12 +358,13 @@ static py11::object pybake_create(
         const bake_target_id_t& bti,
         size_t region_size)
 {
+    pybake_timer timer(PYBAKE_STAT_create);
     bake_region_id_t rid;
     std::memset(&rid, 0, sizeof(rid));
     int ret;
-    Py_BEGIN_ALLOW_THREADS
+    PYBAKE_RELEASE_GIL(timer)
     ret = bake_create(ph, bti, region_size, &rid);
-    Py_END_ALLOW_THREADS
+    PYBAKE_ACQUIRE_GIL(timer)
     HANDLE_ERROR(bake_create, ret);
     return py11::cast(rid);
 }
@@ -103,14 +374,18 @@ static void pybake_write(
         const bake_target_id_t& tid,
         const bake_region_id_t& rid,
         uint64_t offset,
-        const py11::bytes& bdata)
+        const py11::object& bdata)
 {
+    pybake_timer timer(PYBAKE_STAT_write);
+    pybake_buffer data(bdata, false);
+    const void* buffer = data.data();
+    size_t size = data.size();
     int ret;
-    Py_BEGIN_ALLOW_THREADS
-    std::string data = (std::string)bdata;
-    ret = bake_write(ph, tid, rid, offset, (const void*)data.data(), data.size());
-    Py_END_ALLOW_THREADS
+    PYBAKE_RELEASE_GIL(timer)
+    ret = bake_write(ph, tid, rid, offset, buffer, size);
+    PYBAKE_ACQUIRE_GIL(timer)
     HANDLE_ERROR(bake_write, ret);
+    timer.bytes(size);
 }
 
 static void pybake_proxy_write(
@@ -123,36 +398,281 @@ static void pybake_proxy_write(
         const std::string& remote_addr,
         uint64_t size)
 {
+    pybake_timer timer(PYBAKE_STAT_proxy_write);
     int ret;
     const char* addr = remote_addr.size() > 0 ? remote_addr.c_str() : NULL;
-    Py_BEGIN_ALLOW_THREADS
+    PYBAKE_RELEASE_GIL(timer)
     ret = bake_proxy_write(ph, tid, rid, offset, bulk, remote_offset, addr, size);
-    Py_END_ALLOW_THREADS
+    PYBAKE_ACQUIRE_GIL(timer)
     HANDLE_ERROR(bake_proxy_write, ret);
+    timer.bytes(size);
 }
 
 #if HAS_NUMPY
-static void pybake_write_numpy(
+/*
+ * Non-contiguous numpy arrays are transferred in one of two ways. If
+ * their memory consists of few large contiguous segments (on average at
+ * least PYBAKE_NUMPY_MIN_SEGMENT bytes each), the segments are exposed
+ * to the provider as a multi-segment bulk handle, without any copy.
+ * Otherwise (e.g. F-ordered or transposed arrays, whose segments are
+ * single elements), describing every segment would cost more memory
+ * than the data itself, so the elements are gathered into (or scattered
+ * from) a staging buffer of at most PYBAKE_NUMPY_STAGING_SIZE bytes,
+ * transferred with bake_write (or bake_read) one chunk at a time.
+ */
+
+#define PYBAKE_NUMPY_MIN_SEGMENT  (64*1024)
+#define PYBAKE_NUMPY_STAGING_SIZE (4*1024*1024)
+
+/*
+ * Shape and strides of a numpy array, copied so that its memory can be
+ * traversed without the GIL. Trailing dimensions that are contiguous in
+ * memory are merged into blocks of block bytes, the first ndim
+ * dimensions then being iterated over in logical (row-major) order.
+ */
+struct pybake_numpy_layout {
+
+    char*                base = nullptr;
+    std::vector<ssize_t> shape;
+    std::vector<ssize_t> strides;
+    ssize_t              block = 0;
+    size_t               size = 0;
+
+    explicit pybake_numpy_layout(const np::array& array) {
+        ssize_t ndim = array.ndim();
+        base = static_cast<char*>(const_cast<void*>(array.data()));
+        block = array.itemsize();
+        size = block;
+        for(ssize_t d = 0; d < ndim; d++) size *= array.shape(d);
+        if(size == 0) return;
+        ssize_t k = ndim;
+        while(k > 0 && (array.shape(k-1) == 1 || array.strides(k-1) == block)) {
+            block *= array.shape(k-1);
+            k -= 1;
+        }
+        for(ssize_t d = 0; d < k; d++) {
+            shape.push_back(array.shape(d));
+            strides.push_back(array.strides(d));
+        }
+    }
+
+    /*
+     * Calls f(ptr, block) for each block in logical order, stopping
+     * early if f returns false. Can be called without the GIL.
+     */
+    template<typename F>
+    void for_each_block(F f) const {
+        if(size == 0) return;
+        size_t k = shape.size();
+        std::vector<ssize_t> index(k, 0);
+        while(true) {
+            char* ptr = base;
+            for(size_t d = 0; d < k; d++) ptr += index[d]*strides[d];
+            if(!f(ptr, static_cast<size_t>(block))) return;
+            ssize_t d = static_cast<ssize_t>(k) - 1;
+            for(; d >= 0; d--) {
+                index[d] += 1;
+                if(index[d] < shape[d]) break;
+                index[d] = 0;
+            }
+            if(d < 0) return;
+        }
+    }
+
+    /*
+     * Computes the contiguous memory segments of the array, merging
+     * consecutive blocks that are adjacent in memory. Returns false,
+     * leaving ptrs and sizes incomplete, if there are more than
+     * max_segments segments.
+     */
+    bool segments(std::vector<void*>& ptrs, std::vector<hg_size_t>& sizes,
+                  size_t max_segments) const {
+        bool ok = true;
+        for_each_block([&](char* ptr, size_t n) {
+            if(!ptrs.empty() && static_cast<char*>(ptrs.back()) + sizes.back() == ptr) {
+                sizes.back() += n;
+                return true;
+            }
+            if(ptrs.size() == max_segments) {
+                ok = false;
+                return false;
+            }
+            ptrs.push_back(ptr);
+            sizes.push_back(n);
+            return true;
+        });
+        return ok;
+    }
+};
+
+/*
+ * Writes the elements of an array at a given offset of a region, in
+ * chunks gathered in a staging buffer. Called without the GIL.
+ */
+static int pybake_numpy_staged_write(
         pybake_provider_handle_t ph,
         const bake_target_id_t& tid,
         const bake_region_id_t& rid,
         uint64_t offset,
-        const np::array& data)
+        const pybake_numpy_layout& layout)
+{
+    std::vector<char> staging(std::min<size_t>(layout.size, PYBAKE_NUMPY_STAGING_SIZE));
+    size_t filled = 0;
+    int ret = BAKE_SUCCESS;
+    layout.for_each_block([&](char* ptr, size_t n) {
+        while(n > 0) {
+            size_t c = std::min(n, staging.size() - filled);
+            std::memcpy(staging.data() + filled, ptr, c);
+            filled += c;
+            ptr += c;
+            n -= c;
+            if(filled == staging.size()) {
+                ret = bake_write(ph, tid, rid, offset, staging.data(), filled);
+                if(ret != BAKE_SUCCESS) return false;
+                offset += filled;
+                filled = 0;
+            }
+        }
+        return true;
+    });
+    if(ret == BAKE_SUCCESS && filled != 0)
+        ret = bake_write(ph, tid, rid, offset, staging.data(), filled);
+    return ret;
+}
+
+/*
+ * Reads the elements of an array from a given offset of a region, in
+ * chunks scattered from a staging buffer. Sets bytes_read to the number
+ * of bytes stored in the array. Called without the GIL.
+ */
+static int pybake_numpy_staged_read(
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid,
+        uint64_t offset,
+        const pybake_numpy_layout& layout,
+        uint64_t* bytes_read)
 {
-    if(!(data.flags() & (np::array::f_style | np::array::c_style))) {
-        throw std::runtime_error("Non-contiguous numpy arrays not yet supported in PyBake");
-        
+    std::vector<char> staging(std::min<size_t>(layout.size, PYBAKE_NUMPY_STAGING_SIZE));
+    size_t available = 0, consumed = 0;
+    *bytes_read = 0;
+    int ret = BAKE_SUCCESS;
+    layout.for_each_block([&](char* ptr, size_t n) {
+        while(n > 0) {
+            if(consumed == available) {
+                size_t want = std::min<size_t>(staging.size(), layout.size - *bytes_read);
+                uint64_t got = 0;
+                ret = bake_read(ph, tid, rid, offset, staging.data(), want, &got);
+                if(ret != BAKE_SUCCESS || got == 0) return false;
+                offset += got;
+                available = got;
+                consumed = 0;
+            }
+            size_t c = std::min(n, available - consumed);
+            std::memcpy(ptr, staging.data() + consumed, c);
+            consumed += c;
+            *bytes_read += c;
+            ptr += c;
+            n -= c;
+        }
+        return true;
+    });
+    return ret;
+}
+
+/*
+ * RAII wrapper around a bulk handle exposing the segments of a numpy
+ * array. If the array has too many segments (see above), or if mid is
+ * None, no bulk handle is created and staged() returns true.
+ */
+class pybake_numpy_bulk {
+
+    hg_bulk_t m_bulk = HG_BULK_NULL;
+    size_t    m_size = 0;
+    bool      m_staged = false;
+
+    public:
+
+    pybake_numpy_bulk(const py11::object& mid, const pybake_numpy_layout& layout, uint8_t flags) {
+        m_size = layout.size;
+        if(m_size == 0) return;
+        std::vector<void*> ptrs;
+        std::vector<hg_size_t> sizes;
+        size_t max_segments = std::max<size_t>(1, m_size / PYBAKE_NUMPY_MIN_SEGMENT);
+        // without a margo instance (handle not created by a BakeClient),
+        // no bulk handle can be created and the array is always staged
+        if(mid.is_none() || !layout.segments(ptrs, sizes, max_segments)) {
+            m_staged = true;
+            return;
+        }
+        margo_instance_id margo = mid.cast<pymargo_instance_id>();
+        hg_return_t hret = margo_bulk_create(margo, ptrs.size(), ptrs.data(), sizes.data(), flags, &m_bulk);
+        if(hret != HG_SUCCESS) {
+            std::stringstream ss;
+            ss << "margo_bulk_create() failed (ret = " << hret << ")";
+            throw std::runtime_error(ss.str());
+        }
+    }
+
+    pybake_numpy_bulk(const pybake_numpy_bulk&) = delete;
+    pybake_numpy_bulk& operator=(const pybake_numpy_bulk&) = delete;
+
+    ~pybake_numpy_bulk() {
+        if(m_bulk != HG_BULK_NULL) margo_bulk_free(m_bulk);
+    }
+
+    hg_bulk_t get() const {
+        return m_bulk;
+    }
+
+    size_t size() const {
+        return m_size;
+    }
+
+    bool staged() const {
+        return m_staged;
     }
+};
+
+static size_t pybake_numpy_size(const np::array& data) {
     size_t size = data.dtype().itemsize();
     for(int i = 0; i < data.ndim(); i++) {
         size *= data.shape(i);
     }
-    const void* buffer = data.data();
+    return size;
+}
+
+static void pybake_write_numpy(
+        pybake_provider_handle_t ph,
+        const py11::object& mid,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid,
+        uint64_t offset,
+        const np::array& data)
+{
+    pybake_timer timer(PYBAKE_STAT_write_numpy);
     int ret;
-    Py_BEGIN_ALLOW_THREADS
-    ret = bake_write(ph, tid, rid, offset, buffer, size);
-    Py_END_ALLOW_THREADS
-    HANDLE_ERROR(bake_write, ret);
+    if(data.flags() & np::array::c_style) {
+        size_t size = pybake_numpy_size(data);
+        const void* buffer = data.data();
+        PYBAKE_RELEASE_GIL(timer)
+        ret = bake_write(ph, tid, rid, offset, buffer, size);
+        PYBAKE_ACQUIRE_GIL(timer)
+        HANDLE_ERROR(bake_write, ret);
+        timer.bytes(size);
+    } else {
+        pybake_numpy_layout layout(data);
+        pybake_numpy_bulk bulk(mid, layout, HG_BULK_READ_ONLY);
+        if(bulk.size() == 0) return;
+        PYBAKE_RELEASE_GIL(timer)
+        if(bulk.staged())
+            ret = pybake_numpy_staged_write(ph, tid, rid, offset, layout);
+        else
+            ret = bake_proxy_write(ph, tid, rid, offset, bulk.get(), 0, NULL, bulk.size());
+        PYBAKE_ACQUIRE_GIL(timer)
+        HANDLE_ERROR(bake_proxy_write, ret);
+        timer.bytes(bulk.size());
+    }
 }
 #endif
 
@@ -163,26 +683,32 @@ static void pybake_persist(
         size_t offset,
         size_t size)
 {
+    pybake_timer timer(PYBAKE_STAT_persist);
     int ret;
-    Py_BEGIN_ALLOW_THREADS
+    PYBAKE_RELEASE_GIL(timer)
     ret = bake_persist(ph, tid, rid, offset, size);
-    Py_END_ALLOW_THREADS
+    PYBAKE_ACQUIRE_GIL(timer)
     HANDLE_ERROR(bake_persist, ret);
 }
 
 static py11::object pybake_create_write_persist(
         pybake_provider_handle_t ph,
         bake_target_id_t tid,
-        const py11::bytes& bdata)
+        const py11::object& bdata)
 {
+    pybake_timer timer(PYBAKE_STAT_create_write_persist);
     bake_region_id_t rid;
+    std::memset(&rid, 0, sizeof(rid));
+    pybake_buffer data(bdata, false);
+    const void* buffer = data.data();
+    size_t size = data.size();
     int ret;
-    Py_BEGIN_ALLOW_THREADS
-    std::string data = (std::string)bdata;
+    PYBAKE_RELEASE_GIL(timer)
     ret = bake_create_write_persist(ph, tid, 
-            data.data(), data.size(), &rid);
-    Py_END_ALLOW_THREADS
+            buffer, size, &rid);
+    PYBAKE_ACQUIRE_GIL(timer)
     HANDLE_ERROR(bake_create_write_persist, ret);
+    timer.bytes(size);
     return py11::cast(rid);
 }
 
@@ -194,38 +720,60 @@ static py11::object pybake_create_write_persist_proxy(
         const std::string& remote_addr,
         uint64_t size)
 {
+    pybake_timer timer(PYBAKE_STAT_create_write_persist_proxy);
     bake_region_id_t rid;
+    std::memset(&rid, 0, sizeof(rid));
     int ret;
     const char* addr = remote_addr.size() != 0 ? remote_addr.c_str() : NULL;
-    Py_BEGIN_ALLOW_THREADS
+    PYBAKE_RELEASE_GIL(timer)
     ret = bake_create_write_persist_proxy(ph, tid, 
             bulk, remote_offset, addr, size, &rid);
-    Py_END_ALLOW_THREADS
+    PYBAKE_ACQUIRE_GIL(timer)
     HANDLE_ERROR(bake_create_write_persist_proxy, ret);
+    timer.bytes(size);
     return py11::cast(rid);
 }
 
 #if HAS_NUMPY
 static py11::object pybake_create_write_persist_numpy(
         pybake_provider_handle_t ph,
+        const py11::object& mid,
         bake_target_id_t tid,
         const np::array& data)
 {
+    pybake_timer timer(PYBAKE_STAT_create_write_persist_numpy);
     bake_region_id_t rid;
-    if(!(data.flags() & (np::array::f_style | np::array::c_style))) {
-        throw std::runtime_error("Non-contiguous numpy arrays not yet supported in PyBake");
-    }
-    size_t size = data.dtype().itemsize();
-    for(int i = 0; i < data.ndim(); i++) {
-        size *= data.shape(i);
-    }
-    const void* buffer = data.data();
+    std::memset(&rid, 0, sizeof(rid));
     int ret;
-    Py_BEGIN_ALLOW_THREADS
-    ret = bake_create_write_persist(ph, tid, 
-            buffer, size, &rid);
-    Py_END_ALLOW_THREADS
-    HANDLE_ERROR(bake_create_write_persist, ret);
+    if(data.flags() & np::array::c_style) {
+        size_t size = pybake_numpy_size(data);
+        const void* buffer = data.data();
+        PYBAKE_RELEASE_GIL(timer)
+        ret = bake_create_write_persist(ph, tid, 
+                buffer, size, &rid);
+        PYBAKE_ACQUIRE_GIL(timer)
+        HANDLE_ERROR(bake_create_write_persist, ret);
+        timer.bytes(size);
+    } else {
+        pybake_numpy_layout layout(data);
+        pybake_numpy_bulk bulk(mid, layout, HG_BULK_READ_ONLY);
+        PYBAKE_RELEASE_GIL(timer)
+        if(bulk.size() == 0) {
+            ret = bake_create_write_persist(ph, tid, NULL, 0, &rid);
+        } else if(bulk.staged()) {
+            ret = bake_create(ph, tid, bulk.size(), &rid);
+            if(ret == BAKE_SUCCESS)
+                ret = pybake_numpy_staged_write(ph, tid, rid, 0, layout);
+            if(ret == BAKE_SUCCESS)
+                ret = bake_persist(ph, tid, rid, 0, bulk.size());
+        } else {
+            ret = bake_create_write_persist_proxy(ph, tid, 
+                    bulk.get(), 0, NULL, bulk.size(), &rid);
+        }
+        PYBAKE_ACQUIRE_GIL(timer)
+        HANDLE_ERROR(bake_create_write_persist_proxy, ret);
+        timer.bytes(bulk.size());
+    }
     return py11::cast(rid);
 }
 #endif
@@ -235,11 +783,12 @@ static py11::object pybake_get_size(
         const bake_target_id_t& tid,
         const bake_region_id_t& rid)
 {
+    pybake_timer timer(PYBAKE_STAT_get_size);
     uint64_t size;
     int ret;
-    Py_BEGIN_ALLOW_THREADS
+    PYBAKE_RELEASE_GIL(timer)
     ret = bake_get_size(ph, tid, rid, &size);
-    Py_END_ALLOW_THREADS
+    PYBAKE_ACQUIRE_GIL(timer)
     HANDLE_ERROR(bake_get_size, ret);
     return py11::cast(size);
 }
@@ -251,15 +800,184 @@ static py11::object pybake_read(
         uint64_t offset,
         size_t size) 
 {
-    std::string result(size, '\0');
+    pybake_timer timer(PYBAKE_STAT_read);
+    // allocate the resulting bytes object upfront and read directly into it
+    PyObject* result = PyBytes_FromStringAndSize(NULL, size);
+    if(!result) throw py11::error_already_set();
+    py11::object guard = py11::reinterpret_steal<py11::object>(result);
+    void* buffer = PyBytes_AS_STRING(result);
     uint64_t bytes_read;
     int ret;
-    Py_BEGIN_ALLOW_THREADS
-    ret = bake_read(ph, tid, rid, offset, (void*)result.data(), size, &bytes_read);
-    Py_END_ALLOW_THREADS
+    PYBAKE_RELEASE_GIL(timer)
+    ret = bake_read(ph, tid, rid, offset, buffer, size, &bytes_read);
+    PYBAKE_ACQUIRE_GIL(timer)
     HANDLE_ERROR(bake_read, ret);
-    result.resize(bytes_read);
-    return py11::bytes(result);
+    timer.bytes(bytes_read);
+    if(bytes_read != size) {
+        result = guard.release().ptr();
+        if(_PyBytes_Resize(&result, bytes_read) != 0)
+            throw py11::error_already_set();
+        guard = py11::reinterpret_steal<py11::object>(result);
+    }
+    return guard;
+}
+
+static size_t pybake_read_into(
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid,
+        uint64_t offset,
+        const py11::object& bdata)
+{
+    pybake_timer timer(PYBAKE_STAT_read_into);
+    pybake_buffer data(bdata, true);
+    void* buffer = data.data();
+    size_t size = data.size();
+    uint64_t bytes_read;
+    int ret;
+    PYBAKE_RELEASE_GIL(timer)
+    ret = bake_read(ph, tid, rid, offset, buffer, size, &bytes_read);
+    PYBAKE_ACQUIRE_GIL(timer)
+    HANDLE_ERROR(bake_read, ret);
+    timer.bytes(bytes_read);
+    return bytes_read;
+}
+
+static void pybake_remove(
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid)
+{
+    pybake_timer timer(PYBAKE_STAT_remove);
+    int ret;
+    PYBAKE_RELEASE_GIL(timer)
+    ret = bake_remove(ph, tid, rid);
+    PYBAKE_ACQUIRE_GIL(timer)
+    HANDLE_ERROR(bake_remove, ret);
+}
+
+/*
+ * Co-located fast path. When the provider runs in the same process as the
+ * client, bake_get_data returns the address of a region in the provider's
+ * memory (e.g. its mapped pmem pool), and the local_* functions below copy
+ * data from/into it directly, bypassing the bulk machinery. The address
+ * and size of the region are resolved at each call, with the GIL released,
+ * and are never handed out to Python, so that a region removed in the
+ * meantime is reported as an error rather than accessed. A removal
+ * running concurrently with a copy is not detected: callers must not
+ * remove a region while reading or writing it, as with any other access.
+ * Copies of at least PYBAKE_LOCAL_GIL_THRESHOLD bytes are made with the
+ * GIL released.
+ */
+
+#define PYBAKE_LOCAL_GIL_THRESHOLD (64*1024)
+
+static uintptr_t pybake_get_data(
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid)
+{
+    pybake_timer timer(PYBAKE_STAT_get_data);
+    void* ptr = NULL;
+    int ret;
+    PYBAKE_RELEASE_GIL(timer)
+    ret = bake_get_data(ph, tid, rid, &ptr);
+    PYBAKE_ACQUIRE_GIL(timer)
+    HANDLE_ERROR(bake_get_data, ret);
+    return reinterpret_cast<uintptr_t>(ptr);
+}
+
+/*
+ * Resolves the address and size of a region and copies between it and
+ * the buffer buf of buf_size bytes, clamped to the end of the region if
+ * clamp is true. Returns the number of bytes copied.
+ */
+static size_t pybake_local_copy(
+        pybake_timer& timer,
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid,
+        uint64_t offset,
+        void* buf,
+        size_t buf_size,
+        bool to_region,
+        bool clamp)
+{
+    void* ptr = NULL;
+    uint64_t region_size = 0;
+    size_t size = buf_size;
+    bool in_bounds = true;
+    int ret;
+    PYBAKE_RELEASE_GIL(timer)
+    ret = bake_get_size(ph, tid, rid, &region_size);
+    if(ret == BAKE_SUCCESS)
+        ret = bake_get_data(ph, tid, rid, &ptr);
+    if(ret == BAKE_SUCCESS) {
+        if(offset > region_size) offset = region_size;
+        if(size > region_size - offset) {
+            if(clamp) size = region_size - offset;
+            else in_bounds = false;
+        }
+    }
+    if(ret == BAKE_SUCCESS && in_bounds && size >= PYBAKE_LOCAL_GIL_THRESHOLD) {
+        char* region = static_cast<char*>(ptr) + offset;
+        if(to_region) std::memcpy(region, buf, size);
+        else std::memcpy(buf, region, size);
+    }
+    PYBAKE_ACQUIRE_GIL(timer)
+    HANDLE_ERROR(bake_get_data, ret);
+    if(!in_bounds)
+        throw std::out_of_range("write beyond the end of the region");
+    if(size < PYBAKE_LOCAL_GIL_THRESHOLD) {
+        char* region = static_cast<char*>(ptr) + offset;
+        if(to_region) std::memcpy(region, buf, size);
+        else std::memcpy(buf, region, size);
+    }
+    timer.bytes(size);
+    return size;
+}
+
+static void pybake_local_write(
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid,
+        uint64_t offset,
+        const py11::object& bdata)
+{
+    pybake_timer timer(PYBAKE_STAT_local_write);
+    pybake_buffer data(bdata, false);
+    pybake_local_copy(timer, ph, tid, rid, offset,
+            data.data(), data.size(), true, false);
+}
+
+static py11::object pybake_local_read(
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid,
+        uint64_t offset,
+        size_t size)
+{
+    pybake_timer timer(PYBAKE_STAT_local_read);
+    PyObject* result = PyBytes_FromStringAndSize(NULL, size);
+    if(!result) throw py11::error_already_set();
+    py11::object guard = py11::reinterpret_steal<py11::object>(result);
+    size_t n = pybake_local_copy(timer, ph, tid, rid, offset,
+            PyBytes_AS_STRING(result), size, false, true);
+    if(n < size) return py11::bytes(PyBytes_AS_STRING(result), n);
+    return guard;
+}
+
+static size_t pybake_local_read_into(
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid,
+        uint64_t offset,
+        const py11::object& bdata)
+{
+    pybake_timer timer(PYBAKE_STAT_local_read_into);
+    pybake_buffer data(bdata, true);
+    return pybake_local_copy(timer, ph, tid, rid, offset,
+            data.data(), data.size(), false, true);
 }
 
 static size_t pybake_proxy_read(
@@ -272,13 +990,15 @@ static size_t pybake_proxy_read(
         const std::string& remote_addr,
         size_t size) 
 {
+    pybake_timer timer(PYBAKE_STAT_proxy_read);
     uint64_t bytes_read;
     int ret;
     const char* addr = remote_addr.size() == 0 ? NULL : remote_addr.c_str();
-    Py_BEGIN_ALLOW_THREADS
+    PYBAKE_RELEASE_GIL(timer)
     ret = bake_proxy_read(ph, tid, rid, region_offset, bulk, remote_offset, addr, size, &bytes_read);
-    Py_END_ALLOW_THREADS
+    PYBAKE_ACQUIRE_GIL(timer)
     HANDLE_ERROR(bake_proxy_read, ret);
+    timer.bytes(bytes_read);
     return bytes_read;
 }
 
@@ -291,14 +1011,17 @@ static py11::object pybake_migrate_region(
         const std::string& dest_addr,
         uint16_t dest_provider_id,
         bake_target_id_t dest_target_id) {
+    pybake_timer timer(PYBAKE_STAT_migrate_region);
     bake_region_id_t dest_rid;
+    std::memset(&dest_rid, 0, sizeof(dest_rid));
     int ret;
-    Py_BEGIN_ALLOW_THREADS
+    PYBAKE_RELEASE_GIL(timer)
     ret = bake_migrate_region(source_ph, tid, source_rid, region_size,
             remove_source, dest_addr.c_str(), dest_provider_id,
             dest_target_id, &dest_rid);
-    Py_END_ALLOW_THREADS
+    PYBAKE_ACQUIRE_GIL(timer)
     HANDLE_ERROR(bake_migrate_region, ret);
+    timer.bytes(region_size);
     return py11::cast(dest_rid);
 }
 
@@ -309,57 +1032,697 @@ static void pybake_migrate_target(
         const std::string& dest_addr,
         uint16_t dest_provider_id,
         const std::string& dest_root) {
+    pybake_timer timer(PYBAKE_STAT_migrate_target);
     int ret;
-    Py_BEGIN_ALLOW_THREADS
+    PYBAKE_RELEASE_GIL(timer)
     ret = bake_migrate_target(source_ph, source_tid,
             remove_source, dest_addr.c_str(), dest_provider_id,
             dest_root.c_str());
-    Py_END_ALLOW_THREADS
+    PYBAKE_ACQUIRE_GIL(timer)
     HANDLE_ERROR(bake_migrate_target, ret);
 }
 
 #if HAS_NUMPY
-static py11::object pybake_read_numpy(
+static void pybake_read_numpy_impl(
         pybake_provider_handle_t ph,
+        const py11::object& mid,
         const bake_target_id_t& tid,
         const bake_region_id_t& rid,
         uint64_t offset,
-        const py11::tuple& shape,
-        const np::dtype& dtype)
+        np::array& out,
+        pybake_timer& timer)
 {
-    std::vector<ssize_t> sshape(shape.size());
-    for(unsigned int i=0; i<sshape.size(); i++) sshape[i] = shape[i].cast<ssize_t>();
-    np::array result(dtype, sshape);
-    size_t size = dtype.itemsize();
-    for(int i=0; i < result.ndim(); i++) 
-        size *= result.shape(i);
+    if(!out.writeable())
+        throw std::runtime_error("Output numpy array is not writeable");
+    size_t size;
     uint64_t bytes_read;
     int ret;
-    Py_BEGIN_ALLOW_THREADS
-    ret = bake_read(ph, tid, rid, offset, (void*)result.data(), size, &bytes_read);
-    Py_END_ALLOW_THREADS
-    HANDLE_ERROR(bake_read, ret);
+    if(out.flags() & np::array::c_style) {
+        size = pybake_numpy_size(out);
+        void* buffer = out.mutable_data();
+        PYBAKE_RELEASE_GIL(timer)
+        ret = bake_read(ph, tid, rid, offset, buffer, size, &bytes_read);
+        PYBAKE_ACQUIRE_GIL(timer)
+        HANDLE_ERROR(bake_read, ret);
+    } else {
+        pybake_numpy_layout layout(out);
+        pybake_numpy_bulk bulk(mid, layout, HG_BULK_WRITE_ONLY);
+        size = bulk.size();
+        if(size == 0) return;
+        PYBAKE_RELEASE_GIL(timer)
+        if(bulk.staged())
+            ret = pybake_numpy_staged_read(ph, tid, rid, offset, layout, &bytes_read);
+        else
+            ret = bake_proxy_read(ph, tid, rid, offset, bulk.get(), 0, NULL, size, &bytes_read);
+        PYBAKE_ACQUIRE_GIL(timer)
+        HANDLE_ERROR(bake_proxy_read, ret);
+    }
+    timer.bytes(bytes_read);
     if(bytes_read != size) {
         std::stringstream ss;
         ss << "bake_read could not read full numpy object (" << bytes_read << " bytes read";
         throw std::runtime_error(ss.str());
     }
+}
+
+static void pybake_read_numpy_into(
+        pybake_provider_handle_t ph,
+        const py11::object& mid,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid,
+        uint64_t offset,
+        np::array& out)
+{
+    pybake_timer timer(PYBAKE_STAT_read_numpy_into);
+    pybake_read_numpy_impl(ph, mid, tid, rid, offset, out, timer);
+}
+
+static py11::object pybake_read_numpy(
+        pybake_provider_handle_t ph,
+        const py11::object& mid,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid,
+        uint64_t offset,
+        const py11::tuple& shape,
+        const np::dtype& dtype)
+{
+    pybake_timer timer(PYBAKE_STAT_read_numpy);
+    std::vector<ssize_t> sshape(shape.size());
+    for(unsigned int i=0; i<sshape.size(); i++) sshape[i] = shape[i].cast<ssize_t>();
+    np::array result(dtype, sshape);
+    pybake_read_numpy_impl(ph, mid, tid, rid, offset, result, timer);
     return result;
 }
 #endif
 
-PYBIND11_MODULE(_pybakeclient, m)
+/*
+ * Batched operations. The functions below take vectors of target ids,
+ * region ids, offsets and sizes (or data buffers), and issue all the
+ * corresponding operations with the GIL released only once. They stop
+ * at the first error, reporting the index of the failed operation.
+ */
+
+#define HANDLE_BATCH_ERROR(__func, __ret, __index) do {\
+        if(__ret != BAKE_SUCCESS) {\
+            std::stringstream ss;\
+            ss << #__func << "() failed for operation " << __index << " (ret = " << __ret << ")";\
+            throw std::runtime_error(ss.str());\
+        }\
+    } while(0)
+
+static void pybake_check_batch_sizes(size_t n, size_t m) {
+    if(n != m)
+        throw std::length_error("all the arguments of a batched operation should have the same length");
+}
+
+static py11::tuple pybake_read_many(
+        pybake_provider_handle_t ph,
+        const std::vector<bake_target_id_t>& tids,
+        const std::vector<bake_region_id_t>& rids,
+        const std::vector<uint64_t>& offsets,
+        const std::vector<uint64_t>& sizes)
+{
+    pybake_timer timer(PYBAKE_STAT_read_many);
+    size_t n = tids.size();
+    pybake_check_batch_sizes(n, rids.size());
+    pybake_check_batch_sizes(n, offsets.size());
+    pybake_check_batch_sizes(n, sizes.size());
+    size_t total = 0;
+    for(auto s : sizes) total += s;
+    PyObject* data = PyByteArray_FromStringAndSize(NULL, total);
+    if(!data) throw py11::error_already_set();
+    py11::object result = py11::reinterpret_steal<py11::object>(data);
+    char* buffer = PyByteArray_AS_STRING(data);
+    std::vector<uint64_t> result_offsets(n+1, 0);
+    size_t failed = 0;
+    int ret = BAKE_SUCCESS;
+    PYBAKE_RELEASE_GIL(timer)
+    size_t pos = 0;
+    for(size_t i = 0; i < n; i++) {
+        uint64_t bytes_read = 0;
+        ret = bake_read(ph, tids[i], rids[i], offsets[i], buffer + pos, sizes[i], &bytes_read);
+        if(ret != BAKE_SUCCESS) {
+            failed = i;
+            break;
+        }
+        pos += bytes_read;
+        result_offsets[i+1] = pos;
+        // a short read leaves a gap that the next read fills
+        // by starting right where this one stopped
+    }
+    PYBAKE_ACQUIRE_GIL(timer)
+    HANDLE_BATCH_ERROR(bake_read, ret, failed);
+    timer.bytes(result_offsets[n]);
+    if(result_offsets[n] != total) {
+        if(PyByteArray_Resize(data, result_offsets[n]) != 0)
+            throw py11::error_already_set();
+    }
+    py11::bytes boffsets((const char*)result_offsets.data(), sizeof(uint64_t)*(n+1));
+    return py11::make_tuple(result, boffsets);
+}
+
+static void pybake_write_many(
+        pybake_provider_handle_t ph,
+        const std::vector<bake_target_id_t>& tids,
+        const std::vector<bake_region_id_t>& rids,
+        const std::vector<uint64_t>& offsets,
+        const py11::list& bdata)
+{
+    pybake_timer timer(PYBAKE_STAT_write_many);
+    size_t n = tids.size();
+    pybake_check_batch_sizes(n, rids.size());
+    pybake_check_batch_sizes(n, offsets.size());
+    pybake_check_batch_sizes(n, bdata.size());
+    std::vector<std::unique_ptr<pybake_buffer>> buffers;
+    buffers.reserve(n);
+    for(size_t i = 0; i < n; i++) {
+        py11::object obj = bdata[i];
+        if(PyUnicode_Check(obj.ptr()))
+            obj = py11::reinterpret_steal<py11::object>(PyUnicode_AsUTF8String(obj.ptr()));
+        if(!obj) throw py11::error_already_set();
+        buffers.emplace_back(new pybake_buffer(obj, false));
+    }
+    size_t failed = 0;
+    size_t written = 0;
+    int ret = BAKE_SUCCESS;
+    PYBAKE_RELEASE_GIL(timer)
+    for(size_t i = 0; i < n; i++) {
+        ret = bake_write(ph, tids[i], rids[i], offsets[i], buffers[i]->data(), buffers[i]->size());
+        if(ret != BAKE_SUCCESS) {
+            failed = i;
+            break;
+        }
+        written += buffers[i]->size();
+    }
+    PYBAKE_ACQUIRE_GIL(timer)
+    timer.bytes(written);
+    HANDLE_BATCH_ERROR(bake_write, ret, failed);
+}
+
+static py11::bytes pybake_get_size_many(
+        pybake_provider_handle_t ph,
+        const std::vector<bake_target_id_t>& tids,
+        const std::vector<bake_region_id_t>& rids)
+{
+    pybake_timer timer(PYBAKE_STAT_get_size_many);
+    size_t n = tids.size();
+    pybake_check_batch_sizes(n, rids.size());
+    std::vector<uint64_t> sizes(n, 0);
+    size_t failed = 0;
+    int ret = BAKE_SUCCESS;
+    PYBAKE_RELEASE_GIL(timer)
+    for(size_t i = 0; i < n; i++) {
+        ret = bake_get_size(ph, tids[i], rids[i], &sizes[i]);
+        if(ret != BAKE_SUCCESS) {
+            failed = i;
+            break;
+        }
+    }
+    PYBAKE_ACQUIRE_GIL(timer)
+    HANDLE_BATCH_ERROR(bake_get_size, ret, failed);
+    return py11::bytes((const char*)sizes.data(), sizeof(uint64_t)*n);
+}
+
+static void pybake_remove_many(
+        pybake_provider_handle_t ph,
+        const std::vector<bake_target_id_t>& tids,
+        const std::vector<bake_region_id_t>& rids)
+{
+    pybake_timer timer(PYBAKE_STAT_remove_many);
+    size_t n = tids.size();
+    pybake_check_batch_sizes(n, rids.size());
+    size_t failed = 0;
+    int ret = BAKE_SUCCESS;
+    PYBAKE_RELEASE_GIL(timer)
+    for(size_t i = 0; i < n; i++) {
+        ret = bake_remove(ph, tids[i], rids[i]);
+        if(ret != BAKE_SUCCESS) {
+            failed = i;
+            break;
+        }
+    }
+    PYBAKE_ACQUIRE_GIL(timer)
+    HANDLE_BATCH_ERROR(bake_remove, ret, failed);
+}
+
+/*
+ * Asynchronous operations.
+ *
+ * Bake does not have a non-blocking client API, so operations submitted
+ * to a completion queue are each executed by an Argobots ULT in the
+ * margo instance's handler pool. A ULT blocked in a bake call yields
+ * while the RPC is in flight, so hundreds of operations can be in flight
+ * without using an OS thread each. Completed operations are pushed into
+ * the queue and signaled through an eventfd, which an event loop
+ * (e.g. asyncio) can watch; completion_queue_poll then hands the results
+ * back to Python. ULTs never touch the GIL or Python objects' refcounts.
+ */
+
+enum pybake_op_type {
+    PYBAKE_OP_CREATE,
+    PYBAKE_OP_WRITE,
+    PYBAKE_OP_READ,
+    PYBAKE_OP_PERSIST,
+    PYBAKE_OP_GET_SIZE,
+    PYBAKE_OP_REMOVE,
+    PYBAKE_OP_CREATE_WRITE_PERSIST
+};
+
+static const char* pybake_op_name(pybake_op_type type) {
+    switch(type) {
+        case PYBAKE_OP_CREATE:               return "bake_create";
+        case PYBAKE_OP_WRITE:                return "bake_write";
+        case PYBAKE_OP_READ:                 return "bake_read";
+        case PYBAKE_OP_PERSIST:              return "bake_persist";
+        case PYBAKE_OP_GET_SIZE:             return "bake_get_size";
+        case PYBAKE_OP_REMOVE:               return "bake_remove";
+        case PYBAKE_OP_CREATE_WRITE_PERSIST: return "bake_create_write_persist";
+    }
+    return "unknown";
+}
+
+static pybake_stat_op pybake_op_stat(pybake_op_type type) {
+    switch(type) {
+        case PYBAKE_OP_CREATE:               return PYBAKE_STAT_submit_create;
+        case PYBAKE_OP_WRITE:                return PYBAKE_STAT_submit_write;
+        case PYBAKE_OP_READ:                 return PYBAKE_STAT_submit_read;
+        case PYBAKE_OP_PERSIST:              return PYBAKE_STAT_submit_persist;
+        case PYBAKE_OP_GET_SIZE:             return PYBAKE_STAT_submit_get_size;
+        case PYBAKE_OP_REMOVE:               return PYBAKE_STAT_submit_remove;
+        case PYBAKE_OP_CREATE_WRITE_PERSIST: return PYBAKE_STAT_submit_create_write_persist;
+    }
+    return PYBAKE_STAT_submit_create;
+}
+
+struct pybake_completion_queue;
+
+namespace {
+
+struct pybake_op {
+    uint64_t                       id;
+    pybake_op_type                 type;
+    pybake_completion_queue*       cq;
+    bake_provider_handle_t         ph;
+    bake_target_id_t               tid;
+    bake_region_id_t               rid;
+    uint64_t                       offset = 0;
+    uint64_t                       size   = 0;
+    void*                          data   = nullptr;
+    std::unique_ptr<pybake_buffer> buffer; // keeps the source/destination exported
+    py11::object                   result; // bytes object filled by reads
+    uint64_t                       value  = 0;
+    int                            ret    = BAKE_SUCCESS;
+    // timestamps, only set if statistics were enabled at creation
+    uint64_t                       t_created   = 0;
+    uint64_t                       t_submitted = 0;
+    uint64_t                       t_started   = 0;
+    uint64_t                       t_done      = 0;
+};
+
+}
+
+struct pybake_completion_queue {
+    int                     efd     = -1;
+    ABT_pool                pool    = ABT_POOL_NULL;
+    uint64_t                next_id = 0; // only accessed with the GIL held
+    uint64_t                pending = 0; // only accessed with the GIL held
+    std::mutex              mutex;
+    std::vector<pybake_op*> completed;
+};
+
+static void pybake_op_execute(pybake_op* op) {
+    switch(op->type) {
+        case PYBAKE_OP_CREATE:
+            op->ret = bake_create(op->ph, op->tid, op->size, &op->rid);
+            break;
+        case PYBAKE_OP_WRITE:
+            op->ret = bake_write(op->ph, op->tid, op->rid, op->offset, op->data, op->size);
+            break;
+        case PYBAKE_OP_READ:
+            op->ret = bake_read(op->ph, op->tid, op->rid, op->offset, op->data, op->size, &op->value);
+            break;
+        case PYBAKE_OP_PERSIST:
+            op->ret = bake_persist(op->ph, op->tid, op->rid, op->offset, op->size);
+            break;
+        case PYBAKE_OP_GET_SIZE:
+            op->ret = bake_get_size(op->ph, op->tid, op->rid, &op->value);
+            break;
+        case PYBAKE_OP_REMOVE:
+            op->ret = bake_remove(op->ph, op->tid, op->rid);
+            break;
+        case PYBAKE_OP_CREATE_WRITE_PERSIST:
+            op->ret = bake_create_write_persist(op->ph, op->tid, op->data, op->size, &op->rid);
+            break;
+    }
+}
+
+static void pybake_op_ult(void* arg) {
+    pybake_op* op = static_cast<pybake_op*>(arg);
+    pybake_completion_queue* cq = op->cq;
+    if(op->t_created) op->t_started = pybake_now_ns();
+    pybake_op_execute(op);
+    if(op->t_created) op->t_done = pybake_now_ns();
+    {
+        std::lock_guard<std::mutex> lock(cq->mutex);
+        cq->completed.push_back(op);
+    }
+    uint64_t one = 1;
+    ssize_t s = ::write(cq->efd, &one, sizeof(one));
+    (void)s;
+}
+
+static pybake_completion_queue_t pybake_completion_queue_create(
+        pymargo_instance_id mid)
+{
+    ABT_pool pool = ABT_POOL_NULL;
+    int ret = margo_get_handler_pool(mid, &pool);
+    if(ret != 0 || pool == ABT_POOL_NULL)
+        throw std::runtime_error("margo_get_handler_pool() failed");
+    int efd = eventfd(0, EFD_NONBLOCK | EFD_CLOEXEC);
+    if(efd < 0)
+        throw std::runtime_error("eventfd() failed");
+    pybake_completion_queue* cq = new pybake_completion_queue;
+    cq->efd  = efd;
+    cq->pool = pool;
+    return BAKECQ2CAPSULE(cq);
+}
+
+static void pybake_completion_queue_destroy(
+        pybake_completion_queue_t pcq)
+{
+    pybake_completion_queue* cq = pcq;
+    if(cq->pending != 0)
+        throw std::runtime_error("completion queue still has pending operations");
+    ::close(cq->efd);
+    delete cq;
+}
+
+static int pybake_completion_queue_fd(
+        pybake_completion_queue_t pcq)
+{
+    pybake_completion_queue* cq = pcq;
+    return cq->efd;
+}
+
+static uint64_t pybake_completion_queue_pending(
+        pybake_completion_queue_t pcq)
+{
+    pybake_completion_queue* cq = pcq;
+    return cq->pending;
+}
+
+static py11::list pybake_completion_queue_poll(
+        pybake_completion_queue_t pcq)
+{
+    pybake_completion_queue* cq = pcq;
+    uint64_t count;
+    ssize_t s = ::read(cq->efd, &count, sizeof(count));
+    (void)s;
+    std::vector<pybake_op*> completed;
+    {
+        std::lock_guard<std::mutex> lock(cq->mutex);
+        completed.swap(cq->completed);
+    }
+    py11::list result;
+    for(pybake_op* op : completed) {
+        std::unique_ptr<pybake_op> guard(op);
+        uint64_t t_polled = op->t_created ? pybake_now_ns() : 0;
+        cq->pending -= 1;
+        bake_provider_handle_release(op->ph);
+        py11::object error = py11::none();
+        py11::object value = py11::none();
+        if(op->ret != BAKE_SUCCESS) {
+            std::stringstream ss;
+            ss << pybake_op_name(op->type) << "() failed (ret = " << op->ret << ")";
+            error = py11::str(ss.str());
+        } else {
+            switch(op->type) {
+                case PYBAKE_OP_CREATE:
+                case PYBAKE_OP_CREATE_WRITE_PERSIST:
+                    value = py11::cast(op->rid);
+                    break;
+                case PYBAKE_OP_GET_SIZE:
+                    value = py11::cast(op->value);
+                    break;
+                case PYBAKE_OP_READ:
+                    if(op->value != op->size) {
+                        PyObject* bytes = op->result.release().ptr();
+                        if(_PyBytes_Resize(&bytes, op->value) != 0)
+                            throw py11::error_already_set();
+                        op->result = py11::reinterpret_steal<py11::object>(bytes);
+                    }
+                    value = op->result;
+                    break;
+                default:
+                    break;
+            }
+        }
+        result.append(py11::make_tuple(op->id, error, value));
+        if(op->t_created) {
+            // for asynchronous operations, "prep" is the submission, "rpc"
+            // the execution by the ULT, "gil_wait" the time the completed
+            // operation waited to be polled, and "post" the conversion above
+            uint64_t end = pybake_now_ns();
+            uint64_t nbytes = 0;
+            if(op->ret == BAKE_SUCCESS) {
+                if(op->type == PYBAKE_OP_READ) nbytes = op->value;
+                else if(op->type == PYBAKE_OP_WRITE
+                     || op->type == PYBAKE_OP_CREATE_WRITE_PERSIST) nbytes = op->size;
+            }
+            pybake_stats_entry& e = pybake_stats[pybake_op_stat(op->type)];
+            e.record_call(op->ret != BAKE_SUCCESS);
+            e.record(nbytes,
+                    op->t_submitted - op->t_created, op->t_done - op->t_started,
+                    t_polled - op->t_done, end - t_polled, end - op->t_created);
+        }
+    }
+    return result;
+}
+
+static uint64_t pybake_op_submit(pybake_completion_queue* cq, pybake_op* op) {
+    std::unique_ptr<pybake_op> guard(op);
+    int ret = bake_provider_handle_ref_incr(op->ph);
+    HANDLE_ERROR(bake_provider_handle_ref_incr, ret);
+    op->cq = cq;
+    op->id = cq->next_id++;
+    if(op->t_created) op->t_submitted = pybake_now_ns();
+    if(ABT_thread_create(cq->pool, pybake_op_ult, op, ABT_THREAD_ATTR_NULL, NULL) != ABT_SUCCESS) {
+        bake_provider_handle_release(op->ph);
+        throw std::runtime_error("ABT_thread_create() failed");
+    }
+    cq->pending += 1;
+    return guard.release()->id;
+}
+
+static pybake_op* pybake_op_new(
+        pybake_op_type type,
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid)
+{
+    pybake_op* op = new pybake_op;
+    if(pybake_stats_enabled.load(std::memory_order_relaxed))
+        op->t_created = pybake_now_ns();
+    op->type = type;
+    op->ph   = ph;
+    op->tid  = tid;
+    std::memset(&op->rid, 0, sizeof(op->rid));
+    return op;
+}
+
+static uint64_t pybake_submit_create(
+        pybake_completion_queue_t cq,
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        size_t region_size)
+{
+    pybake_op* op = pybake_op_new(PYBAKE_OP_CREATE, ph, tid);
+    op->size = region_size;
+    return pybake_op_submit(cq, op);
+}
+
+static uint64_t pybake_submit_write(
+        pybake_completion_queue_t cq,
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid,
+        uint64_t offset,
+        const py11::object& bdata)
+{
+    std::unique_ptr<pybake_op> op(pybake_op_new(PYBAKE_OP_WRITE, ph, tid));
+    op->rid    = rid;
+    op->offset = offset;
+    op->buffer.reset(new pybake_buffer(bdata, false));
+    op->data   = op->buffer->data();
+    op->size   = op->buffer->size();
+    return pybake_op_submit(cq, op.release());
+}
+
+static uint64_t pybake_submit_read(
+        pybake_completion_queue_t cq,
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid,
+        uint64_t offset,
+        size_t size)
+{
+    std::unique_ptr<pybake_op> op(pybake_op_new(PYBAKE_OP_READ, ph, tid));
+    PyObject* result = PyBytes_FromStringAndSize(NULL, size);
+    if(!result) throw py11::error_already_set();
+    op->result = py11::reinterpret_steal<py11::object>(result);
+    op->rid    = rid;
+    op->offset = offset;
+    op->data   = PyBytes_AS_STRING(result);
+    op->size   = size;
+    return pybake_op_submit(cq, op.release());
+}
+
+static uint64_t pybake_submit_persist(
+        pybake_completion_queue_t cq,
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid,
+        size_t offset,
+        size_t size)
+{
+    pybake_op* op = pybake_op_new(PYBAKE_OP_PERSIST, ph, tid);
+    op->rid    = rid;
+    op->offset = offset;
+    op->size   = size;
+    return pybake_op_submit(cq, op);
+}
+
+static uint64_t pybake_submit_get_size(
+        pybake_completion_queue_t cq,
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid)
+{
+    pybake_op* op = pybake_op_new(PYBAKE_OP_GET_SIZE, ph, tid);
+    op->rid = rid;
+    return pybake_op_submit(cq, op);
+}
+
+static uint64_t pybake_submit_remove(
+        pybake_completion_queue_t cq,
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const bake_region_id_t& rid)
+{
+    pybake_op* op = pybake_op_new(PYBAKE_OP_REMOVE, ph, tid);
+    op->rid = rid;
+    return pybake_op_submit(cq, op);
+}
+
+static uint64_t pybake_submit_create_write_persist(
+        pybake_completion_queue_t cq,
+        pybake_provider_handle_t ph,
+        const bake_target_id_t& tid,
+        const py11::object& bdata)
+{
+    std::unique_ptr<pybake_op> op(pybake_op_new(PYBAKE_OP_CREATE_WRITE_PERSIST, ph, tid));
+    op->buffer.reset(new pybake_buffer(bdata, false));
+    op->data = op->buffer->data();
+    op->size = op->buffer->size();
+    return pybake_op_submit(cq, op.release());
+}
+
+/*
+ * Submits a batch of operations in a single call. Each operation is a
+ * tuple (type, tid, rid, offset, size, data) where type is one of the
+ * OP_* constants and the fields that the operation does not use are None
+ * (rid for create and create_write_persist, size for write and
+ * create_write_persist, data for all but write and create_write_persist).
+ * All the operations are converted before any of them is submitted, so a
+ * conversion error submits nothing. Operations get consecutive ids, the
+ * first of which is returned.
+ */
+static uint64_t pybake_submit_batch(
+        pybake_completion_queue_t pcq,
+        pybake_provider_handle_t ph,
+        const py11::list& ops)
+{
+    pybake_completion_queue* cq = pcq;
+    std::vector<std::unique_ptr<pybake_op>> batch;
+    batch.reserve(ops.size());
+    for(size_t i = 0; i < ops.size(); i++) {
+        py11::tuple t = ops[i].cast<py11::tuple>();
+        if(t.size() != 6)
+            throw std::invalid_argument("batched operations should be tuples of 6 elements");
+        pybake_op_type type = static_cast<pybake_op_type>(t[0].cast<int>());
+        std::unique_ptr<pybake_op> op(pybake_op_new(type, ph, t[1].cast<bake_target_id_t>()));
+        switch(type) {
+            case PYBAKE_OP_CREATE:
+                op->size = t[4].cast<uint64_t>();
+                break;
+            case PYBAKE_OP_WRITE:
+            case PYBAKE_OP_CREATE_WRITE_PERSIST:
+                if(type == PYBAKE_OP_WRITE) {
+                    op->rid    = t[2].cast<bake_region_id_t>();
+                    op->offset = t[3].cast<uint64_t>();
+                }
+                op->buffer.reset(new pybake_buffer(t[5], false));
+                op->data = op->buffer->data();
+                op->size = op->buffer->size();
+                break;
+            case PYBAKE_OP_READ: {
+                op->rid    = t[2].cast<bake_region_id_t>();
+                op->offset = t[3].cast<uint64_t>();
+                op->size   = t[4].cast<uint64_t>();
+                PyObject* result = PyBytes_FromStringAndSize(NULL, op->size);
+                if(!result) throw py11::error_already_set();
+                op->result = py11::reinterpret_steal<py11::object>(result);
+                op->data   = PyBytes_AS_STRING(result);
+                break;
+            }
+            case PYBAKE_OP_PERSIST:
+                op->rid    = t[2].cast<bake_region_id_t>();
+                op->offset = t[3].cast<uint64_t>();
+                op->size   = t[4].cast<uint64_t>();
+                break;
+            case PYBAKE_OP_GET_SIZE:
+            case PYBAKE_OP_REMOVE:
+                op->rid = t[2].cast<bake_region_id_t>();
+                break;
+            default:
+                throw std::invalid_argument("invalid operation type in batch");
+        }
+        batch.push_back(std::move(op));
+    }
+    uint64_t first = cq->next_id;
+    for(auto& op : batch)
+        pybake_op_submit(cq, op.release());
+    return first;
+}
+
+/*
+ * Blocks (with the GIL released) until completions are available in
+ * the queue or the timeout (in seconds, negative to wait forever)
+ * expires. Returns whether completions are available. This allows
+ * threads that do not run an event loop to wait for their operations.
+ */
+static bool pybake_completion_queue_wait(
+        pybake_completion_queue_t pcq,
+        double timeout)
+{
+    pybake_completion_queue* cq = pcq;
+    struct pollfd pfd;
+    pfd.fd      = cq->efd;
+    pfd.events  = POLLIN;
+    pfd.revents = 0;
+    int ms = timeout < 0 ? -1 : static_cast<int>(timeout*1000);
+    int ret;
+    Py_BEGIN_ALLOW_THREADS
+    ret = ::poll(&pfd, 1, ms);
+    Py_END_ALLOW_THREADS
+    if(ret < 0 && errno != EINTR)
+        throw std::runtime_error("poll() failed on completion queue");
+    return ret > 0;
+}
+
+// numpy is not imported here: pybind11 imports it the first
+// time one of the *_numpy functions receives or creates an array
+void pybake_bind_client(py11::module& m)
 {
-#if HAS_NUMPY
-    //try { 
-        py11::module::import("numpy");
-    //}
-    //catch (...) {
-    //    std::cerr << "[Py-BAKE] error: could not import numpy at C++ level" << std::endl;
-    //    exit(-1);
-    //}
-#endif
-    py11::module::import("_pybaketarget");
     m.def("client_init", &pybake_client_init);
     m.def("client_finalize", [](pybake_client_t clt) {
             int ret = bake_client_finalize(clt); HANDLE_ERROR(bake_client_finalize, ret); } );
@@ -380,16 +1743,51 @@ PYBIND11_MODULE(_pybakeclient, m)
     m.def("create_write_persist_proxy", &pybake_create_write_persist_proxy);
     m.def("get_size", &pybake_get_size);
     m.def("read", &pybake_read);
+    m.def("read_into", &pybake_read_into);
     m.def("proxy_read", &pybake_proxy_read);
-    m.def("remove", [](pybake_provider_handle_t pbph, const bake_target_id_t& tid, const bake_region_id_t& rid) {
-            int ret = bake_remove(pbph, tid, rid); HANDLE_ERROR(bake_remove, ret); } );
+    m.def("remove", &pybake_remove);
     m.def("migrate_region", &pybake_migrate_region);
     m.def("migrate_target", &pybake_migrate_target);
     m.def("shutdown_service", [](pybake_client_t client, pymargo_addr addr) {
             int ret = bake_shutdown_service(client, addr); HANDLE_ERROR(bake_shutdown_service, ret); });
+    m.def("read_many", &pybake_read_many);
+    m.def("write_many", &pybake_write_many);
+    m.def("get_size_many", &pybake_get_size_many);
+    m.def("remove_many", &pybake_remove_many);
+    m.def("get_data", &pybake_get_data);
+    m.def("local_write", &pybake_local_write);
+    m.def("local_read", &pybake_local_read);
+    m.def("local_read_into", &pybake_local_read_into);
+    m.def("completion_queue_create", &pybake_completion_queue_create);
+    m.def("completion_queue_destroy", &pybake_completion_queue_destroy);
+    m.def("completion_queue_fd", &pybake_completion_queue_fd);
+    m.def("completion_queue_pending", &pybake_completion_queue_pending);
+    m.def("completion_queue_poll", &pybake_completion_queue_poll);
+    m.def("submit_create", &pybake_submit_create);
+    m.def("submit_write", &pybake_submit_write);
+    m.def("submit_read", &pybake_submit_read);
+    m.def("submit_persist", &pybake_submit_persist);
+    m.def("submit_get_size", &pybake_submit_get_size);
+    m.def("submit_remove", &pybake_submit_remove);
+    m.def("submit_create_write_persist", &pybake_submit_create_write_persist);
+    m.def("submit_batch", &pybake_submit_batch);
+    m.def("completion_queue_wait", &pybake_completion_queue_wait);
+    m.attr("OP_CREATE")               = static_cast<int>(PYBAKE_OP_CREATE);
+    m.attr("OP_WRITE")                = static_cast<int>(PYBAKE_OP_WRITE);
+    m.attr("OP_READ")                 = static_cast<int>(PYBAKE_OP_READ);
+    m.attr("OP_PERSIST")              = static_cast<int>(PYBAKE_OP_PERSIST);
+    m.attr("OP_GET_SIZE")             = static_cast<int>(PYBAKE_OP_GET_SIZE);
+    m.attr("OP_REMOVE")               = static_cast<int>(PYBAKE_OP_REMOVE);
+    m.attr("OP_CREATE_WRITE_PERSIST") = static_cast<int>(PYBAKE_OP_CREATE_WRITE_PERSIST);
+    m.def("stats_enable", &pybake_stats_enable);
+    m.def("stats_enabled", &pybake_stats_is_enabled);
+    m.def("stats_get", &pybake_stats_get);
+    m.def("stats_reset", &pybake_stats_reset);
 #if HAS_NUMPY
     m.def("write_numpy", &pybake_write_numpy);
     m.def("create_write_persist_numpy", &pybake_create_write_persist_numpy);
     m.def("read_numpy", &pybake_read_numpy);
+    m.def("read_numpy_into", &pybake_read_numpy_into);
 #endif
+    pybake_wrap_timed(m);
 }
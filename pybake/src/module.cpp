@@ -0,0 +1,24 @@
+/*
+ * (C) 2018 The University of Chicago
+ *
+ * See COPYRIGHT in top-level directory.
+ */
+#include <pybind11/pybind11.h>
+#include "bindings.h"
+
+namespace py11 = pybind11;
+
+/**
+ * Single extension module holding the bindings, so that importing
+ * pybake loads one shared object and the types it defines (target
+ * and region ids) are shared by all the submodules.
+ */
+PYBIND11_MODULE(_pybake, m)
+{
+    py11::module target = m.def_submodule("target", "Target and region ids");
+    pybake_bind_target(target);
+    py11::module client = m.def_submodule("client", "Bake client bindings");
+    pybake_bind_client(client);
+    py11::module server = m.def_submodule("server", "Bake provider bindings");
+    pybake_bind_server(server);
+}
@@ -9,10 +9,12 @@
 #include <string>
 #include <vector>
 #include <cstring>
+#include <cstdlib>
 #include <iostream>
 #include <margo.h>
 #include <bake.h>
 #include <bake-server.h>
+#include "bindings.h"
 
 namespace py11 = pybind11;
 
@@ -31,15 +33,77 @@ typedef py11::capsule pybake_provider_t;
 #define MID2CAPSULE(__mid)   py11::capsule((void*)(__mid), "margo_instance_id")
 #define ADDR2CAPSULE(__addr) py11::capsule((void*)(__addr), "hg_addr_t")
 #define BAKEPR2CAPSULE(__bpr) py11::capsule((void*)(__bpr), "bake_provider_t")
+#define POOL2CAPSULE(__pool) py11::capsule((void*)(__pool), "ABT_pool")
+
+/**
+ * Returns the Argobots pool with the given name (defined in the
+ * margo instance's configuration), or the margo instance's RPC
+ * handler pool if the name is empty.
+ */
+static ABT_pool pybake_find_pool(margo_instance_id mid, const std::string& pool_name) {
+    ABT_pool pool = ABT_POOL_NULL;
+    if(pool_name.empty()) {
+        margo_get_handler_pool(mid, &pool);
+    } else {
+        margo_find_pool_by_name(mid, pool_name.c_str(), &pool);
+        if(pool == ABT_POOL_NULL)
+            throw std::invalid_argument("Could not find Argobots pool \"" + pool_name + "\"");
+    }
+    return pool;
+}
 
 static pybake_provider_t pybake_provider_register(
-        pymargo_instance_id mid, uint8_t provider_id) {
+        pymargo_instance_id mid, uint16_t provider_id,
+        const std::string& json_config, const std::string& pool_name) {
     bake_provider_t provider;
-    int ret = bake_provider_register(mid, provider_id, NULL, &provider);
+    struct bake_provider_init_info args = BAKE_PROVIDER_INIT_INFO_INITIALIZER;
+    args.json_config = json_config.empty() ? NULL : json_config.c_str();
+    args.rpc_pool = pybake_find_pool(mid, pool_name);
+    int ret = bake_provider_register(mid, provider_id, &args, &provider);
     HANDLE_ERROR(bake_provider_register, ret);
     return BAKEPR2CAPSULE(provider);
 }
 
+static std::string pybake_provider_get_config(
+        pybake_provider_t provider) {
+    char* config = bake_provider_get_config(provider);
+    if(config == NULL)
+        throw std::runtime_error("bake_provider_get_config() failed");
+    std::string result(config);
+    free(config);
+    return result;
+}
+
+static py11::object pybake_find_pool_capsule(
+        pymargo_instance_id mid, const std::string& pool_name) {
+    return POOL2CAPSULE(pybake_find_pool(mid, pool_name));
+}
+
+static py11::dict pybake_pool_stats(py11::capsule pool_capsule) {
+    ABT_pool pool = (ABT_pool)((void*)pool_capsule);
+    size_t queued = 0, total = 0;
+    ABT_pool_get_size(pool, &queued);
+    ABT_pool_get_total_size(pool, &total);
+    py11::dict result;
+    // ULTs ready to run, and ULTs ready, running or blocked
+    result["queued"] = queued;
+    result["in_flight"] = total;
+    return result;
+}
+
+/**
+ * Starts the collection of margo's diagnostics (number of calls and
+ * time spent in each RPC, in its handler and in progress/trigger)
+ * for all the RPCs of the margo instance.
+ */
+static void pybake_diag_start(pymargo_instance_id mid) {
+    margo_diag_start(mid);
+}
+
+static void pybake_diag_dump(pymargo_instance_id mid, const std::string& path) {
+    margo_diag_dump(mid, path.c_str(), 0);
+}
+
 static py11::object pybake_provider_attach_target(
         pybake_provider_t provider,
         const std::string& target_name) {
@@ -100,10 +164,14 @@ static py11::list pybake_provider_list_targets(
     return list_result;
 }
 
-PYBIND11_MODULE(_pybakeserver, m)
+void pybake_bind_server(py11::module& m)
 {
-    py11::module::import("_pybaketarget");
     m.def("register", &pybake_provider_register);
+    m.def("get_config", &pybake_provider_get_config);
+    m.def("find_pool", &pybake_find_pool_capsule);
+    m.def("pool_stats", &pybake_pool_stats);
+    m.def("diag_start", &pybake_diag_start);
+    m.def("diag_dump", &pybake_diag_dump);
     m.def("create_target", &pybake_provider_create_target);
     m.def("attach_target", &pybake_provider_attach_target);
     m.def("detach_target", &pybake_provider_detach_target);
@@ -4,6 +4,7 @@
  * See COPYRIGHT in top-level directory.
  */
 #include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
 #include <string>
 #include <vector>
 #include <cstring>
@@ -11,6 +12,7 @@
 #include <margo.h>
 #include <bake.h>
 #include <bake-server.h>
+#include "bindings.h"
 
 namespace py11 = pybind11;
 
@@ -52,7 +54,60 @@ static py11::object pybake_region_id_from_string(const py11::bytes& bregion_str)
     return py11::cast(result);
 }
 
-PYBIND11_MODULE(_pybaketarget, m)
+/*
+ * Raw (fixed-size, binary) serialization of target and region ids,
+ * individually or as a contiguous array of ids in a single bytes object.
+ */
+
+template<typename T>
+static py11::bytes pybake_id_to_bytes(const T& id) {
+    return py11::bytes(reinterpret_cast<const char*>(&id), sizeof(T));
+}
+
+template<typename T>
+static py11::object pybake_id_from_bytes(const py11::bytes& bid) {
+    char* data;
+    ssize_t size;
+    if(PyBytes_AsStringAndSize(bid.ptr(), &data, &size) != 0)
+        throw py11::error_already_set();
+    if(size != sizeof(T)) return py11::none();
+    T id;
+    std::memcpy(&id, data, sizeof(T));
+    return py11::cast(id);
+}
+
+template<typename T>
+static py11::bytes pybake_ids_to_bytes(const std::vector<T>& ids) {
+    return py11::bytes(reinterpret_cast<const char*>(ids.data()), sizeof(T)*ids.size());
+}
+
+template<typename T>
+static py11::list pybake_ids_from_bytes(const py11::object& blob) {
+    Py_buffer view;
+    if(PyObject_GetBuffer(blob.ptr(), &view, PyBUF_C_CONTIGUOUS) != 0)
+        throw py11::error_already_set();
+    size_t size = view.len;
+    const char* data = static_cast<const char*>(view.buf);
+    py11::list result;
+    if(size % sizeof(T) != 0) {
+        PyBuffer_Release(&view);
+        throw std::length_error("buffer size is not a multiple of the id size");
+    }
+    try {
+        T id;
+        for(size_t pos = 0; pos < size; pos += sizeof(T)) {
+            std::memcpy(&id, data + pos, sizeof(T));
+            result.append(py11::cast(id));
+        }
+    } catch(...) {
+        PyBuffer_Release(&view);
+        throw;
+    }
+    PyBuffer_Release(&view);
+    return result;
+}
+
+void pybake_bind_target(py11::module& m)
 {
     py11::class_<bake_target_id_t>(m,"bake_target_id");
     // now done at Python level
@@ -64,4 +119,14 @@ PYBIND11_MODULE(_pybaketarget, m)
     //        .def("__str__", pybake_region_id_to_string);
     m.def("region_id_from_string", pybake_region_id_from_string);
     m.def("region_id_to_string", pybake_region_id_to_string);    
+    m.attr("TARGET_ID_SIZE") = sizeof(bake_target_id_t);
+    m.attr("REGION_ID_SIZE") = sizeof(bake_region_id_t);
+    m.def("target_id_to_bytes", pybake_id_to_bytes<bake_target_id_t>);
+    m.def("target_id_from_bytes", pybake_id_from_bytes<bake_target_id_t>);
+    m.def("target_ids_to_bytes", pybake_ids_to_bytes<bake_target_id_t>);
+    m.def("target_ids_from_bytes", pybake_ids_from_bytes<bake_target_id_t>);
+    m.def("region_id_to_bytes", pybake_id_to_bytes<bake_region_id_t>);
+    m.def("region_id_from_bytes", pybake_id_from_bytes<bake_region_id_t>);
+    m.def("region_ids_to_bytes", pybake_ids_to_bytes<bake_region_id_t>);
+    m.def("region_ids_from_bytes", pybake_ids_from_bytes<bake_region_id_t>);
 }
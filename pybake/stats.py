@@ -0,0 +1,101 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+from pybake._pybake import client as _pybakeclient
+import threading
+
+def enable(enabled=True):
+    """
+    Enables (or disables) the collection of statistics. Statistics are
+    global to the process and collected so far are kept. When disabled,
+    the only cost left is an atomic load and an extra C call in each
+    C++ entry point.
+    """
+    _pybakeclient.stats_enable(enabled)
+
+def enabled():
+    """
+    Returns whether statistics are being collected.
+    """
+    return _pybakeclient.stats_enabled()
+
+def get():
+    """
+    Returns the statistics collected so far, as a dictionary
+    associating operation names with dictionaries of counters.
+    Operations that were never called are omitted. The counters are:
+        count, errors, bytes  number of calls, failed calls, bytes moved
+        prep_ns               time spent before releasing the GIL
+                              (exporting/allocating buffers, inbound copies)
+        rpc_ns                time spent in Bake with the GIL released
+        gil_wait_ns           time spent re-acquiring the GIL
+        post_ns               time spent after re-acquiring the GIL
+                              (building the result, outbound copies)
+        total_ns              total time spent in the C++ function
+        histogram             log2 histogram of total_ns (bucket i counts
+                              calls that took less than 2**i ns)
+        call_ns               time of the whole call, including the
+                              pybind11 argument and result conversions
+        conversion_ns         call_ns - total_ns, i.e. the cost of these
+                              conversions
+    For asynchronous operations (submit_*), prep_ns is the submission,
+    rpc_ns the execution by the ULT, gil_wait_ns the time the completed
+    operation waited to be polled, post_ns the conversion of its result,
+    and total_ns covers submission to completion; their call_ns only
+    covers the submission and no conversion_ns is reported.
+
+    Statistics cover every call to the native module, whichever module
+    of pybake (or the application) makes it.
+    """
+    return _pybakeclient.stats_get()
+
+def reset():
+    """
+    Resets all the statistics.
+    """
+    _pybakeclient.stats_reset()
+
+class StatsReporter(threading.Thread):
+    """
+    Daemon thread periodically passing the statistics (as returned by
+    get()) to a callback, e.g. to export them to a metrics system.
+    """
+
+    def __init__(self, callback, interval=10.0, reset=False):
+        """
+        Constructor.
+
+        Args:
+            callback (function): function called with the statistics.
+            interval (float): number of seconds between two calls.
+            reset (bool): whether to reset the statistics after each call,
+                so that the callback receives deltas.
+        """
+        super().__init__(name='pybake-stats', daemon=True)
+        self._callback = callback
+        self._interval = interval
+        self._reset = reset
+        self._stopped = threading.Event()
+
+    def run(self):
+        while(not self._stopped.wait(self._interval)):
+            self.report()
+
+    def report(self):
+        """
+        Calls the callback with the current statistics.
+        """
+        stats = get()
+        if(self._reset):
+            reset()
+        self._callback(stats)
+
+    def stop(self):
+        """
+        Stops the thread after a last report.
+        """
+        if(self._stopped.is_set()):
+            return
+        self._stopped.set()
+        if(self.is_alive()):
+            self.join()
+        self.report()
@@ -0,0 +1,438 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class BakeRegionWriter(io.RawIOBase):
+    """
+    The BakeRegionWriter class is a writable, seekable file-like object
+    (io.RawIOBase) that writes into a Bake region. Since Bake regions have
+    a fixed size, the writer is created with a capacity and can write
+    anywhere within it. Written data is accumulated in one of two buffers;
+    when a buffer is full, it is written to the region by a background
+    thread (write-behind) while the other buffer fills up, so at most
+    2*buffer_size bytes are held in memory. flush() waits for pending
+    writes and persists the written range; close() flushes.
+
+    Background writes require the client's MargoInstance to run a
+    progress thread.
+    """
+
+    def __init__(self, ph, tid, capacity, rid=None, buffer_size=4*1024*1024):
+        """
+        Constructor.
+
+        Args:
+            ph (BakeProviderHandle): provider handle to use.
+            tid (BakeTargetID): target of the region.
+            capacity (int): size of the region.
+            rid (BakeRegionID): region to write into, if None a region
+                of the specified capacity is created.
+            buffer_size (int): size of each of the two buffers.
+        """
+        super(BakeRegionWriter, self).__init__()
+        self._ph = ph
+        self.tid = tid
+        self.capacity = capacity
+        self.rid = rid if rid is not None else ph.create(tid, capacity)
+        self._buffers = [ bytearray(buffer_size), bytearray(buffer_size) ]
+        self._pending = [ None, None ]
+        self._current = 0
+        self._buf_start = 0 # position in the region of the current buffer
+        self._buf_len = 0   # number of bytes in the current buffer
+        self._pos = 0
+        self._extent = 0    # largest position written so far
+        self._dirty = False # whether data was written since the last persist
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    @property
+    def size(self):
+        """
+        Number of bytes from the beginning of the region to the
+        farthest byte written.
+        """
+        return self._extent
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if(whence == io.SEEK_CUR):
+            pos += self._pos
+        elif(whence == io.SEEK_END):
+            pos += self._extent
+        if(pos < 0 or pos > self.capacity):
+            raise ValueError("Invalid position "+str(pos)+" in region of size "+str(self.capacity))
+        if(pos != self._buf_start + self._buf_len):
+            self._submit_buffer()
+            self._buf_start = pos
+        self._pos = pos
+        return pos
+
+    def write(self, b):
+        self._checkClosed()
+        view = memoryview(b).cast('B')
+        if(self._pos + len(view) > self.capacity):
+            raise OSError("Write beyond the capacity of the region ("+str(self.capacity)+" bytes)")
+        written = 0
+        while(written < len(view)):
+            buf = self._buffers[self._current]
+            n = min(len(buf) - self._buf_len, len(view) - written)
+            buf[self._buf_len:self._buf_len+n] = view[written:written+n]
+            self._buf_len += n
+            written += n
+            self._pos += n
+            if(self._buf_len == len(buf)):
+                self._submit_buffer()
+        self._extent = max(self._extent, self._pos)
+        self._dirty = self._dirty or written != 0
+        return written
+
+    def _submit_buffer(self):
+        if(self._buf_len != 0):
+            i = self._current
+            data = memoryview(self._buffers[i])[:self._buf_len]
+            self._pending[i] = self._executor.submit(
+                    self._ph.write, self.tid, self.rid, self._buf_start, data)
+            self._current = 1 - i
+            # wait for the previous write from the other buffer to complete
+            self._wait(self._current)
+        self._buf_start = self._pos
+        self._buf_len = 0
+
+    def _wait(self, i):
+        f = self._pending[i]
+        self._pending[i] = None
+        if(f is not None):
+            f.result()
+
+    def flush(self):
+        """
+        Writes the buffered data, waits for pending writes,
+        and persists the written range of the region.
+        """
+        if(self.closed):
+            return
+        self._submit_buffer()
+        self._wait(0)
+        self._wait(1)
+        if(self._dirty):
+            self._ph.persist(self.tid, self.rid, 0, self._extent)
+            self._dirty = False
+
+    def close(self):
+        if(self.closed):
+            return
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown()
+            super(BakeRegionWriter, self).close()
+
+class BakeRegionReader(io.RawIOBase):
+    """
+    The BakeRegionReader class is a readable, seekable file-like object
+    (io.RawIOBase) that reads from a Bake region. Data is read in blocks
+    of buffer_size bytes; while a block is being consumed, the next one
+    is read by a background thread (read-ahead). Reads of at least
+    buffer_size bytes bypass the buffers and go straight into the
+    caller's buffer.
+
+    Background reads require the client's MargoInstance to run a
+    progress thread.
+    """
+
+    def __init__(self, ph, tid, rid, size=None, buffer_size=4*1024*1024):
+        """
+        Constructor.
+
+        Args:
+            ph (BakeProviderHandle): provider handle to use.
+            tid (BakeTargetID): target of the region.
+            rid (BakeRegionID): region to read.
+            size (int): number of bytes that can be read from the region
+                (obtained with get_size if not provided).
+            buffer_size (int): size of the blocks.
+        """
+        super(BakeRegionReader, self).__init__()
+        self._ph = ph
+        self.tid = tid
+        self.rid = rid
+        self.size = size if size is not None else ph.get_size(tid, rid)
+        self._buffer_size = buffer_size
+        self._block = None      # index of the current block
+        self._block_data = b''
+        self._prefetch = None   # (block index, future)
+        self._pos = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if(whence == io.SEEK_CUR):
+            pos += self._pos
+        elif(whence == io.SEEK_END):
+            pos += self.size
+        if(pos < 0):
+            raise ValueError("Negative seek position "+str(pos))
+        self._pos = pos
+        return pos
+
+    def _read_block(self, index):
+        start = index*self._buffer_size
+        return self._ph.read(self.tid, self.rid, start,
+                min(self._buffer_size, self.size - start))
+
+    def _load_block(self, index):
+        if(self._block == index):
+            return
+        data = None
+        if(self._prefetch is not None):
+            pindex, future = self._prefetch
+            self._prefetch = None
+            if(pindex == index):
+                data = future.result()
+            else:
+                future.cancel()
+        if(data is None):
+            data = self._read_block(index)
+        self._block = index
+        self._block_data = data
+        if((index+1)*self._buffer_size < self.size):
+            self._prefetch = (index+1, self._executor.submit(self._read_block, index+1))
+
+    def readinto(self, b):
+        self._checkClosed()
+        view = memoryview(b).cast('B')
+        if(self._pos >= self.size or len(view) == 0):
+            return 0
+        count = min(len(view), self.size - self._pos)
+        if(count >= self._buffer_size):
+            n = self._ph.read_into(self.tid, self.rid, self._pos, view[:count])
+            self._pos += n
+            return n
+        index = self._pos // self._buffer_size
+        self._load_block(index)
+        offset = self._pos - index*self._buffer_size
+        n = min(count, len(self._block_data) - offset)
+        if(n <= 0):
+            return 0
+        view[:n] = self._block_data[offset:offset+n]
+        self._pos += n
+        return n
+
+    def close(self):
+        if(self.closed):
+            return
+        self._executor.shutdown()
+        super(BakeRegionReader, self).close()
+
+class BakeAppendWriter():
+    """
+    The BakeAppendWriter class appends records to a Bake region, coalescing
+    them to save RPCs. Appended records are copied into a buffer which is
+    flushed with a single write followed by a single persist covering all
+    the data written since the last flush. A flush happens when the buffer
+    reaches flush_size bytes, when its oldest record is older than
+    flush_age seconds, or when flush() is called. Records of at least
+    flush_size bytes are written directly from the caller's buffer.
+    The writer is thread-safe.
+
+    If flush_age is not None, a background thread enforces it, which
+    requires the client's MargoInstance to run a progress thread.
+    """
+
+    def __init__(self, ph, tid, rid, offset=0, capacity=None,
+                 flush_size=1024*1024, flush_age=None):
+        """
+        Constructor.
+
+        Args:
+            ph (BakeProviderHandle): provider handle to use.
+            tid (BakeTargetID): target of the region.
+            rid (BakeRegionID): region to append to.
+            offset (int): offset of the first record in the region.
+            capacity (int): size of the region (obtained with get_size
+                if not provided).
+            flush_size (int): number of buffered bytes triggering a flush.
+            flush_age (float): maximum number of seconds a record can stay
+                in the buffer (None to only flush on size or explicitly).
+        """
+        self._ph = ph
+        self.tid = tid
+        self.rid = rid
+        self.capacity = capacity if capacity is not None else ph.get_size(tid, rid)
+        self._flush_size = flush_size
+        self._flush_age = flush_age
+        self._buffer = bytearray()
+        self._buf_start = offset   # offset in the region of the buffer
+        self._buf_time = None      # time at which the buffer became non-empty
+        self._persist_start = offset # start of the range not yet persisted
+        self._pos = offset
+        self._lock = threading.Condition()
+        self._closed = False
+        self._error = None         # error raised by a background flush
+        self._stats = { 'appends' : 0, 'bytes' : 0, 'writes' : 0, 'persists' : 0,
+                        'size_flushes' : 0, 'age_flushes' : 0, 'explicit_flushes' : 0 }
+        self._thread = None
+        if(flush_age is not None):
+            self._thread = threading.Thread(target=self._age_loop,
+                    name='pybake-append', daemon=True)
+            self._thread.start()
+
+    @property
+    def offset(self):
+        """
+        Offset in the region at which the next record will be appended.
+        """
+        return self._pos
+
+    def append(self, data):
+        """
+        Appends a record and returns the offset at which it was placed
+        in the region. The record is only guaranteed to be persistent
+        once a flush covering it has completed.
+
+        Args:
+            data (bytes-like or str): record to append.
+        """
+        if(isinstance(data, str)):
+            data = data.encode()
+        view = memoryview(data).cast('B')
+        with self._lock:
+            if(self._closed):
+                raise ValueError("Append to a closed BakeAppendWriter")
+            self._check_error()
+            offset = self._pos
+            if(offset + len(view) > self.capacity):
+                raise OSError("Append beyond the capacity of the region ("+str(self.capacity)+" bytes)")
+            self._stats['appends'] += 1
+            self._stats['bytes'] += len(view)
+            if(len(view) >= self._flush_size):
+                self._write_buffer()
+                self._ph.write(self.tid, self.rid, offset, view)
+                self._stats['writes'] += 1
+                self._pos += len(view)
+                self._buf_start = self._pos
+                self._persist()
+                self._stats['size_flushes'] += 1
+                return offset
+            if(len(self._buffer) == 0):
+                self._buf_time = time.monotonic()
+                self._lock.notify()
+            self._buffer += view
+            self._pos += len(view)
+            if(len(self._buffer) >= self._flush_size):
+                self._flush()
+                self._stats['size_flushes'] += 1
+            elif(self._flush_age is not None
+                    and time.monotonic() - self._buf_time >= self._flush_age):
+                self._flush()
+                self._stats['age_flushes'] += 1
+            return offset
+
+    def _write_buffer(self):
+        if(len(self._buffer) != 0):
+            self._ph.write(self.tid, self.rid, self._buf_start, self._buffer)
+            self._stats['writes'] += 1
+            self._buffer = bytearray()
+        self._buf_start = self._pos
+        self._buf_time = None
+
+    def _persist(self):
+        if(self._pos != self._persist_start):
+            self._ph.persist(self.tid, self.rid, self._persist_start,
+                    self._pos - self._persist_start)
+            self._stats['persists'] += 1
+            self._persist_start = self._pos
+
+    def _flush(self):
+        self._write_buffer()
+        self._persist()
+
+    def _age_loop(self):
+        with self._lock:
+            while(not self._closed):
+                if(self._buf_time is None):
+                    self._lock.wait()
+                    continue
+                remaining = self._buf_time + self._flush_age - time.monotonic()
+                if(remaining > 0):
+                    self._lock.wait(remaining)
+                    continue
+                try:
+                    self._flush()
+                except Exception as e:
+                    # reported by the next call; the buffered records are
+                    # kept, and their flush is retried after another
+                    # flush_age seconds
+                    self._error = e
+                    if(len(self._buffer) != 0):
+                        self._buf_time = time.monotonic()
+                    continue
+                self._stats['age_flushes'] += 1
+
+    def _check_error(self):
+        if(self._error is not None):
+            error = self._error
+            self._error = None
+            raise error
+
+    def flush(self):
+        """
+        Writes the buffered records and persists everything
+        appended since the last flush.
+        """
+        with self._lock:
+            if(self._closed):
+                return
+            self._check_error()
+            self._flush()
+            self._stats['explicit_flushes'] += 1
+
+    def stats(self):
+        """
+        Returns a dictionary with the number of appends, appended bytes,
+        write and persist RPCs, flushes by cause, and the coalescing ratio
+        (appends per write RPC).
+        """
+        with self._lock:
+            result = dict(self._stats)
+        result['coalescing_ratio'] = result['appends'] / max(1, result['writes'])
+        return result
+
+    def close(self):
+        """
+        Flushes the writer and stops its background thread.
+        """
+        with self._lock:
+            if(self._closed):
+                return
+            try:
+                self._flush()
+            finally:
+                self._closed = True
+                self._lock.notify()
+        if(self._thread is not None):
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
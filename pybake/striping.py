@@ -0,0 +1,168 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pybake.target import BakeTargetID, BakeRegionID, TARGET_ID_SIZE, REGION_ID_SIZE
+
+class StripeManifest():
+    """
+    The StripeManifest class describes an object striped by a
+    StripedObjectStore: its size, the size of its chunks, and the
+    (BakeTargetID, BakeRegionID) pair in which each chunk is stored.
+    It can be serialized using to_bytes and StripeManifest.from_bytes.
+    """
+
+    _HEADER = struct.Struct('<4sQQQ')
+    _MAGIC  = b'PBKS'
+
+    def __init__(self, size, chunk_size, chunks):
+        """
+        Constructor.
+
+        Args:
+            size (int): size of the object.
+            chunk_size (int): size of each chunk (except the last one).
+            chunks (list): list of (BakeTargetID, BakeRegionID) pairs.
+        """
+        self.size = size
+        self.chunk_size = chunk_size
+        self.chunks = chunks
+
+    def to_bytes(self):
+        """
+        Serializes the manifest.
+        """
+        result = [ StripeManifest._HEADER.pack(StripeManifest._MAGIC,
+                        self.size, self.chunk_size, len(self.chunks)) ]
+        for tid, rid in self.chunks:
+            result.append(tid.to_bytes())
+            result.append(rid.to_bytes())
+        return b''.join(result)
+
+    @staticmethod
+    def from_bytes(data):
+        """
+        Deserializes a manifest produced by to_bytes.
+        """
+        data = bytes(data)
+        magic, size, chunk_size, count = StripeManifest._HEADER.unpack_from(data)
+        if(magic != StripeManifest._MAGIC):
+            raise ValueError("Invalid stripe manifest")
+        pos = StripeManifest._HEADER.size
+        chunks = []
+        for i in range(count):
+            tid = BakeTargetID.from_bytes(data[pos:pos+TARGET_ID_SIZE])
+            pos += TARGET_ID_SIZE
+            rid = BakeRegionID.from_bytes(data[pos:pos+REGION_ID_SIZE])
+            pos += REGION_ID_SIZE
+            chunks.append((tid, rid))
+        return StripeManifest(size, chunk_size, chunks)
+
+class StripedObjectStore():
+    """
+    The StripedObjectStore class splits large objects into fixed-size
+    chunks and spreads them round-robin across a list of stripes, i.e.
+    (BakeProviderHandle, BakeTargetID) pairs, possibly pointing to
+    different providers, keeping several chunks in flight at once.
+    Each chunk is stored in its own region using create_write_persist
+    and read back in place using read_into, so neither writing nor
+    reading copies the object.
+
+    Chunks are transferred by a pool of threads, which requires the
+    client's MargoInstance to run a progress thread.
+    """
+
+    def __init__(self, stripes, chunk_size=4*1024*1024, concurrency=8):
+        """
+        Constructor.
+
+        Args:
+            stripes (list): list of (BakeProviderHandle, BakeTargetID) pairs.
+            chunk_size (int): size of the chunks.
+            concurrency (int): maximum number of chunks in flight.
+        """
+        if(len(stripes) == 0):
+            raise ValueError("StripedObjectStore requires at least one stripe")
+        self.stripes = list(stripes)
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self._handles = dict((tid, ph) for ph, tid in self.stripes)
+
+    def _handle(self, tid):
+        ph = self._handles.get(tid)
+        if(ph is None):
+            raise KeyError("No stripe for target "+str(tid))
+        return ph
+
+    def write(self, data):
+        """
+        Writes an object. If writing any chunk fails, the chunks that
+        were written are removed and the exception is re-raised.
+
+        Args:
+            data (bytes-like): object to write (any object exposing
+                a C-contiguous buffer).
+        Returns:
+            A StripeManifest describing where the object is stored.
+        """
+        view = memoryview(data).cast('B')
+        size = len(view)
+        cs = self.chunk_size
+        num_chunks = (size + cs - 1) // cs
+        n = len(self.stripes)
+        def write_chunk(i):
+            ph, tid = self.stripes[i % n]
+            return (tid, ph.create_write_persist(tid, view[i*cs:(i+1)*cs]))
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [ pool.submit(write_chunk, i) for i in range(num_chunks) ]
+        chunks = []
+        error = None
+        for f in futures:
+            if(f.exception() is not None):
+                error = f.exception()
+            else:
+                chunks.append(f.result())
+        if(error is not None):
+            self._remove_chunks(chunks)
+            raise error
+        return StripeManifest(size, cs, chunks)
+
+    def read(self, manifest, out=None):
+        """
+        Reads an object described by a StripeManifest.
+
+        Args:
+            manifest (StripeManifest): manifest returned by write.
+            out (bytes-like): optional writable buffer of at least
+                manifest.size bytes in which to place the object.
+        Returns:
+            out if provided, otherwise a new bytearray.
+        """
+        if(out is None):
+            out = bytearray(manifest.size)
+        view = memoryview(out).cast('B')
+        if(len(view) < manifest.size):
+            raise ValueError("Output buffer too small for the striped object")
+        cs = manifest.chunk_size
+        def read_chunk(i):
+            tid, rid = manifest.chunks[i]
+            chunk = view[i*cs:min((i+1)*cs, manifest.size)]
+            n = self._handle(tid).read_into(tid, rid, 0, chunk)
+            if(n != len(chunk)):
+                raise RuntimeError("Could not read chunk "+str(i)+" of striped object")
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(read_chunk, range(len(manifest.chunks))))
+        return out
+
+    def remove(self, manifest):
+        """
+        Removes the regions holding the chunks of an object.
+        """
+        self._remove_chunks(manifest.chunks)
+
+    def _remove_chunks(self, chunks):
+        def remove_chunk(chunk):
+            tid, rid = chunk
+            self._handle(tid).remove(tid, rid)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(remove_chunk, chunks))
@@ -1,22 +1,31 @@
 # (C) 2018 The University of Chicago
 # See COPYRIGHT in top-level directory.
-import _pybaketarget
+from pybake._pybake import target as _pybaketarget
 import base64
 
+TARGET_ID_SIZE = _pybaketarget.TARGET_ID_SIZE
+REGION_ID_SIZE = _pybaketarget.REGION_ID_SIZE
+
 class BakeTargetID():
     """
     The BakeTargetID class is a wrapper for a bake_target_id_t
     object at C level. It can be used by client and server
     interfaces. It can be converted into a string using the
     __str__ method, and be deserialized from a string using
-    the BakeTargetID.from_str static method.
+    the BakeTargetID.from_str static method. BakeTargetIDs are
+    compared and hashed by value, can be pickled, and can be
+    converted from/to their raw TARGET_ID_SIZE-byte representation
+    using to_bytes and BakeTargetID.from_bytes.
     """
 
+    __slots__ = ('_tid', '_raw')
+
     def __init__(self, tid):
         """
         Constructor. Not supposed to be called by users.
         """
         self._tid = tid
+        self._raw = None
 
     def __str__(self):
         """
@@ -27,6 +36,49 @@ class BakeTargetID():
         byte_string = _pybaketarget.target_id_to_string(self._tid)
         return byte_string.decode()
 
+    def __repr__(self):
+        return 'BakeTargetID(' + str(self) + ')'
+
+    def to_bytes(self):
+        """
+        Returns the raw binary representation of the BakeTargetID.
+        """
+        if(self._raw is None and self._tid is not None):
+            self._raw = _pybaketarget.target_id_to_bytes(self._tid)
+        return self._raw
+
+    @staticmethod
+    def from_bytes(raw):
+        """
+        Converts the raw binary representation of a BakeTargetID
+        (as returned by to_bytes) into a BakeTargetID object.
+        Returns None if raw does not have the right size.
+        """
+        raw = bytes(raw)
+        tid = _pybaketarget.target_id_from_bytes(raw)
+        if(tid is None):
+            return None
+        result = BakeTargetID(tid)
+        result._raw = raw
+        return result
+
+    def __eq__(self, other):
+        if(not isinstance(other, BakeTargetID)):
+            return NotImplemented
+        return self.to_bytes() == other.to_bytes()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if(result is NotImplemented):
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash(self.to_bytes())
+
+    def __reduce__(self):
+        return (BakeTargetID.from_bytes, (self.to_bytes(),))
+
     @staticmethod
     def from_str(byte_string):
         """
@@ -50,15 +102,21 @@ class BakeRegionID():
     The BakeRegionID is a wrapper for a bake_region_id_t object at
     C level. It provides functionalities to convert a BakeRegionID
     from/to a string representation, and can be used by the server
-    and client API.
+    and client API. BakeRegionIDs are compared and hashed by value,
+    can be pickled, and can be converted from/to their raw
+    REGION_ID_SIZE-byte representation using to_bytes and
+    BakeRegionID.from_bytes.
     """
 
+    __slots__ = ('_rid', '_raw')
+
     def __init__(self, rid):
         """
         Constructor. Not supposed to be called by users.
         """
         self._rid = rid
-    
+        self._raw = None
+
     def __str__(self):
         """
         Converts the BakeRegionID into a string.
@@ -68,6 +126,49 @@ class BakeRegionID():
         a = _pybaketarget.region_id_to_string(self._rid)
         return a.decode()
 
+    def __repr__(self):
+        return 'BakeRegionID(' + str(self) + ')'
+
+    def to_bytes(self):
+        """
+        Returns the raw binary representation of the BakeRegionID.
+        """
+        if(self._raw is None and self._rid is not None):
+            self._raw = _pybaketarget.region_id_to_bytes(self._rid)
+        return self._raw
+
+    @staticmethod
+    def from_bytes(raw):
+        """
+        Converts the raw binary representation of a BakeRegionID
+        (as returned by to_bytes) into a BakeRegionID object.
+        Returns None if raw does not have the right size.
+        """
+        raw = bytes(raw)
+        rid = _pybaketarget.region_id_from_bytes(raw)
+        if(rid is None):
+            return None
+        result = BakeRegionID(rid)
+        result._raw = raw
+        return result
+
+    def __eq__(self, other):
+        if(not isinstance(other, BakeRegionID)):
+            return NotImplemented
+        return self.to_bytes() == other.to_bytes()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if(result is NotImplemented):
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash(self.to_bytes())
+
+    def __reduce__(self):
+        return (BakeRegionID.from_bytes, (self.to_bytes(),))
+
     @staticmethod
     def from_str(byte_string):
         """
@@ -81,3 +182,85 @@ class BakeRegionID():
             return None
         else:
             return BakeRegionID(rid)
+
+# ================================================================== #
+# ================================================================== #
+# ================================================================== #
+
+def target_ids_to_bytes(tids):
+    """
+    Converts a list of BakeTargetIDs into a single bytes object
+    containing their raw representations back to back.
+    """
+    return _pybaketarget.target_ids_to_bytes([ t._tid for t in tids ])
+
+def target_ids_from_bytes(blob):
+    """
+    Converts a bytes-like object produced by target_ids_to_bytes
+    (or a numpy array produced by target_ids_to_numpy) back into
+    a list of BakeTargetIDs.
+    """
+    return [ BakeTargetID(t) for t in _pybaketarget.target_ids_from_bytes(blob) ]
+
+def region_ids_to_bytes(rids):
+    """
+    Converts a list of BakeRegionIDs into a single bytes object
+    containing their raw representations back to back.
+    """
+    return _pybaketarget.region_ids_to_bytes([ r._rid for r in rids ])
+
+def region_ids_from_bytes(blob):
+    """
+    Converts a bytes-like object produced by region_ids_to_bytes
+    (or a numpy array produced by region_ids_to_numpy) back into
+    a list of BakeRegionIDs.
+    """
+    return [ BakeRegionID(r) for r in _pybaketarget.region_ids_from_bytes(blob) ]
+
+def target_id_dtype():
+    """
+    Returns the numpy structured datatype used to store BakeTargetIDs
+    (a single 'id' field of TARGET_ID_SIZE raw bytes).
+    """
+    import numpy
+    return numpy.dtype([('id', 'V%d' % TARGET_ID_SIZE)])
+
+def region_id_dtype():
+    """
+    Returns the numpy structured datatype used to store BakeRegionIDs
+    (a single 'id' field of REGION_ID_SIZE raw bytes).
+    """
+    import numpy
+    return numpy.dtype([('id', 'V%d' % REGION_ID_SIZE)])
+
+def target_ids_to_numpy(tids):
+    """
+    Converts a list of BakeTargetIDs into a numpy structured array
+    of datatype target_id_dtype().
+    """
+    import numpy
+    return numpy.frombuffer(target_ids_to_bytes(tids), dtype=target_id_dtype())
+
+def target_ids_from_numpy(array):
+    """
+    Converts a numpy array of datatype target_id_dtype()
+    into a list of BakeTargetIDs.
+    """
+    import numpy
+    return target_ids_from_bytes(numpy.ascontiguousarray(array))
+
+def region_ids_to_numpy(rids):
+    """
+    Converts a list of BakeRegionIDs into a numpy structured array
+    of datatype region_id_dtype().
+    """
+    import numpy
+    return numpy.frombuffer(region_ids_to_bytes(rids), dtype=region_id_dtype())
+
+def region_ids_from_numpy(array):
+    """
+    Converts a numpy array of datatype region_id_dtype()
+    into a list of BakeRegionIDs.
+    """
+    import numpy
+    return region_ids_from_bytes(numpy.ascontiguousarray(array))
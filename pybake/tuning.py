@@ -0,0 +1,152 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import json
+import os
+import time
+
+DEFAULT_SIZES = [ 2**i for i in range(6, 17) ]
+
+class EagerLimitReport():
+    """
+    The EagerLimitReport class holds the results of a calibration of
+    the eager limit of a BakeProviderHandle. For each tested size, it
+    records the median write and read latencies (in seconds) through the
+    eager path and the bulk path (None when the eager path failed, e.g.
+    because the data did not fit in an RPC). eager_limit is the value
+    that was selected.
+    """
+
+    def __init__(self, address, provider_id, sizes, eager, bulk, eager_limit,
+                 timestamp=None, from_cache=False):
+        self.address = address
+        self.provider_id = provider_id
+        self.sizes = list(sizes)
+        self.eager = [ tuple(e) if e is not None else None for e in eager ]
+        self.bulk = [ tuple(b) for b in bulk ]
+        self.eager_limit = eager_limit
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.from_cache = from_cache
+
+    def bandwidth(self, path='bulk'):
+        """
+        Returns the list of (write, read) bandwidths (in bytes/second)
+        of the given path ('eager' or 'bulk') for each tested size.
+        """
+        latencies = self.eager if path == 'eager' else self.bulk
+        return [ (s/l[0], s/l[1]) if l is not None else None
+                 for s, l in zip(self.sizes, latencies) ]
+
+    def to_dict(self):
+        return { 'address'     : self.address,
+                 'provider_id' : self.provider_id,
+                 'sizes'       : self.sizes,
+                 'eager'       : self.eager,
+                 'bulk'        : self.bulk,
+                 'eager_limit' : self.eager_limit,
+                 'timestamp'   : self.timestamp }
+
+    @staticmethod
+    def from_dict(d, from_cache=False):
+        return EagerLimitReport(d['address'], d['provider_id'], d['sizes'],
+                d['eager'], d['bulk'], d['eager_limit'], d['timestamp'], from_cache)
+
+    def __str__(self):
+        lines = [ "%10s %14s %14s %14s %14s" % ("size", "eager write", "eager read",
+                                               "bulk write", "bulk read") ]
+        for s, e, b in zip(self.sizes, self.eager, self.bulk):
+            e = e if e is not None else (float('nan'), float('nan'))
+            lines.append("%10d %12.1fus %12.1fus %12.1fus %12.1fus" % (s,
+                e[0]*1e6, e[1]*1e6, b[0]*1e6, b[1]*1e6))
+        lines.append("selected eager limit: "+str(self.eager_limit))
+        return "\n".join(lines)
+
+def _cache_key(ph):
+    return str(ph.address)+'/'+str(ph.provider_id)
+
+def _load_cache(cache_file):
+    try:
+        with open(cache_file) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return dict()
+
+def _save_cache(cache_file, key, report):
+    cache = _load_cache(cache_file)
+    cache[key] = report.to_dict()
+    tmp = cache_file + '.' + str(os.getpid())
+    with open(tmp, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp, cache_file)
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values)//2]
+
+def _measure(ph, tid, rid, data, buf, repetitions):
+    writes = []
+    reads = []
+    for i in range(repetitions):
+        t1 = time.perf_counter()
+        ph.write(tid, rid, 0, data)
+        t2 = time.perf_counter()
+        ph.read_into(tid, rid, 0, buf)
+        t3 = time.perf_counter()
+        writes.append(t2-t1)
+        reads.append(t3-t2)
+    return (_median(writes), _median(reads))
+
+def select_eager_limit(sizes, eager, bulk):
+    """
+    Returns the largest tested size up to which the eager path is at
+    least as fast (write+read latency) as the bulk path for every size.
+    """
+    limit = 0
+    for s, e, b in zip(sizes, eager, bulk):
+        if(e is None or e[0]+e[1] > b[0]+b[1]):
+            break
+        limit = s
+    return limit
+
+def autotune_eager_limit(ph, tid, sizes=None, repetitions=10, cache_file=None, max_age=None):
+    """
+    Calibrates and sets the eager limit of a BakeProviderHandle.
+    See BakeProviderHandle.autotune_eager_limit.
+    """
+    key = _cache_key(ph)
+    if(cache_file is not None):
+        cached = _load_cache(cache_file).get(key)
+        if(cached is not None and (max_age is None or time.time() - cached['timestamp'] <= max_age)):
+            report = EagerLimitReport.from_dict(cached, from_cache=True)
+            ph.set_eager_limit(report.eager_limit)
+            return report
+    sizes = sorted(sizes if sizes is not None else DEFAULT_SIZES)
+    original_limit = ph.get_eager_limit()
+    rid = ph.create(tid, sizes[-1])
+    eager = []
+    bulk = []
+    try:
+        eager_ok = True
+        for s in sizes:
+            data = b'\x5a' * s
+            buf = bytearray(s)
+            ph.set_eager_limit(0)
+            bulk.append(_measure(ph, tid, rid, data, buf, repetitions))
+            if(eager_ok):
+                ph.set_eager_limit(s)
+                try:
+                    eager.append(_measure(ph, tid, rid, data, buf, repetitions))
+                except RuntimeError:
+                    eager_ok = False
+            if(not eager_ok):
+                eager.append(None)
+    except:
+        ph.set_eager_limit(original_limit)
+        raise
+    finally:
+        ph.remove(tid, rid)
+    report = EagerLimitReport(ph.address, ph.provider_id, sizes, eager, bulk,
+                              select_eager_limit(sizes, eager, bulk))
+    ph.set_eager_limit(report.eager_limit)
+    if(cache_file is not None):
+        _save_cache(cache_file, key, report)
+    return report
@@ -11,64 +11,43 @@ import sys
 os.environ['OPT'] = " ".join(
 		    flag for flag in opt.split() if flag != '-Wstrict-prototypes'
 		)
-# Find out if Numpy is present
-try:
-    import numpy
-    has_numpy = 1
-except ImportError:
-    has_numpy = 0
+# NumPy is not needed to build the extension: pybind11 imports it at run
+# time, the first time an array goes through one of the *_numpy functions
+has_numpy = 1
 
-# Find out the dependencies using pkgconfig 
-# For client...
+# Find out the dependencies using pkgconfig
 bake_client = pkgconfig.parse('bake-client')
-client_libraries = bake_client['libraries']
-client_library_dirs = bake_client['library_dirs']
-client_include_dirs = bake_client['include_dirs']
-client_include_dirs.append(".")
-client_include_dirs.append(pybind11.get_include())
-# For server...
 bake_server = pkgconfig.parse('bake-server')
-server_libraries = bake_server['libraries']
-server_library_dirs = bake_server['library_dirs']
-server_include_dirs = bake_server['include_dirs']
-server_include_dirs.append(".")
-server_include_dirs.append(pybind11.get_include())
-# For target...
 uuid = pkgconfig.parse('uuid')
-target_libraries = uuid['libraries'] + bake_client['libraries']
-target_library_dirs = uuid['library_dirs'] + bake_client['library_dirs']
-target_include_dirs = uuid['include_dirs'] + bake_client['include_dirs']
-target_include_dirs.append('.')
-target_include_dirs.append(pybind11.get_include())
-pk = pkgconfig.parse('bake-server')
-target_include_dirs.extend(pk['include_dirs'])
 
-pybake_server_module = Extension('_pybakeserver', ["pybake/src/server.cpp"],
-		           libraries=server_libraries,
-                   library_dirs=server_library_dirs,
-                   include_dirs=server_include_dirs,
-                   extra_compile_args=['-std=c++11'],
-                   depends=["pybake/src/server.cpp"])
+def merge(key):
+    result = []
+    for dep in [ bake_client, bake_server, uuid ]:
+        for item in dep[key]:
+            if item not in result:
+                result.append(item)
+    return result
+
+include_dirs = merge('include_dirs')
+include_dirs.append(".")
+include_dirs.append(pybind11.get_include())
 
-pybake_client_module = Extension('_pybakeclient', ["pybake/src/client.cpp"],
-		           libraries=client_libraries,
-                   library_dirs=client_library_dirs,
-                   include_dirs=client_include_dirs,
+# All the bindings are built into a single extension module, pybake._pybake,
+# with a submodule for each source file (target, client and server)
+sources = [ "pybake/src/module.cpp", "pybake/src/target.cpp",
+            "pybake/src/client.cpp", "pybake/src/server.cpp" ]
+pybake_module = Extension('pybake._pybake', sources,
+                   libraries=merge('libraries'),
+                   library_dirs=merge('library_dirs'),
+                   include_dirs=include_dirs,
                    extra_compile_args=['-std=c++11'],
-                   depends=["pybake/src/client.cpp"],
+                   depends=sources + ["pybake/src/bindings.h"],
                    define_macros=[('HAS_NUMPY', has_numpy)])
 
-pybake_target_module = Extension('_pybaketarget', ["pybake/src/target.cpp"],
-                    libraries=target_libraries,
-                    library_dirs=target_library_dirs,
-                    include_dirs=target_include_dirs,
-                    extra_compile_args=['-std=c++11'],
-                    depends=["pybake/src/target.cpp"])
-
 setup(name='pybake',
       version='0.2.1',
       author='Matthieu Dorier',
       description="""Python binding for BAKE""",      
-      ext_modules=[ pybake_server_module, pybake_client_module, pybake_target_module ],
+      ext_modules=[ pybake_module ],
       packages=['pybake']
      )
@@ -36,6 +36,12 @@ def test():
     regionstr = str(region)
     region = BakeRegionID.from_str(regionstr)
     print("reconverting region to string: "+str(region))
+    import pickle
+    raw = region.to_bytes()
+    print("Raw region id is "+str(len(raw))+" bytes long, round trip equal: "
+          +str(BakeRegionID.from_bytes(raw) == region))
+    print("Pickling round trip equal: "+str(pickle.loads(pickle.dumps(region)) == region))
+    print("Usable as dict key: "+str({ region : 1 }[BakeRegionID.from_str(regionstr)] == 1))
     # write into the region
     ph.write(target, region, 0, 'A'*16)
     ph.write(target, region, 16, 'B'*16)
@@ -53,6 +59,77 @@ def test():
     result = ph.read(target, region, 8, 16)
     print("Reading region at offset 8, size 16 gives: "+str(result))
 
+    # read region into a preallocated buffer
+    buf = bytearray(16)
+    n = ph.read_into(target, region, 8, buf)
+    print("Reading "+str(n)+" bytes into a bytearray gives: "+str(bytes(buf)))
+
+    # write from a memoryview without copying
+    region2 = ph.create_write_persist(target, memoryview(buf)[4:12])
+    print("Region created from a memoryview contains: "+str(ph.read(target, region2, 0, 8)))
+
+    # batched reads
+    data, offsets = ph.read_many([ (target, region, 0, 8), (target, region2, 0, 8) ])
+    for i in range(len(offsets)-1):
+        print("Batched read "+str(i)+" gives: "+str(bytes(data[offsets[i]:offsets[i+1]])))
+
+    # cached reads
+    cph = client.create_cached_provider_handle(addr, mplex_id, byte_budget=1024)
+    cph.read(target, region, 0, 32)
+    cached = cph.read(target, region, 8, 16)
+    print("Cached read gives: "+str(bytes(cached))+", cache stats: "+str(cph.cache.stats()))
+    cph.write(target, region, 0, 'C'*16)
+    print("Read after write gives: "+str(bytes(cph.read(target, region, 8, 16))))
+    del cph
+
+    # per-operation statistics
+    client.enable_stats()
+    ph.write(target, region, 0, 'D'*16)
+    ph.read(target, region, 0, 16)
+    for op, counters in sorted(client.stats().items()):
+        print("Stats for "+op+": "+str(counters['count'])+" call(s), "
+                +str(counters['bytes'])+" bytes, "+str(counters['rpc_ns'])+" ns in RPCs")
+    client.reset_stats()
+    client.enable_stats(False)
+
+    # content-addressed store
+    from pybake.cas import ContentStore
+    store = ContentStore(ph, target)
+    d1 = store.put(b'shared payload')
+    d2 = store.put(b'shared payload')
+    print("Same digest: "+str(d1 == d2)+", refcount: "+str(store.refcount(d1))
+          +", data: "+str(store.get(d1, verify=True)))
+    store.remove(d1)
+    store.remove(d2)
+    print("Payloads left in the store: "+str(len(store)))
+
+    # bulk creation
+    from pybake.target import region_ids_from_numpy
+    rids = ph.create_many(target, [ 16, 32, 64 ])
+    print("create_many created "+str(len(rids))+" regions")
+    ph.remove_many([ (target, rid) for rid in region_ids_from_numpy(rids) ])
+
+    # compressed regions
+    zph = client.create_compressed_provider_handle(addr, mplex_id, codec='zlib', chunk_size=64)
+    zregion = zph.create_write_persist(target, b'compressible ' * 64)
+    print("Compressed region holds "+str(zph.get_size(target, zregion))+" bytes, range read gives: "
+          +str(zph.read(target, zregion, 130, 12))+", stats: "+str(zph.pipeline.stats()))
+    zph.remove(target, zregion)
+    del zph
+
+    # local access mode (reads from a mapping of the target's file
+    # if the server runs on this node, through RPCs otherwise)
+    ph.enable_local_access()
+    print("Local access read gives: "+str(bytes(ph.read_view(target, region, 0, 16))))
+    ph.enable_local_access(False)
+
+    # pooled handles
+    for i in range(4):
+        pph = client.get_handle(server_addr, mplex_id)
+        print("Pooled handle read gives: "+str(pph.read(target, region, 0, 8)))
+        del pph
+    print("Handle pool stats: "+str(client.handle_pool_stats()))
+
     del ph
     client.shutdown_service(addr)
     del addr
@@ -0,0 +1,54 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import sys
+from pymargo.core import Engine
+from pybake.client import *
+import numpy as np
+
+mid = Engine('ofi+tcp')
+
+def check(name, expected, result):
+    if(result.shape == expected.shape and result.dtype == expected.dtype
+       and (result == expected).all()):
+        print("[OK] "+name)
+    else:
+        print("[FAILED] "+name)
+
+def test():
+
+    server_addr = sys.argv[1]
+    mplex_id    = int(sys.argv[2])
+
+    client = BakeClient(mid)
+    addr = mid.lookup(server_addr)
+    ph = client.create_provider_handle(addr, mplex_id)
+    target = ph.probe()[0]
+
+    base = np.arange(100*7, dtype='>i4').reshape(100, 7)
+    arrays = {
+        "C-order, big-endian" : base,
+        "F-order"             : np.asfortranarray(base.astype(np.float32)),
+        "sliced"              : base[10:90:3, 1:5],
+        "3D"                  : np.random.randn(6, 5, 4),
+        "structured"          : np.zeros(10, dtype=[('x', '<f8'), ('y', '<i2', (3,))]),
+        "scalar"              : np.array(3.5),
+    }
+    for name, arr in arrays.items():
+        region = ph.write_array(target, arr)
+        check("read_array, "+name, arr, ph.read_array(target, region))
+        if(arr.ndim > 0):
+            check("read_array_slice, "+name, arr[2:5], ph.read_array_slice(target, region, 2, 5))
+
+    # large array (written with separate create/write/persist calls)
+    arr = np.random.randn(1024, 512)
+    region = ph.write_array(target, arr)
+    check("read_array, large", arr, ph.read_array(target, region))
+    check("read_array_slice, large", arr[100:300], ph.read_array_slice(target, region, 100, 300))
+
+    del ph
+    client.shutdown_service(addr)
+    del addr
+    client.finalize()
+
+test()
+mid.finalize()
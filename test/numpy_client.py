@@ -17,36 +17,36 @@ ph = client.create_provider_handle(addr, mplex_id)
 
 # Testing get_eager_limit
 lim = ph.get_eager_limit()
-print "Eager limit is: "+str(lim)
+print("Eager limit is: "+str(lim))
 
 # probe the provider handle (for all targets)
 targets = ph.probe()
-print "Probe found the following targets:"
+print("Probe found the following targets:")
 for t in targets:
-    print "===== "+str(t)
+    print("===== "+str(t))
 
 target = targets[0]
 
 # write into a region
 arr = np.random.randn(5,6)
-print "Writing the following numpy array: "
-print str(arr)
+print("Writing the following numpy array: ")
+print(str(arr))
 region = ph.create_write_persist_numpy(target, arr)
 
 # get size of region
 s = ph.get_size(target, region)
-print "Region size is "+str(s)
+print("Region size is "+str(s))
 
 # read region
 result = ph.read_numpy(target, region, 0, shape=(5,6), dtype=arr.dtype)
 # check for equalit
-print "Reading region gave the following numpy array: "
-print str(result)
+print("Reading region gave the following numpy array: ")
+print(str(result))
 
 if((result == arr).all()):
-    print "The two arrays are equal"
+    print("The two arrays are equal")
 else:
-    print "The two arrays are NOT equal"
+    print("The two arrays are NOT equal")
 
 del ph
 client.shutdown_service(addr)
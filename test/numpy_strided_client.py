@@ -0,0 +1,68 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import sys
+from pymargo.core import Engine
+from pybake.client import *
+import numpy as np
+
+mid = Engine('ofi+tcp')
+
+def check(name, expected, result):
+    if(result.shape == expected.shape and (result == expected).all()):
+        print("[OK] "+name)
+    else:
+        print("[FAILED] "+name)
+
+def test():
+
+    server_addr = sys.argv[1]
+    mplex_id    = int(sys.argv[2])
+
+    client = BakeClient(mid)
+    addr = mid.lookup(server_addr)
+    ph = client.create_provider_handle(addr, mplex_id)
+    target = ph.probe()[0]
+
+    base = np.arange(6*8, dtype=np.float64).reshape(6, 8)
+    arrays = {
+        "C-order"         : base,
+        "F-order"         : np.asfortranarray(base),
+        "transposed"      : base.T,
+        "sliced rows"     : base[1:5],
+        "sliced columns"  : base[:, 2:6],
+        "strided"         : base[::2, ::3],
+        "negative stride" : base[::-1, ::-2],
+        "3D view"         : np.arange(4*5*6, dtype=np.int32).reshape(4, 5, 6)[:, 1:4, ::2],
+    }
+
+    for name, arr in arrays.items():
+        # create_write_persist_numpy then read_numpy
+        region = ph.create_write_persist_numpy(target, arr)
+        result = ph.read_numpy(target, region, 0, shape=arr.shape, dtype=arr.dtype)
+        check("create_write_persist_numpy, "+name, arr, result)
+        # write_numpy into an existing region
+        region = ph.create(target, arr.nbytes)
+        ph.write_numpy(target, region, 0, arr)
+        ph.persist(target, region, 0, arr.nbytes)
+        result = ph.read_numpy(target, region, 0, shape=arr.shape, dtype=arr.dtype)
+        check("write_numpy, "+name, arr, result)
+
+    # read_numpy into strided output arrays
+    region = ph.create_write_persist_numpy(target, base[1:5])
+    out = np.zeros((8, 8), dtype=np.float64)
+    ph.read_numpy(target, region, 0, out=out[::2])
+    check("read_numpy(out=sliced rows)", base[1:5], out[::2])
+    out = np.zeros((4, 8), dtype=np.float64, order='F')
+    ph.read_numpy(target, region, 0, out=out)
+    check("read_numpy(out=F-order)", base[1:5], out)
+    out = np.zeros((4, 16), dtype=np.float64)
+    ph.read_numpy(target, region, 0, out=out[::-1, ::-2])
+    check("read_numpy(out=negative stride)", base[1:5], out[::-1, ::-2])
+
+    del ph
+    client.shutdown_service(addr)
+    del addr
+    client.finalize()
+
+test()
+mid.finalize()
@@ -16,7 +16,9 @@ print("Server running at address "+str(mid.addr())+" with provider_id="+str(prov
 provider = BakeProvider(mid, provider_id)
 target = provider.create_target("/dev/shm/baketarget", 10*1024*1024)
 print("target id is "+str(target))
-print("number of targets: "+str(provider.count_storage_targets()))
+print("number of targets: "+str(provider.count_targets()))
+print("provider configuration: "+str(provider.get_config()))
+print("provider statistics: "+str(provider.stats()))
 
 print("storage targets: ")
 targets = provider.list_targets()
@@ -24,6 +26,6 @@ for t in targets:
   print(str(t))
 
 provider.detach_all_targets()
-print "number of targets: "+str(provider.count_targets())
+print("number of targets: "+str(provider.count_targets()))
 
 mid.wait_for_finalize()
@@ -0,0 +1,57 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import sys
+import gzip
+import pickle
+from pymargo.core import Engine
+from pybake.client import *
+from pybake.stream import BakeRegionWriter, BakeRegionReader, BakeAppendWriter
+
+mid = Engine('ofi+tcp', use_progress_thread=True)
+
+def test():
+
+    server_addr = sys.argv[1]
+    mplex_id    = int(sys.argv[2])
+
+    client = BakeClient(mid)
+    addr = mid.lookup(server_addr)
+    ph = client.create_provider_handle(addr, mplex_id)
+    target = ph.probe()[0]
+
+    obj = { 'values' : list(range(100000)), 'name' : 'pybake' }
+
+    # pickle through gzip straight into a region
+    with BakeRegionWriter(ph, target, 4*1024*1024, buffer_size=64*1024) as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+            pickle.dump(obj, f)
+        region, size = raw.rid, raw.size
+    print("Wrote "+str(size)+" compressed bytes into region "+str(region))
+
+    # and back
+    with BakeRegionReader(ph, target, region, size, buffer_size=64*1024) as raw:
+        with gzip.GzipFile(fileobj=raw, mode='rb') as f:
+            result = pickle.load(f)
+    print("Objects are equal: "+str(result == obj))
+
+    # seeking
+    with BakeRegionReader(ph, target, region, size) as raw:
+        raw.seek(-16, 2)
+        print("Last 16 bytes: "+str(raw.read()))
+
+    # coalesced appends
+    log = ph.create(target, 1024*1024)
+    with BakeAppendWriter(ph, target, log, capacity=1024*1024,
+                          flush_size=16*1024, flush_age=0.1) as writer:
+        offsets = [ writer.append('record %05d\n' % i) for i in range(10000) ]
+        writer.flush()
+        print("Append stats: "+str(writer.stats()))
+    print("Record 1234: "+str(ph.read(target, log, offsets[1234], 13)))
+
+    del ph
+    client.shutdown_service(addr)
+    del addr
+    client.finalize()
+
+test()
+mid.finalize()
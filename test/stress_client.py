@@ -0,0 +1,72 @@
+# (C) 2018 The University of Chicago
+# See COPYRIGHT in top-level directory.
+import sys
+import os
+import threading
+from pymargo.core import Engine
+from pybake.client import *
+
+mid = Engine('ofi+tcp', use_progress_thread=True)
+
+def worker(ph, target, index, num_iterations, errors):
+    try:
+        for i in range(num_iterations):
+            data = os.urandom(64 + (index*31 + i*17) % 8192)
+            # blocking operations
+            region = ph.create_write_persist(target, data)
+            if(ph.get_size(target, region) < len(data)):
+                raise RuntimeError("region is too small")
+            if(ph.read(target, region, 0, len(data)) != data):
+                raise RuntimeError("read returned wrong data")
+            buf = bytearray(len(data))
+            ph.read_into(target, region, 0, buf)
+            if(bytes(buf) != data):
+                raise RuntimeError("read_into returned wrong data")
+            # batched operations
+            other = os.urandom(len(data))
+            _, region3 = ph.execute([ ('write', target, region, 0, other),
+                                      ('create_write_persist', target, data) ])
+            region2 = ph.execute([ ('create_write_persist', target, other) ])[0]
+            r1, r2 = ph.execute([ ('read', target, region, 0, len(data)),
+                                  ('read', target, region2, 0, len(data)) ])
+            if(r1 != other or r2 != other):
+                raise RuntimeError("batched reads returned wrong data")
+            ph.execute([ ('remove', target, region), ('remove', target, region2),
+                         ('remove', target, region3) ])
+    except Exception as e:
+        errors.append((index, e))
+
+def test():
+
+    server_addr = sys.argv[1]
+    mplex_id    = int(sys.argv[2])
+    num_threads = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    num_iterations = int(sys.argv[4]) if len(sys.argv) > 4 else 100
+
+    client = BakeClient(mid)
+    addr = mid.lookup(server_addr)
+    ph = client.create_provider_handle(addr, mplex_id)
+    target = ph.probe()[0]
+
+    # all the threads share the same provider handle
+    errors = []
+    threads = [ threading.Thread(target=worker, args=(ph, target, i, num_iterations, errors))
+                for i in range(num_threads) ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(str(num_threads)+" threads ran "+str(num_iterations)+" iterations each, "
+          +str(len(errors))+" error(s)")
+    for index, e in errors:
+        print("Thread "+str(index)+" failed: "+str(e))
+
+    del ph
+    client.shutdown_service(addr)
+    del addr
+    client.finalize()
+    if(len(errors) != 0):
+        sys.exit(1)
+
+test()
+mid.finalize()